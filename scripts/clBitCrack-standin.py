@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Stand-in for clBitCrack on machines without a GPU
+Accepts the subset of the clBitCrack command line used by the solver
+(-c, --keyspace START:END, address) and prints progress and results in the
+same format, scanning the keyspace with the CPU engine. Point the BitCrack
+path in Settings at this script to exercise the GPU driver.
+
+--crash-after and --hang-after make it exit with an error or go silent
+after some seconds, to exercise the engine supervisor's restarts.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from engine import scan_range  # noqa: E402
+from keys import address_to_hash160  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="clBitCrack stand-in")
+    parser.add_argument("-c", "--compressed", action="store_true")
+    parser.add_argument("--keyspace", required=True, help="START:END in hex")
+    parser.add_argument("-d", "--device", type=int, default=0, help="accepted and ignored")
+    parser.add_argument("--crash-after", type=float, metavar="SECONDS", help="exit with status 1")
+    parser.add_argument("--hang-after", type=float, metavar="SECONDS", help="stop printing and sleep")
+    parser.add_argument("address")
+    args = parser.parse_args()
+
+    start_hex, end_hex = args.keyspace.split(":")
+    range_start = int(start_hex, 16)
+    range_end = range_start + int(end_hex[1:], 16) - 1 if end_hex.startswith("+") else int(end_hex, 16)
+    target = address_to_hash160(args.address)
+
+    print(f"[Info] Compression: {'compressed' if args.compressed else 'both'}")
+    print(f"[Info] Starting at: {range_start:X}")
+    print(f"[Info] Ending at:   {range_end:X}")
+    sys.stdout.flush()
+
+    start_time = time.time()
+    last_report = start_time
+    total = 0
+
+    def on_progress(count):
+        nonlocal total, last_report
+        total += count
+        now = time.time()
+        if args.crash_after is not None and now - start_time >= args.crash_after:
+            sys.stdout.write("\n[Error] Stand-in crash\n")
+            sys.stdout.flush()
+            os._exit(1)
+        if args.hang_after is not None and now - start_time >= args.hang_after:
+            while True:
+                time.sleep(3600)
+        if now - last_report < 0.5:
+            return
+        last_report = now
+        elapsed = now - start_time
+        seconds = int(elapsed)
+        sys.stdout.write(
+            f"\rCPU stand-in 0 / 0MB | 1 target {total / elapsed / 1e6:.2f} MKey/s "
+            f"({total:,} total) [{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}]"
+        )
+        sys.stdout.flush()
+
+    key = scan_range(range_start, range_end, target, on_progress=on_progress)
+    sys.stdout.write("\n")
+    if key is not None:
+        print(f"[Info] Address:     {args.address}")
+        print(f"Private key: {key:X}")
+        print("Compressed:  yes")
+    else:
+        print("[Info] Reached end of keyspace")
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+"""
+End-to-end solver benchmarks
+Runs each engine against solved catalog puzzles and synthetic ranges with
+a planted key, and records keys/sec, wall time to the solution, peak RSS
+and CPU time. Every case runs in a freshly spawned process so its RSS and
+CPU figures are its own. Results are appended to a JSON history file and
+can be compared against a stored baseline to catch regressions.
+
+The gui case times the main window from launch to first paint, offscreen,
+and fails when it is over GUI_STARTUP_BUDGET or loaded an engine module
+before painting. The kangaroo-multi case solves MULTI_TARGETS planted keys
+one at a time and then in one multi-target run, and reports the jumps per
+target of both.
+"""
+
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import catalog
+import tables
+from kangaroo import KangarooSolver, MultiKangarooSolver
+from keys import hash160_to_address, hash160
+from parallel import default_workers
+from secp256k1 import point_mul, serialize_compressed
+from solver import Solver, split_options
+
+HISTORY_VERSION = 1
+DEFAULT_HISTORY_PATH = os.path.join(
+    os.path.expanduser("~"), ".local", "share", "bitcoin-puzzle-solver", "benchmarks.json"
+)
+DEFAULT_TIMEOUT = 300.0
+DEFAULT_SEED = 1
+STANDIN_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "scripts", "clBitCrack-standin.py"
+)
+
+GUI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gui.py")
+GUI_ENGINE = "gui"
+GUI_TARGET = ("startup", "offscreen")
+# Seconds from launching gui.py to the main window's first paint: about 0.25 s
+# on a current desktop, 0.5 s when every tab and engine loaded up front
+GUI_STARTUP_BUDGET = 1.0
+GUI_STARTUP_ROUNDS = 3
+
+MULTI_ENGINE = "kangaroo-multi"
+# Planted keys of the same size per multi-target case
+MULTI_TARGETS = 4
+
+# Solver options per engine
+ENGINES = {
+    "scan": {"workers": 1},
+    "parallel": {},
+    "kangaroo": {"algorithm": "kangaroo"},
+    "bsgs": {"algorithm": "bsgs", "bsgs_memory_mb": 1},
+    "bitcrack": {"use_gpu": True, "bitcrack_path": STANDIN_PATH, "gpu_chunk_bits": 20},
+}
+
+# Default targets per engine: (solved puzzle numbers, planted key bit sizes),
+# sized to finish in seconds to a minute with the Python engines
+DEFAULT_SUITE = {
+    "scan": ((20, 21, 22), (22,)),
+    "parallel": ((20, 21, 22), (22,)),
+    "kangaroo": ((30, 35, 40), (40,)),
+    "bsgs": ((36, 38, 40), (40,)),
+    "bitcrack": ((20, 21), (21,)),
+    MULTI_ENGINE: ((), (36,)),
+}
+
+# (result field, True if larger is better) checked against the baseline
+GATED_METRICS = (
+    ("keys_per_second", True),
+    ("wall_seconds", False),
+    ("peak_rss_mb", False),
+)
+
+
+def planted_puzzle(bits, seed=DEFAULT_SEED):
+    """Synthetic puzzle over 2^(bits-1)..2^bits-1 with a seeded random key"""
+    range_start, range_end = 1 << (bits - 1), (1 << bits) - 1
+    key = random.Random(f"{seed}:{bits}").randint(range_start, range_end)
+    pubkey = serialize_compressed(point_mul(key))
+    return catalog.Puzzle(
+        0, bits, range_start, range_end,
+        address=hash160_to_address(hash160(pubkey)),
+        pubkey=pubkey,
+        private_key=key,
+        solved=True
+    )
+
+
+def case_name(engine, target):
+    kind, value = target
+    return f"{engine}/{kind}-{value}"
+
+
+def suite(engines=None, puzzles=None, planted=None):
+    """List of (engine, target) cases, target is ("puzzle", n) or ("planted", bits)"""
+    cases = []
+    for engine in engines or [*ENGINES, MULTI_ENGINE, GUI_ENGINE]:
+        if engine == GUI_ENGINE:
+            if engines or (puzzles is None and planted is None):
+                cases.append((GUI_ENGINE, GUI_TARGET))
+            continue
+        default_puzzles, default_planted = DEFAULT_SUITE[engine]
+        if puzzles is None and planted is None:
+            engine_puzzles, engine_planted = default_puzzles, default_planted
+        else:
+            engine_puzzles, engine_planted = puzzles or (), planted or ()
+        if engine == MULTI_ENGINE:
+            # Catalog puzzles all differ in size, so only planted keys make a fair case
+            engine_puzzles = ()
+        cases += [(engine, ("puzzle", n)) for n in engine_puzzles]
+        cases += [(engine, ("planted", bits)) for bits in engine_planted]
+    return cases
+
+
+def _resolve(target, seed):
+    kind, value = target
+    if kind == "planted":
+        return planted_puzzle(value, seed)
+    puzzle = catalog.get_puzzle(value)
+    if puzzle is None or puzzle.private_key is None:
+        raise ValueError(f"Puzzle #{value} is not a solved catalog puzzle")
+    return puzzle
+
+
+def _cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def _peak_rss_mb(max_rss):
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return max_rss * scale / (1 << 20)
+
+
+def run_case(engine, target, timeout=DEFAULT_TIMEOUT, table_dir=tables.DEFAULT_TABLE_DIR,
+             seed=DEFAULT_SEED):
+    """Run one case in this process and return its result record
+
+    keys is the engine's own work count as reported through on_keys: keys
+    scanned, kangaroo jumps or keys covered by BSGS giant steps, so
+    keys_per_second only compares runs of the same engine.
+    """
+    puzzle = _resolve(target, seed)
+    state = {"keys": 0, "key": None, "solved_at": None}
+
+    def on_solution(private_key):
+        state["key"] = int(private_key, 16)
+        state["solved_at"] = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        solver = Solver(
+            puzzle.number,
+            puzzle=puzzle,
+            on_keys=lambda total: state.update(keys=total),
+            on_solution=on_solution,
+            **split_options(dict(ENGINES[engine], table_dir=table_dir, checkpoint_dir=checkpoint_dir))
+        )
+        timer = threading.Timer(timeout, solver.stop)
+        timer.daemon = True
+        cpu_before = _cpu_seconds()
+        started = time.perf_counter()
+        timer.start()
+        solver.run()
+        wall = time.perf_counter() - started
+        cpu = _cpu_seconds() - cpu_before
+        timer.cancel()
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    solved = state["key"] == puzzle.private_key
+    return {
+        "case": case_name(engine, target),
+        "engine": engine,
+        "bits": puzzle.bits,
+        "workers": ENGINES[engine].get("workers", default_workers()),
+        "solved": solved,
+        "keys": state["keys"],
+        "wall_seconds": round(wall, 3),
+        "solve_seconds": round(state["solved_at"] - started, 3) if solved else None,
+        "keys_per_second": round(state["keys"] / wall) if wall > 0 else 0,
+        "peak_rss_mb": round(_peak_rss_mb(max(own.ru_maxrss, children.ru_maxrss)), 1),
+        "cpu_seconds": round(cpu, 3),
+        "cpu_utilization": round(cpu / wall, 3) if wall > 0 else 0.0,
+    }
+
+
+def run_multi_case(target, timeout=DEFAULT_TIMEOUT, seed=DEFAULT_SEED):
+    """Solve MULTI_TARGETS planted keys singly and in one multi-target run
+
+    Both use the same herd size and seed, so jumps_per_target against
+    single_jumps_per_target is the amortized saving of the shared tame herd.
+    """
+    kind, bits = target
+    if kind != "planted":
+        raise ValueError(f"{MULTI_ENGINE} cases take planted keys, not {kind}")
+    puzzles = [planted_puzzle(bits, f"{seed}.{index}") for index in range(MULTI_TARGETS)]
+    deadline = time.perf_counter() + timeout
+
+    def should_stop():
+        return time.perf_counter() > deadline
+
+    single_jumps = 0
+    started = time.perf_counter()
+    for puzzle in puzzles:
+        single = KangarooSolver(puzzle.range_start, puzzle.range_end, puzzle.point, seed=seed)
+        single.solve(should_stop)
+        single_jumps += single.operations
+    single_wall = time.perf_counter() - started
+
+    multi = MultiKangarooSolver(
+        [(puzzle.range_start, puzzle.range_end, puzzle.point) for puzzle in puzzles], seed=seed
+    )
+    cpu_before = _cpu_seconds()
+    started = time.perf_counter()
+    found = multi.solve(should_stop)
+    wall = time.perf_counter() - started
+    cpu = _cpu_seconds() - cpu_before
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    solved = found == {index: puzzle.private_key for index, puzzle in enumerate(puzzles)}
+    return {
+        "case": case_name(MULTI_ENGINE, target),
+        "engine": MULTI_ENGINE,
+        "bits": bits,
+        "targets": MULTI_TARGETS,
+        "workers": 1,
+        "solved": solved,
+        "keys": multi.operations,
+        "wall_seconds": round(wall, 3),
+        "solve_seconds": round(wall, 3) if solved else None,
+        "keys_per_second": round(multi.operations / wall) if wall > 0 else 0,
+        "jumps_per_target": round(multi.operations / MULTI_TARGETS),
+        "single_jumps_per_target": round(single_jumps / MULTI_TARGETS),
+        "single_wall_seconds": round(single_wall, 3),
+        "amortized_ratio": round(multi.operations / single_jumps, 3) if single_jumps else None,
+        "peak_rss_mb": round(_peak_rss_mb(own.ru_maxrss), 1),
+        "cpu_seconds": round(cpu, 3),
+        "cpu_utilization": round(cpu / wall, 3) if wall > 0 else 0.0,
+    }
+
+
+def measure_gui_startup(timeout=DEFAULT_TIMEOUT, rounds=GUI_STARTUP_ROUNDS):
+    """Time gui.py from launch to the first paint of its window, best of rounds
+
+    The GUI runs with --startup-probe, offscreen unless QT_QPA_PLATFORM says
+    otherwise, and reports its RSS and the deferred modules it had loaded.
+    """
+    case = case_name(GUI_ENGINE, GUI_TARGET)
+    if importlib.util.find_spec("PyQt6") is None:
+        return {"case": case, "engine": GUI_ENGINE, "skipped": "PyQt6 is not installed"}
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    best = None
+    for _ in range(rounds):
+        started = time.time()
+        try:
+            completed = subprocess.run(
+                [sys.executable, GUI_PATH, "--startup-probe"],
+                env=env, capture_output=True, text=True, timeout=timeout
+            )
+        except subprocess.TimeoutExpired:
+            return {"case": case, "engine": GUI_ENGINE, "error": "no first paint before the timeout"}
+        lines = completed.stdout.splitlines()
+        if completed.returncode != 0 or not lines:
+            detail = (completed.stderr.strip().splitlines() or ["no output"])[-1]
+            return {"case": case, "engine": GUI_ENGINE,
+                    "error": f"gui.py exited with code {completed.returncode}: {detail}"}
+        report = json.loads(lines[-1])
+        report["seconds"] = report["first_paint"] - started
+        if best is None or report["seconds"] < best["seconds"]:
+            best = report
+
+    return {
+        "case": case,
+        "engine": GUI_ENGINE,
+        "solved": True,
+        "wall_seconds": round(best["seconds"], 3),
+        "budget_seconds": GUI_STARTUP_BUDGET,
+        "peak_rss_mb": round(_peak_rss_mb(best["max_rss"]), 1),
+        "modules": best["modules"],
+        "deferred_loaded": best["deferred_loaded"],
+    }
+
+
+def _case_process(engine, target, timeout, table_dir, seed, results):
+    try:
+        if engine == MULTI_ENGINE:
+            results.put(run_multi_case(target, timeout, seed))
+        else:
+            results.put(run_case(engine, target, timeout, table_dir, seed))
+    except Exception as e:
+        results.put({"case": case_name(engine, target), "engine": engine, "error": str(e)})
+
+
+def run_isolated(engine, target, timeout=DEFAULT_TIMEOUT, table_dir=tables.DEFAULT_TABLE_DIR,
+                 seed=DEFAULT_SEED):
+    """Run one case in a fresh spawned process and return its result record"""
+    if engine == GUI_ENGINE:
+        return measure_gui_startup(timeout)
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    process = ctx.Process(
+        target=_case_process, args=(engine, target, timeout, table_dir, seed, results)
+    )
+    process.start()
+    # The case has its own timeout; allow for startup and shutdown on top
+    try:
+        result = results.get(timeout=timeout + 60)
+    except Exception:
+        result = {"case": case_name(engine, target), "engine": engine, "error": "no result"}
+    process.join(10)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+    return result
+
+
+def load_history(path=DEFAULT_HISTORY_PATH):
+    """The history file contents, or an empty history if there is none"""
+    try:
+        with open(path) as f:
+            history = json.load(f)
+    except FileNotFoundError:
+        return {"version": HISTORY_VERSION, "baseline": {}, "runs": []}
+    if history.get("version") != HISTORY_VERSION:
+        raise ValueError(f"Benchmark history {path} has version {history.get('version')}")
+    return history
+
+
+def save_history(history, path=DEFAULT_HISTORY_PATH):
+    """Write the history file atomically"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "w") as f:
+        json.dump(history, f, indent=1)
+        f.write("\n")
+    os.replace(temp, path)
+
+
+def record_run(history, results, update_baseline=False):
+    """Append a run to the history; results become the baseline if asked or if there is none"""
+    history["runs"].append({
+        "time": round(time.time(), 3),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    })
+    for result in results:
+        if result.get("solved") and (update_baseline or result["case"] not in history["baseline"]):
+            history["baseline"][result["case"]] = result
+
+
+def over_budget(results):
+    """(case, metric, budget, value, percent over) of results that broke a fixed budget
+
+    These fail a run with or without a baseline.
+    """
+    found = []
+    for result in results:
+        budget = result.get("budget_seconds")
+        if budget and result["wall_seconds"] > budget:
+            percent = round((result["wall_seconds"] - budget) / budget * 100, 1)
+            found.append((result["case"], "wall_seconds", budget, result["wall_seconds"], percent))
+        if result.get("deferred_loaded"):
+            found.append((result["case"], "deferred_loaded", [], result["deferred_loaded"], 100.0))
+    return found
+
+
+def regressions(baseline, results, threshold):
+    """(case, metric, baseline value, value, percent worse) beyond threshold percent"""
+    found = []
+    for result in results:
+        base = baseline.get(result["case"])
+        if base is None:
+            continue
+        if not result.get("solved"):
+            found.append((result["case"], "solved", True, False, 100.0))
+            continue
+        for metric, higher_is_better in GATED_METRICS:
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            worse = (old - new) / old if higher_is_better else (new - old) / old
+            if worse * 100 > threshold:
+                found.append((result["case"], metric, old, new, round(worse * 100, 1)))
+    return found
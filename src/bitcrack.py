@@ -0,0 +1,310 @@
+"""
+Streaming driver for the external BitCrack engine
+Runs clBitCrack (or any binary with the same command line and output) on
+--keyspace chunks of a puzzle range, reads its output as a non-blocking
+stream for the real rate and hits, starts the next chunk before the
+current one ends and re-runs chunks whose process crashed.
+"""
+
+import os
+import re
+import selectors
+import subprocess
+import time
+
+from keys import private_key_to_address
+
+DEFAULT_CHUNK_BITS = 36
+# Assumed engine start-up time until one has been measured
+DEFAULT_STARTUP_SECONDS = 2.0
+MAX_CHUNK_FAILURES = 3
+
+RATE_RE = re.compile(r"([\d.]+)\s*([KMG]?)Key/s")
+TOTAL_RE = re.compile(r"\(([\d,]+) total\)")
+KEY_RE = re.compile(r"Private key:\s*([0-9a-fA-F]+)")
+RATE_UNITS = {"": 1, "K": 1e3, "M": 1e6, "G": 1e9}
+
+BITCRACK_PATHS = [
+    "/usr/local/bin/clBitCrack",
+    os.path.expanduser("~/Applications/BitcoinPuzzleSolver/clBitCrack"),
+    "./clBitCrack"
+]
+
+
+def find_bitcrack(configured_path=None):
+    """Path of an executable BitCrack binary, or None"""
+    paths = ([configured_path] if configured_path else []) + BITCRACK_PATHS
+    for path in paths:
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+
+def iter_chunks(intervals, chunk_size):
+    """Split intervals into --keyspace chunks of at most chunk_size keys"""
+    for start, end in intervals:
+        while start <= end:
+            stop = min(end, start + chunk_size - 1)
+            yield (start, stop)
+            start = stop + 1
+
+
+def parse_output(line):
+    """Extract (rate, total keys, private key) from one line of engine output
+
+    Fields that are not present are None.
+    """
+    rate = total = key = None
+    match = RATE_RE.search(line)
+    if match:
+        rate = float(match.group(1)) * RATE_UNITS[match.group(2)]
+    match = TOTAL_RE.search(line)
+    if match:
+        total = int(match.group(1).replace(",", ""))
+    match = KEY_RE.search(line)
+    if match:
+        key = int(match.group(1), 16)
+    return rate, total, key
+
+
+def keyspace(chunk):
+    """--keyspace argument of a chunk"""
+    return f"{chunk[0]:X}:{chunk[1]:X}"
+
+
+def _open_output():
+    """Pipe for the child's stdout/stderr, a pty where available
+
+    A pty keeps the engine's C stdio line-buffered so progress arrives as
+    it is printed instead of in 4 KB bursts.
+    """
+    try:
+        import pty
+        return pty.openpty()
+    except (ImportError, OSError):
+        return os.pipe()
+
+
+class EngineProcess:
+    """One running engine process scanning one chunk"""
+
+    def __init__(self, binary, address, chunk, extra_args=()):
+        self.chunk = chunk
+        self.size = chunk[1] - chunk[0] + 1
+        self.keys = 0
+        self.rate = 0.0
+        self.found_key = None
+        self.started = time.monotonic()
+        self.first_status = None
+        self.buffer = b""
+
+        read_fd, write_fd = _open_output()
+        args = [binary, "-c", "--keyspace", keyspace(chunk), *extra_args, address]
+        try:
+            self.process = subprocess.Popen(
+                args, stdin=subprocess.DEVNULL, stdout=write_fd, stderr=write_fd, close_fds=True
+            )
+        except OSError:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        self.fd = read_fd
+        os.set_blocking(self.fd, False)
+
+    def remaining_seconds(self):
+        """Estimated time until the chunk is done, None before the first status"""
+        if not self.rate:
+            return None
+        return (self.size - self.keys) / self.rate
+
+    def feed(self, data):
+        """Consume output bytes; returns the number of newly checked keys"""
+        self.buffer += data
+        lines = re.split(rb"[\r\n]", self.buffer)
+        self.buffer = lines.pop()
+        new_keys = 0
+        for raw in lines:
+            rate, total, key = parse_output(raw.decode("utf-8", "replace"))
+            if rate is not None:
+                self.rate = rate
+            if total is not None:
+                if self.first_status is None:
+                    self.first_status = time.monotonic()
+                total = min(total, self.size)
+                new_keys += max(0, total - self.keys)
+                self.keys = max(self.keys, total)
+            if key is not None:
+                self.found_key = key
+        return new_keys
+
+    def close(self):
+        os.close(self.fd)
+
+    def kill(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+
+class BitCrackDriver:
+    """Feed keyspace chunks to an external engine, one process per chunk
+
+    The next chunk's process is started once the running one is expected to
+    finish within the engine's measured start-up time, so the device never
+    idles between chunks. Used like WorkerPool: start(), poll(), stop().
+    """
+
+    def __init__(self, binary, address, intervals, chunk_size=1 << DEFAULT_CHUNK_BITS, extra_args=()):
+        self.binary = binary
+        self.address = address
+        self.extra_args = list(extra_args)
+        self.pending = list(iter_chunks(intervals, chunk_size))
+        self.total = sum(end - start + 1 for start, end in intervals)
+        self.selector = selectors.DefaultSelector()
+        self.running = []
+        self.completed = []
+        # Chunks left unscanned after the engine could not run them
+        self.abandoned = []
+        self.failures = {}
+        self.startup_seconds = DEFAULT_STARTUP_SECONDS
+        self.keys = 0
+        self.io_seconds = 0.0
+        self.found_key = None
+        self.errors = []
+        self.stopped = False
+
+    @property
+    def engine_rate(self):
+        """Keys/sec currently reported by the engine processes"""
+        return sum(child.rate for child in self.running)
+
+    def total_keys(self):
+        return self.keys
+
+    @property
+    def unfinished(self):
+        """Keys of the chunks given up after engine failures"""
+        return sum(end - start + 1 for start, end in self.abandoned)
+
+    def worker_progress(self):
+        """(keys checked, keys assigned); the engine counts as one worker"""
+        return [(self.keys, self.total)]
+
+    def stage_seconds(self):
+        """Time spent reading and parsing engine output"""
+        return {"io": self.io_seconds}
+
+    def start(self):
+        self._launch_next()
+
+    def _launch_next(self):
+        if not self.pending or self.stopped:
+            return
+        chunk = self.pending.pop(0)
+        try:
+            child = EngineProcess(self.binary, self.address, chunk, self.extra_args)
+        except OSError as e:
+            self.errors.append((keyspace(chunk), f"Cannot start {self.binary}: {e}"))
+            self._give_up(chunk)
+            return
+        self.running.append(child)
+        self.selector.register(child.fd, selectors.EVENT_READ, child)
+
+    def _finish(self, child):
+        """Handle a child whose output reached EOF"""
+        self.selector.unregister(child.fd)
+        child.close()
+        code = child.process.wait()
+        self.running.remove(child)
+        if child.first_status is not None:
+            self.startup_seconds = child.first_status - child.started
+
+        if code == 0:
+            self.keys += child.size - child.keys
+            self.completed.append(child.chunk)
+            self.failures.pop(child.chunk, None)
+            return
+
+        if self.stopped:
+            return
+
+        # Crashed: give back the keys it reported and run the chunk again
+        self.keys -= child.keys
+        failures = self.failures.get(child.chunk, 0) + 1
+        self.failures[child.chunk] = failures
+        if failures >= MAX_CHUNK_FAILURES:
+            self.errors.append((keyspace(child.chunk), f"Engine failed {failures} times (exit code {code})"))
+            self._give_up(child.chunk)
+        else:
+            self.errors.append((keyspace(child.chunk), f"Engine exited with code {code}, restarting chunk"))
+            self.pending.insert(0, child.chunk)
+
+    def _give_up(self, chunk):
+        """Drop a failed chunk and the ones still queued"""
+        self.abandoned.append(chunk)
+        self.abandoned.extend(self.pending)
+        self.pending.clear()
+
+    def _check_key(self, child):
+        """Accept a reported key only if it really opens the target address"""
+        key, child.found_key = child.found_key, None
+        if private_key_to_address(key) == self.address:
+            self.found_key = key
+        else:
+            self.errors.append((keyspace(child.chunk), f"Engine reported a key that does not match: {key:x}"))
+
+    def poll(self, timeout=0.0):
+        """Read engine output for up to timeout seconds; True once the run is over"""
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = max(0.0, deadline - time.monotonic())
+            for selector_key, _ in self.selector.select(wait if self.running else 0):
+                child = selector_key.data
+                started = time.perf_counter()
+                try:
+                    data = os.read(child.fd, 65536)
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    # A pty reports EIO once the child has exited
+                    data = b""
+                if not data:
+                    self._finish(child)
+                    continue
+
+                self.keys += child.feed(data)
+                self.io_seconds += time.perf_counter() - started
+                if child.found_key is not None:
+                    self._check_key(child)
+
+            if self.found_key is not None:
+                self.stop()
+                return True
+
+            # Queue the next chunk while the current one is still running
+            if len(self.running) == 1:
+                remaining = self.running[0].remaining_seconds()
+                if remaining is not None and remaining <= self.startup_seconds:
+                    self._launch_next()
+            if not self.running:
+                self._launch_next()
+                if not self.running:
+                    return True
+
+            if time.monotonic() >= deadline:
+                return False
+
+    def new_coverage(self):
+        """Chunks finished since the last call, for the coverage journal"""
+        completed, self.completed = self.completed, []
+        return completed
+
+    def stop(self):
+        """Kill all engine processes"""
+        self.stopped = True
+        for child in list(self.running):
+            child.kill()
+            self.selector.unregister(child.fd)
+            child.close()
+            self.running.remove(child)
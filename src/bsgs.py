@@ -0,0 +1,268 @@
+"""
+Baby-step giant-step solver for puzzles with a known public key
+Baby steps j*G (1 <= j <= m) are kept as a sorted, memory-mapped file of
+truncated x-coordinates behind an in-RAM bloom filter, so the exact table
+can be larger than memory. Each giant step covers 2m+1 keys.
+
+The table does not depend on the puzzle, so it is stored as a persistent
+table file (see tables.py) and reused by later runs.
+"""
+
+import heapq
+import os
+import struct
+import time
+
+from engine import advance_lanes, init_lanes
+from secp256k1 import point_add, point_mul, point_neg
+from tables import KIND_BABY_STEPS, TableError, TableFile, TableWriter, local_path
+
+# 2^19 baby steps, built in seconds on first use; larger tables need fewer
+# giant steps but take proportionally longer to build
+DEFAULT_MEMORY_MB = 1
+DEFAULT_GIANT_LANES = 1024
+
+# Bloom filter sizing: 16 bits per entry and 4 probes is ~0.25% false positives
+BLOOM_BITS_PER_ENTRY = 16
+BLOOM_PROBES = 4
+
+RECORD = struct.Struct(">QQ")
+RUN_ENTRIES = 1 << 20
+
+
+def entries_for_budget(memory_bytes, width=None):
+    """Baby-step count whose bloom filter fits the memory budget"""
+    entries = max(1, memory_bytes * 8 // BLOOM_BITS_PER_ENTRY)
+    if width is not None:
+        entries = min(entries, max(1, width // 2))
+    return entries
+
+
+def table_path(directory, entries):
+    """Path of the baby-step table file for a table size"""
+    return os.path.join(directory, f"bsgs-{entries}.tbl")
+
+
+def _table_params(entries):
+    return (entries, BLOOM_BITS_PER_ENTRY << 8 | BLOOM_PROBES)
+
+
+def _bloom_indices(x, nbits):
+    return [((x >> (64 * i)) & 0xFFFFFFFFFFFFFFFF) % nbits for i in range(BLOOM_PROBES)]
+
+
+def _write_run(path, keys):
+    keys.sort()
+    with open(path, "wb") as f:
+        for key in keys:
+            f.write(RECORD.pack(key >> 64, key & 0xFFFFFFFFFFFFFFFF))
+
+
+def _read_run(path):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(RECORD.size * 4096)
+            if not chunk:
+                return
+            for x64, j in RECORD.iter_unpack(chunk):
+                yield x64, j
+
+
+def build_table(path, entries, batch_size=DEFAULT_GIANT_LANES, should_stop=None, on_progress=None):
+    """Compute j*G for j = 1..entries and write the bloom filter and sorted records
+
+    Records are sorted in bounded runs and merged, so building needs only
+    RUN_ENTRIES records in memory regardless of the table size.
+    Returns False if stopped before completion.
+    """
+    nbits = entries * BLOOM_BITS_PER_ENTRY
+    bloom = bytearray((nbits + 7) // 8)
+
+    lanes = init_lanes(1, min(batch_size, entries))
+    step = point_mul(len(lanes))
+    run_prefix = f"{path}.{os.getpid()}.run"
+    runs = []
+    keys = []
+    j = 1
+    try:
+        while j <= entries:
+            if should_stop and should_stop():
+                return False
+
+            count = min(len(lanes), entries - j + 1)
+            for i in range(count):
+                x = lanes[i][0]
+                for index in _bloom_indices(x, nbits):
+                    bloom[index >> 3] |= 1 << (index & 7)
+                keys.append((x >> 192) << 64 | (j + i))
+
+            if len(keys) >= RUN_ENTRIES:
+                runs.append(f"{run_prefix}{len(runs)}")
+                _write_run(runs[-1], keys)
+                keys = []
+
+            if on_progress:
+                on_progress(count)
+            j += len(lanes)
+            if j <= entries:
+                lanes = advance_lanes(lanes, step)
+
+        if keys:
+            runs.append(f"{run_prefix}{len(runs)}")
+            _write_run(runs[-1], keys)
+
+        writer = TableWriter(path, KIND_BABY_STEPS, _table_params(entries))
+        try:
+            writer.begin_section()
+            writer.write(bytes(bloom))
+            writer.begin_section()
+            buffer = bytearray()
+            for x64, j in heapq.merge(*(_read_run(run) for run in runs)):
+                buffer += RECORD.pack(x64, j)
+                if len(buffer) >= 1 << 20:
+                    writer.write(bytes(buffer))
+                    buffer.clear()
+            writer.write(bytes(buffer))
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+        return True
+    finally:
+        for run in runs:
+            os.remove(run)
+
+
+def ensure_table(directory, entries, should_stop=None, on_progress=None):
+    """Path of a verified baby-step table, building it if needed
+
+    Returns None if the build was stopped.
+    """
+    path = table_path(directory, entries)
+    try:
+        BabyStepTable(path, verify=True).close()
+        return path
+    except TableError:
+        pass
+
+    if not build_table(path, entries, should_stop=should_stop, on_progress=on_progress):
+        return None
+    return path
+
+
+class BabyStepTable:
+    """Read-only view of a baby-step table file
+
+    The bloom filter and records are memory-mapped, so every worker process
+    that opens the same table shares one copy in the page cache.
+    """
+
+    def __init__(self, path, verify=False):
+        # Pinned workers read their NUMA node's copy if there is one
+        self.file = TableFile(local_path(path), KIND_BABY_STEPS, verify)
+        self.entries = self.file.params[0]
+        if self.file.params != _table_params(self.entries):
+            self.file.close()
+            raise TableError(f"Baby-step table built with other bloom settings: {path}")
+
+        self.nbits = self.entries * BLOOM_BITS_PER_ENTRY
+        self.data = self.file.data
+        self.bloom_offset = self.file.section(0)[0]
+        self.records_offset, records_size = self.file.section(1)
+        self.count = records_size // RECORD.size
+
+    def close(self):
+        self.file.close()
+
+    def might_contain(self, x):
+        """Bloom filter check; False means x is certainly not a baby step"""
+        data = self.data
+        offset = self.bloom_offset
+        for index in _bloom_indices(x, self.nbits):
+            if not data[offset + (index >> 3)] >> (index & 7) & 1:
+                return False
+        return True
+
+    def lookup(self, x):
+        """Baby-step indices j whose truncated x-coordinate matches x"""
+        x64 = x >> 192
+        data = self.data
+        base = self.records_offset
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if RECORD.unpack_from(data, base + mid * RECORD.size)[0] < x64:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        matches = []
+        while lo < self.count:
+            key, j = RECORD.unpack_from(data, base + lo * RECORD.size)
+            if key != x64:
+                break
+            matches.append(j)
+            lo += 1
+        return matches
+
+
+def search_range(range_start, range_end, pubkey, path,
+                 lanes=DEFAULT_GIANT_LANES, should_stop=None, on_progress=None, on_stage=None):
+    """Giant-step search of range_start..range_end against a baby-step table
+
+    Giant step i is centered at c_i = range_start + m + i*(2m+1), so a match
+    of x(Q - c_i*G) with x(j*G) means the key is c_i + j or c_i - j.
+    on_stage(stage, seconds) receives the time of each round per stage.
+    Returns the private key or None.
+    """
+    table = BabyStepTable(path)
+    try:
+        m = table.entries
+        stride = 2 * m + 1
+        giants = (range_end - range_start) // stride + 1
+        lanes = max(1, min(lanes, giants))
+
+        centers = [range_start + m + i * stride for i in range(lanes)]
+        points = [point_add(pubkey, point_neg(point_mul(c))) for c in centers]
+        step = point_neg(point_mul(lanes * stride))
+
+        done = 0
+        while done < giants:
+            if should_stop and should_stop():
+                return None
+
+            count = min(lanes, giants - done)
+            started = time.perf_counter()
+            for i in range(count):
+                point = points[i]
+                center = centers[i] + done * stride
+                if point is None:
+                    candidates = (center,)
+                else:
+                    x = point[0]
+                    if not table.might_contain(x):
+                        continue
+                    candidates = [center + sign * j for j in table.lookup(x) for sign in (1, -1)]
+
+                for key in candidates:
+                    if range_start <= key <= range_end and point_mul(key) == pubkey:
+                        return key
+
+            if on_stage:
+                on_stage("compare", time.perf_counter() - started)
+            if on_progress:
+                on_progress(min(count * stride, range_end - range_start + 1 - done * stride))
+
+            done += lanes
+            if done < giants:
+                started = time.perf_counter()
+                if None in points:
+                    points = [point_add(point, step) for point in points]
+                else:
+                    points = advance_lanes(points, step)
+                if on_stage:
+                    on_stage("ec", time.perf_counter() - started)
+    finally:
+        table.close()
+
+    return None
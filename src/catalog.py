@@ -0,0 +1,140 @@
+"""
+Puzzle catalog
+Loads puzzles.json, the versioned list of the 160 puzzles, on first use
+and keeps each entry as ints and bytes so the engines never re-parse hex
+or re-decode addresses. Every range is checked against the puzzle's bit
+count and every target against its address when the file is loaded.
+"""
+
+import json
+import os
+
+from keys import address_to_hash160, hash160
+from secp256k1 import deserialize_compressed
+
+CATALOG_VERSION = 1
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "puzzles.json")
+
+# Solving algorithms; the ones needing a public key only work on puzzles that have one
+ALGORITHMS = {
+    "scan": "Brute-force scan",
+    "kangaroo": "Pollard's kangaroo (needs public key)",
+    "bsgs": "Baby-step giant-step (needs public key)",
+}
+
+
+class CatalogError(ValueError):
+    """The catalog file is missing, of another version or inconsistent"""
+
+
+class Puzzle:
+    """One catalog entry
+
+    address and hash160 are None for puzzles whose target is not in the
+    catalog; pubkey (33 bytes) and point are None unless the public key is
+    known, private_key is None unless the puzzle is solved.
+    """
+
+    def __init__(self, number, bits, range_start, range_end, address=None, pubkey=None,
+                 private_key=None, solved=False):
+        self.number = number
+        self.bits = bits
+        self.range_start = range_start
+        self.range_end = range_end
+        self.address = address
+        self.hash160 = address_to_hash160(address) if address else None
+        self.pubkey = pubkey
+        self.point = deserialize_compressed(pubkey) if pubkey else None
+        self.private_key = private_key
+        self.solved = solved
+
+    @property
+    def keys(self):
+        """Number of keys in the range"""
+        return self.range_end - self.range_start + 1
+
+    @property
+    def status(self):
+        return "Solved" if self.solved else "Unsolved"
+
+    def to_dict(self):
+        """JSON-friendly form with hex strings, as in the catalog file"""
+        return {
+            "puzzle": self.number,
+            "bits": self.bits,
+            "range_start": hex(self.range_start),
+            "range_end": hex(self.range_end),
+            "address": self.address,
+            "hash160": self.hash160.hex() if self.hash160 else None,
+            "pubkey": self.pubkey.hex() if self.pubkey else None,
+            "private_key": hex(self.private_key) if self.private_key is not None else None,
+            "solved": self.solved,
+        }
+
+
+def _parse(entry):
+    number = entry["puzzle"]
+    bits = entry["bits"]
+    range_start = int(entry["range_start"], 16)
+    range_end = int(entry["range_end"], 16)
+    if (range_start, range_end) != (1 << (bits - 1), (1 << bits) - 1):
+        raise CatalogError(f"range does not match {bits} bits")
+
+    pubkey = bytes.fromhex(entry["pubkey"]) if entry.get("pubkey") else None
+    private_key = int(entry["private_key"], 16) if entry.get("private_key") else None
+    puzzle = Puzzle(
+        number, bits, range_start, range_end,
+        address=entry.get("address"),
+        pubkey=pubkey,
+        private_key=private_key,
+        solved=entry.get("solved", False)
+    )
+    if entry.get("hash160") and bytes.fromhex(entry["hash160"]) != puzzle.hash160:
+        raise CatalogError("hash160 does not match the address")
+    if pubkey and hash160(pubkey) != puzzle.hash160:
+        raise CatalogError("public key does not match the address")
+    if private_key is not None and not range_start <= private_key <= range_end:
+        raise CatalogError("private key is outside the range")
+    return puzzle
+
+
+def load_catalog(path=CATALOG_PATH):
+    """Read and check a catalog file, returns {puzzle number: Puzzle}"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise CatalogError(f"Cannot read puzzle catalog {path}: {e}") from e
+    if data.get("version") != CATALOG_VERSION:
+        raise CatalogError(f"Puzzle catalog {path} has version {data.get('version')}, "
+                           f"expected {CATALOG_VERSION}")
+
+    puzzles = {}
+    for entry in data["puzzles"]:
+        try:
+            puzzle = _parse(entry)
+        except (KeyError, ValueError) as e:
+            raise CatalogError(f"Puzzle #{entry.get('puzzle')} in {path}: {e}") from e
+        puzzles[puzzle.number] = puzzle
+    return puzzles
+
+
+_catalog = None
+
+
+def catalog():
+    """The bundled catalog, loaded on first use"""
+    global _catalog
+    if _catalog is None:
+        _catalog = load_catalog()
+    return _catalog
+
+
+def get_puzzle(number):
+    """The Puzzle with this number, or None"""
+    return catalog().get(number)
+
+
+def all_puzzles():
+    """Every puzzle in number order"""
+    return [puzzle for _, puzzle in sorted(catalog().items())]
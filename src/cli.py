@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Bitcoin Puzzle Solver - command line and headless worker
+Runs the solver without Qt and prints progress as JSON lines on stdout, one
+object per event, so schedulers and scripts can follow it. SIGTERM or
+SIGINT stops the search cleanly and checkpoints the scanned ranges.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+import benchmark
+import bitcrack
+import bsgs
+import catalog
+import coordinator
+import dpstore
+import hashing
+import kangaroo
+import permutation
+import profiling
+import service
+import tables
+import topology
+from engine import BACKENDS, DEFAULT_BACKEND, DEFAULT_BATCH_SIZE
+from journal import DEFAULT_CHECKPOINT_DIR
+from solver import (
+    ALGORITHMS, CheckpointOptions, CoordinatorOptions, EngineOptions, SearchOptions, Solver,
+    TelemetryOptions
+)
+from telemetry import DEFAULT_SAMPLE_INTERVAL
+
+EXIT_FOUND = 0
+EXIT_ERROR = 1
+EXIT_NOT_FOUND = 3
+EXIT_REGRESSION = 4
+
+
+class JsonLines:
+    """Write one JSON object per line, safe to call from several threads
+
+    If the reader goes away, output is dropped and on_closed() is called
+    once.
+    """
+
+    def __init__(self, stream=sys.stdout, on_closed=None):
+        self.stream = stream
+        self.on_closed = on_closed
+        # Reentrant: the signal handler may log while the main thread holds it
+        self.lock = threading.RLock()
+        self.start_time = time.monotonic()
+
+    def emit(self, event, **fields):
+        record = {"time": round(time.time(), 3), "event": event, **fields}
+        line = json.dumps(record)
+        with self.lock:
+            if self.stream is None:
+                return
+            try:
+                self.stream.write(line + "\n")
+                self.stream.flush()
+            except BrokenPipeError:
+                self.stream = None
+                # Keep the interpreter from flushing the dead pipe again at exit
+                sys.stdout = open(os.devnull, "w")
+                if self.on_closed:
+                    self.on_closed()
+
+
+def list_puzzles(args):
+    out = JsonLines()
+    try:
+        puzzles = catalog.all_puzzles()
+    except catalog.CatalogError as e:
+        out.emit("error", message=str(e))
+        return EXIT_ERROR
+    for puzzle in puzzles:
+        if args.unsolved and puzzle.solved:
+            continue
+        out.emit("puzzle", **puzzle.to_dict())
+    return 0
+
+
+def solve(args):
+    out = JsonLines()
+    result = {"status": None, "key": None, "rate": 0.0}
+
+    def on_status(status):
+        result["status"] = status
+        out.emit("status", status=status)
+
+    def on_rate(rate):
+        result["rate"] = rate
+
+    def on_keys(total):
+        elapsed = time.monotonic() - out.start_time
+        out.emit("keys", keys=total, elapsed=round(elapsed, 3), rate=round(result["rate"]))
+
+    def on_solution(private_key):
+        result["key"] = private_key
+        out.emit("solution", puzzle=args.puzzle, private_key=private_key)
+
+    solver = Solver(
+        args.puzzle, args.wallet,
+        search=SearchOptions(
+            algorithm=args.algorithm,
+            dp_bits=args.dp_bits,
+            bsgs_memory_mb=args.bsgs_memory,
+            targets=args.targets or [],
+            scan_order=args.order,
+            seed=args.seed,
+            chunk_bits=args.chunk_bits
+        ),
+        engine=EngineOptions(
+            workers=args.workers,
+            batch_size=args.batch_size,
+            backend=args.backend,
+            hasher=args.hasher,
+            placement=args.placement,
+            smt=args.smt,
+            adaptive=args.adaptive,
+            use_gpu=args.gpu,
+            bitcrack_path=args.bitcrack,
+            gpu_chunk_bits=args.gpu_chunk_bits,
+            engine_config=args.engines,
+            hybrid=args.hybrid
+        ),
+        checkpoint=CheckpointOptions(
+            checkpoint_dir=args.checkpoint_dir,
+            table_dir=args.table_dir,
+            dp_dir=args.dp_dir
+        ),
+        coordinator=CoordinatorOptions(url=args.coordinator, node=args.node, nodes=args.nodes),
+        telemetry=TelemetryOptions(
+            sample_interval=args.interval,
+            metrics_port=args.metrics_port,
+            profile_dir=args.profile
+        ),
+        on_progress=lambda message: out.emit("progress", message=message),
+        on_status=on_status,
+        on_keys=on_keys,
+        on_rate=on_rate,
+        on_solution=on_solution
+    )
+
+    def on_signal(signum, frame):
+        solver.stop()
+
+    out.on_closed = solver.stop
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    solver.run()
+    if result["key"] is not None:
+        return EXIT_FOUND
+    if result["status"] == "Error":
+        return EXIT_ERROR
+    return EXIT_NOT_FOUND
+
+
+def run_benchmarks(args):
+    out = JsonLines()
+    try:
+        history = benchmark.load_history(args.history)
+        cases = benchmark.suite(args.engines, args.puzzles, args.planted)
+        tables.install_generator_table(args.table_dir)
+    except (OSError, ValueError) as e:
+        out.emit("error", message=str(e))
+        return EXIT_ERROR
+
+    results = []
+    for engine, target in cases:
+        out.emit("case", case=benchmark.case_name(engine, target))
+        result = benchmark.run_isolated(engine, target, args.timeout, args.table_dir, args.seed)
+        out.emit("result", **result)
+        results.append(result)
+
+    failed = benchmark.over_budget(results)
+    if args.threshold is not None:
+        failed += benchmark.regressions(history["baseline"], results, args.threshold)
+    for case, metric, old, new, percent in failed:
+        out.emit("regression", case=case, metric=metric, baseline=old, value=new, percent=percent)
+    benchmark.record_run(history, results, args.update_baseline)
+    try:
+        benchmark.save_history(history, args.history)
+    except OSError as e:
+        out.emit("error", message=f"Cannot write {args.history}: {e}")
+        return EXIT_ERROR
+    if any("error" in result for result in results):
+        return EXIT_ERROR
+    if failed:
+        return EXIT_REGRESSION
+    return 0
+
+
+def merge_dps(args):
+    out = JsonLines()
+    try:
+        puzzle = catalog.get_puzzle(args.puzzle)
+    except catalog.CatalogError as e:
+        out.emit("error", message=str(e))
+        return EXIT_ERROR
+    if puzzle is None or puzzle.point is None:
+        out.emit("error", message=f"Puzzle #{args.puzzle} not found or has no known public key")
+        return EXIT_ERROR
+
+    directory = dpstore.puzzle_dir(args.dp_dir, args.puzzle)
+    inputs = dpstore.find_worker_files(args.inputs or [directory])
+
+    def check(entry_a, entry_b):
+        return kangaroo.collision_key(puzzle.range_start, puzzle.range_end, puzzle.point, entry_a, entry_b)
+
+    try:
+        store = dpstore.DPStore(args.store or os.path.join(directory, "store"), args.puzzle)
+        key, added = store.merge(inputs, check, args.run_records)
+    except (OSError, dpstore.DPStoreError) as e:
+        out.emit("error", message=str(e))
+        return EXIT_ERROR
+    out.emit("merged", puzzle=args.puzzle, files=len(inputs), added=added, records=store.records)
+    if key is None:
+        return EXIT_NOT_FOUND
+    out.emit("solution", puzzle=args.puzzle, private_key=f"{key:064x}")
+    return EXIT_FOUND
+
+
+def bench_hash(args):
+    out = JsonLines()
+    for name in args.hashers or sorted(hashing.HASHERS):
+        rate = hashing.benchmark(name, args.batch_size, args.rounds)
+        out.emit("benchmark", stage="hash160", hasher=name, batch_size=args.batch_size,
+                 rounds=args.rounds, rate=round(rate))
+    return 0
+
+
+def bench_micro(args):
+    out = JsonLines()
+    for primitive in args.primitives or profiling.PRIMITIVES:
+        try:
+            ns = profiling.microbenchmark(
+                primitive, args.backend, args.hasher, args.batch_size, args.rounds, args.seed
+            )
+        except ValueError as e:
+            out.emit("error", message=str(e))
+            return EXIT_ERROR
+        out.emit("benchmark", primitive=primitive, backend=args.backend, hasher=args.hasher,
+                 batch_size=args.batch_size, ns_per_key=round(ns, 1), rate=round(1e9 / ns))
+    return 0
+
+
+def serve_coordinator(args):
+    out = JsonLines()
+    store = coordinator.WorkStore(args.db, unit_seconds=args.unit_seconds)
+    for puzzle_num in args.puzzles:
+        try:
+            puzzle = catalog.get_puzzle(puzzle_num)
+        except catalog.CatalogError as e:
+            out.emit("error", message=str(e))
+            return EXIT_ERROR
+        if not puzzle or not puzzle.address:
+            out.emit("error", message=f"Puzzle #{puzzle_num} not found or has no target address")
+            return EXIT_ERROR
+        store.add_puzzle(puzzle_num, puzzle.address, puzzle.range_start, puzzle.range_end)
+
+    try:
+        server = coordinator.CoordinatorServer(store, args.port, args.host)
+    except OSError as e:
+        out.emit("error", message=f"Cannot listen on {args.host}:{args.port}: {e}")
+        return EXIT_ERROR
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stopped.set())
+
+    server.start()
+    out.emit("listening", url=f"http://{args.host}:{server.port}", db=args.db, puzzles=args.puzzles)
+    while not stopped.wait(args.interval):
+        out.emit("coordinator", puzzles=store.status())
+    server.close()
+    store.close()
+    return 0
+
+
+def serve_solver(args):
+    out = JsonLines()
+    solver_service = service.SolverService(args.socket, args.history)
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, solver_service.request_shutdown)
+        await solver_service.serve(lambda: out.emit("listening", socket=args.socket))
+
+    try:
+        asyncio.run(serve())
+    except (service.ServiceError, OSError) as e:
+        out.emit("error", message=str(e))
+        return EXIT_ERROR
+    out.emit("shutdown", socket=args.socket)
+    return 0
+
+
+def service_status(args):
+    out = JsonLines()
+
+    def on_event(record):
+        out.emit(record.pop("event"), **record)
+
+    try:
+        if args.stop or args.shutdown:
+            reply = service.call(args.socket, "shutdown" if args.shutdown else "stop")
+            on_event(reply)
+            return 0
+        if not args.follow:
+            on_event(service.call(args.socket, "status"))
+            return 0
+        asyncio.run(service.follow(args.socket, on_event, args.replay))
+    except service.ServiceError as e:
+        out.emit("error", message=str(e))
+        return EXIT_ERROR
+    except (FileNotFoundError, ConnectionRefusedError):
+        out.emit("error", message=f"No solver service on {args.socket}")
+        return EXIT_ERROR
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Bitcoin Puzzle Solver (headless)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    puzzles = commands.add_parser("puzzles", help="list the puzzle catalog")
+    puzzles.add_argument("--unsolved", action="store_true", help="only puzzles without a known key")
+    puzzles.set_defaults(func=list_puzzles)
+
+    run = commands.add_parser(
+        "solve", help="search one puzzle",
+        epilog=f"Exit status: {EXIT_FOUND} key found, {EXIT_NOT_FOUND} no key "
+               f"(range exhausted or stopped), {EXIT_ERROR} error."
+    )
+    run.add_argument("puzzle", type=int, help="puzzle number")
+    run.add_argument("--algorithm", choices=sorted(ALGORITHMS), default="scan")
+    run.add_argument("--wallet", help="your wallet address")
+    run.add_argument("--gpu", action="store_true", help="scan with BitCrack if it is installed")
+    run.add_argument("--bitcrack", help="path to the BitCrack binary")
+    run.add_argument("--gpu-chunk-bits", type=int, default=bitcrack.DEFAULT_CHUNK_BITS,
+                     help="keys per BitCrack process as a power of two")
+    run.add_argument("--engines", metavar="CONFIG",
+                     help="scan with the external engine processes of a JSON config (see supervisor.py)")
+    run.add_argument("--hybrid", action="store_true",
+                     help="run CPU workers alongside BitCrack (with --gpu) or the --engines config")
+    run.add_argument("--workers", type=int, help="CPU worker processes (default: one per core)")
+    run.add_argument("--placement", default=topology.DEFAULT_PLACEMENT, metavar="MODE",
+                     help="pin workers to CPUs: auto (on multi-node machines), on, off, "
+                          "or a CPU list such as 0-7,16-23")
+    run.add_argument("--no-smt", dest="smt", action="store_false",
+                     help="leave SMT siblings unused, one worker per physical core")
+    run.add_argument("--adaptive", action="store_true",
+                     help="change the number of active workers, up to --workers, with the CPU quota, "
+                          "load average and keys/sec (sequential scans)")
+    run.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                     help="keys per batched inversion in the CPU scanner")
+    run.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                     help="field arithmetic of the CPU scanner")
+    run.add_argument("--hasher", choices=sorted(hashing.HASHERS), default=hashing.DEFAULT_HASHER,
+                     help="hash160 stage of the CPU scanner")
+    run.add_argument("--order", choices=permutation.ORDERS, default="sequential",
+                     help="scan the range from its start, or its chunks in a seeded random order")
+    run.add_argument("--seed", help="random order seed (default: this installation's own)")
+    run.add_argument("--chunk-bits", type=int, default=permutation.DEFAULT_CHUNK_BITS,
+                     help="keys per random order chunk as a power of two")
+    run.add_argument("--node", type=int, default=0,
+                     help="this machine's number, 0..NODES-1, among machines sharing a seed")
+    run.add_argument("--nodes", type=int, default=1, help="machines sharing the random order seed")
+    run.add_argument("--dp-bits", type=int, help="kangaroo distinguished point bits (default: auto)")
+    run.add_argument("--dp-dir", help="append kangaroo distinguished points here for dp-merge")
+    run.add_argument("--target", dest="targets", type=int, action="append", metavar="N",
+                     help="another puzzle for the same kangaroo run, sharing its tame herd (repeatable)")
+    run.add_argument("--bsgs-memory", type=int, default=bsgs.DEFAULT_MEMORY_MB,
+                     help="BSGS bloom filter size in MB")
+    run.add_argument("--table-dir", default=tables.DEFAULT_TABLE_DIR)
+    run.add_argument("--checkpoint-dir", default=DEFAULT_CHECKPOINT_DIR)
+    run.add_argument("--interval", type=float, default=DEFAULT_SAMPLE_INTERVAL,
+                     help="seconds between progress records")
+    run.add_argument("--metrics-port", type=int,
+                     help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics")
+    run.add_argument("--coordinator", metavar="URL",
+                     help="scan units leased from a coordinator instead of the whole range")
+    run.add_argument("--profile", nargs="?", const=profiling.DEFAULT_PROFILE_DIR, metavar="DIR",
+                     help="profile the engine processes and write a report under DIR "
+                          f"(default: {profiling.DEFAULT_PROFILE_DIR})")
+    run.set_defaults(func=solve)
+
+    merge = commands.add_parser(
+        "dp-merge", help="merge kangaroo distinguished point files and look for a collision",
+        epilog=f"Exit status: {EXIT_FOUND} key found, {EXIT_NOT_FOUND} no collision, {EXIT_ERROR} error."
+    )
+    merge.add_argument("puzzle", type=int, help="puzzle number")
+    merge.add_argument("inputs", nargs="*",
+                       help="DP files or directories (default: the puzzle's files under --dp-dir)")
+    merge.add_argument("--dp-dir", default=dpstore.DEFAULT_DP_DIR)
+    merge.add_argument("--store", help="sorted store directory (default: store under the puzzle's DP directory)")
+    merge.add_argument("--run-records", type=int, default=dpstore.RUN_RECORDS,
+                       help="records sorted in memory at a time")
+    merge.set_defaults(func=merge_dps)
+
+    suite = commands.add_parser(
+        "bench", help="time the engines on solved puzzles and planted keys",
+        epilog=f"Exit status: 0 ok, {EXIT_REGRESSION} a metric regressed past --threshold or the GUI "
+               f"startup broke its budget, {EXIT_ERROR} error."
+    )
+    engines = [*benchmark.ENGINES, benchmark.MULTI_ENGINE, benchmark.GUI_ENGINE]
+    suite.add_argument("--engine", dest="engines", action="append", choices=sorted(engines),
+                       help="engine to run, may be repeated (default: all)")
+    suite.add_argument("--puzzle", dest="puzzles", type=int, action="append",
+                       help="solved catalog puzzle to run, may be repeated")
+    suite.add_argument("--planted", type=int, action="append", metavar="BITS",
+                       help="synthetic BITS-bit range with a planted key, may be repeated")
+    suite.add_argument("--seed", type=int, default=benchmark.DEFAULT_SEED, help="seed for planted keys")
+    suite.add_argument("--timeout", type=float, default=benchmark.DEFAULT_TIMEOUT,
+                       help="seconds before a case is stopped")
+    suite.add_argument("--history", default=benchmark.DEFAULT_HISTORY_PATH, help="JSON history file")
+    suite.add_argument("--threshold", type=float, metavar="PERCENT",
+                       help="fail if a metric is this much worse than the baseline")
+    suite.add_argument("--update-baseline", action="store_true",
+                       help="make this run the baseline for its cases")
+    suite.add_argument("--table-dir", default=tables.DEFAULT_TABLE_DIR)
+    suite.set_defaults(func=run_benchmarks)
+
+    bench = commands.add_parser("bench-hash", help="measure the hash160 stages on their own")
+    bench.add_argument("--hasher", dest="hashers", action="append", choices=sorted(hashing.HASHERS),
+                       help="stage to measure, may be repeated (default: all)")
+    bench.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    bench.add_argument("--rounds", type=int, default=20)
+    bench.set_defaults(func=bench_hash)
+
+    micro = commands.add_parser("bench-micro", help="time each primitive of the scanning hot path")
+    micro.add_argument("--primitive", dest="primitives", action="append", choices=profiling.PRIMITIVES,
+                       help="primitive to measure, may be repeated (default: all)")
+    micro.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                       help="field arithmetic for the EC primitives")
+    micro.add_argument("--hasher", choices=sorted(hashing.HASHERS), default=hashing.DEFAULT_HASHER,
+                       help="stage for hash160 and compare")
+    micro.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    micro.add_argument("--rounds", type=int, default=10, help="rounds per primitive, the best is kept")
+    micro.add_argument("--seed", type=int)
+    micro.set_defaults(func=bench_micro)
+
+    serve = commands.add_parser("coordinator", help="hand out leased work units to solve workers")
+    serve.add_argument("puzzles", type=int, nargs="+", help="puzzle numbers to coordinate")
+    serve.add_argument("--host", default="127.0.0.1",
+                       help="address to listen on (0.0.0.0 for other machines)")
+    serve.add_argument("--port", type=int, default=coordinator.DEFAULT_PORT)
+    serve.add_argument("--db", default=coordinator.DEFAULT_DB_PATH, help="SQLite database of units")
+    serve.add_argument("--unit-seconds", type=float, default=coordinator.DEFAULT_UNIT_SECONDS,
+                       help="target time per work unit at the worker's rate")
+    serve.add_argument("--interval", type=float, default=60.0, help="seconds between status records")
+    serve.set_defaults(func=serve_coordinator)
+
+    daemon = commands.add_parser(
+        "serve", help="run solves in a background service that monitors attach to"
+    )
+    daemon.add_argument("--socket", default=service.DEFAULT_SOCKET_PATH, help="Unix socket to listen on")
+    daemon.add_argument("--history", type=int, default=service.DEFAULT_HISTORY,
+                        help="log and status events kept for monitors that attach later")
+    daemon.set_defaults(func=serve_solver)
+
+    status = commands.add_parser(
+        "status", help="show or follow the run of a background service",
+        epilog=f"Exit status: 0 ok, {EXIT_ERROR} no service is running."
+    )
+    status.add_argument("--socket", default=service.DEFAULT_SOCKET_PATH)
+    status.add_argument("--follow", action="store_true",
+                        help="replay recent events, then print new ones until interrupted")
+    status.add_argument("--replay", type=int, metavar="N", help="replay only the last N events")
+    status.add_argument("--stop", action="store_true", help="stop the current run")
+    status.add_argument("--shutdown", action="store_true", help="stop the run and the service")
+    status.set_defaults(func=service_status)
+    return parser
+
+
+def main(argv=None):
+    """Command line entry point"""
+    multiprocessing.freeze_support()
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""
+Adaptive worker count for shared and CPU-limited hosts
+Reads the cgroup CPU quota and throttling counters (cgroup v2 cpu.max and
+cpu.stat, or v1 cpu.cfs_quota_us and cpu.stat) and the load average, and
+changes how many CPU workers scan while the run goes on.
+
+The quota and the CPUs other jobs leave free cap the worker count. Below
+that cap the controller hill-climbs on the measured keys/sec: it tries one
+worker more or less, keeps the change if the rate goes up and goes back
+otherwise, then holds for a few windows before trying again. It does not
+try to grow while the cgroup is being throttled. Workers are parked, not
+killed, so their running chunks finish (see HybridScheduler.set_active).
+"""
+
+import math
+import os
+import time
+
+from engine import DEFAULT_BACKEND, DEFAULT_BATCH_SIZE
+from hashing import DEFAULT_HASHER
+from hybrid import HybridScheduler
+from parallel import default_workers
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+PROC_CGROUP = "/proc/self/cgroup"
+# Keys/sec are compared over windows of this length, each starting this
+# long after a change so parked workers have finished their chunks
+WINDOW_SECONDS = 15.0
+SETTLE_SECONDS = 5.0
+# A change is kept only if the rate improves by more than this fraction
+TOLERANCE = 0.03
+# Windows to stay at a count after a change was undone
+HOLD_WINDOWS = 4
+# No growth while more than this fraction of cgroup periods are throttled
+THROTTLE_LIMIT = 0.2
+# Time constant of the 1-minute load average
+LOAD_SECONDS = 60.0
+# Shorter chunks than a fixed pool, so parked workers stop sooner
+CHUNK_SECONDS = 10.0
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read().strip()
+
+
+def _stat(path):
+    """Fields of a cpu.stat file as ints"""
+    fields = {}
+    for line in _read(path).splitlines():
+        name, _, value = line.partition(" ")
+        if value.strip().isdigit():
+            fields[name] = int(value)
+    return fields
+
+
+def _cgroup_dirs(root, proc):
+    """(version, directory) of this process's cpu controller, innermost first
+
+    Each directory is followed by its ancestors, since a parent's quota
+    limits the child too. Inside a container the cgroup is mounted at the
+    root, so that is tried last.
+    """
+    try:
+        lines = _read(proc).splitlines()
+    except OSError:
+        lines = []
+    candidates = []
+    for line in lines:
+        hierarchy, controllers, path = line.split(":", 2)
+        if hierarchy == "0" and not controllers:
+            candidates.append((2, root, path))
+        elif "cpu" in controllers.split(","):
+            candidates += [(1, os.path.join(root, name), path) for name in (controllers, "cpu")]
+    candidates.append((2, root, "/"))
+
+    result = []
+    for version, base, path in candidates:
+        marker = "cpu.max" if version == 2 else "cpu.cfs_quota_us"
+        directory = os.path.normpath(os.path.join(base, path.lstrip("/")))
+        if not os.path.exists(os.path.join(directory, marker)):
+            directory = base
+            if not os.path.exists(os.path.join(directory, marker)):
+                continue
+        while True:
+            result.append((version, directory))
+            if os.path.normpath(directory) == os.path.normpath(base):
+                break
+            directory = os.path.dirname(directory)
+        return result
+    return result
+
+
+class HostSample:
+    """CPU limits and load of the host as seen by this process"""
+
+    def __init__(self, cpus, quota=None, periods=0, throttled=0, load=None):
+        self.cpus = cpus
+        # CPUs' worth of run time the cgroup may use, None if unlimited
+        self.quota = quota
+        self.periods = periods
+        self.throttled = throttled
+        # 1-minute load average, None where the platform has none
+        self.load = load
+
+
+def available_cpus():
+    """CPUs this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def sample_host(root=CGROUP_ROOT, proc=PROC_CGROUP):
+    """Read the cgroup CPU quota and throttling counters and the load average"""
+    sample = HostSample(available_cpus())
+    try:
+        sample.load = os.getloadavg()[0]
+    except (AttributeError, OSError):
+        pass
+
+    stat_read = False
+    for version, directory in _cgroup_dirs(root, proc):
+        try:
+            if version == 2:
+                quota, _, period = _read(os.path.join(directory, "cpu.max")).partition(" ")
+                quota = None if quota == "max" else int(quota)
+                period = int(period or 100000)
+            else:
+                quota = int(_read(os.path.join(directory, "cpu.cfs_quota_us")))
+                quota = None if quota < 0 else quota
+                period = int(_read(os.path.join(directory, "cpu.cfs_period_us")))
+            if quota is not None and period > 0:
+                cpus = quota / period
+                sample.quota = cpus if sample.quota is None else min(sample.quota, cpus)
+            if not stat_read:
+                # Throttling of the innermost group, where the workers run
+                fields = _stat(os.path.join(directory, "cpu.stat"))
+                sample.periods = fields.get("nr_periods", 0)
+                sample.throttled = fields.get("nr_throttled", 0)
+                stat_read = True
+        except (OSError, ValueError):
+            continue
+    return sample
+
+
+class ConcurrencyController:
+    """Pick the number of active workers from keys/sec and host limits
+
+    start() gives the first count; update() is called with the keys
+    checked so far as the run goes on and returns a log line whenever
+    target changes. sample is called for a fresh HostSample at the end of
+    every measuring window.
+    """
+
+    def __init__(self, max_workers, min_workers=1, sample=sample_host, window_seconds=WINDOW_SECONDS,
+                 settle_seconds=SETTLE_SECONDS, tolerance=TOLERANCE, hold_windows=HOLD_WINDOWS):
+        self.max_workers = max(1, max_workers)
+        self.min_workers = max(1, min(min_workers, self.max_workers))
+        self.sample = sample
+        self.window_seconds = window_seconds
+        self.settle_seconds = settle_seconds
+        self.tolerance = tolerance
+        self.hold_windows = hold_windows
+
+        self.target = self.max_workers
+        self.direction = -1
+        self.hold = 0
+        # (workers, keys/sec) a trial count is compared against
+        self.trial = None
+        self.ceiling = self.max_workers
+        # Our share of the load average, decayed the way the kernel does
+        self.own_load = 0.0
+        self.last_sample = None
+        self.window_begin = None
+        self.window_keys = None
+        self.measure_from = None
+
+    def _limit(self, sample):
+        """Most workers the host has room for, and why"""
+        ceiling, reason = self.max_workers, f"{self.max_workers} workers configured"
+        if sample.quota is not None and math.ceil(sample.quota) < ceiling:
+            ceiling = math.ceil(sample.quota)
+            reason = f"cgroup quota of {sample.quota:g} CPUs"
+        if sample.load is not None:
+            others = max(0.0, sample.load - self.own_load)
+            free = int(sample.cpus - others + 0.5)
+            if free < ceiling:
+                ceiling = max(self.min_workers, free)
+                reason = f"load average {sample.load:.2f} leaves {max(free, 0)} of {sample.cpus} CPUs"
+                if free < self.min_workers:
+                    reason += f", keeping the minimum of {ceiling}"
+        return max(self.min_workers, ceiling), reason
+
+    def _throttled(self, sample):
+        """Fraction of cgroup periods throttled since the last sample"""
+        last = self.last_sample
+        if last is None or sample.periods <= last.periods:
+            return 0.0
+        return (sample.throttled - last.throttled) / (sample.periods - last.periods)
+
+    def start(self, now=None):
+        """First worker count, and the log line saying why"""
+        now = time.monotonic() if now is None else now
+        sample = self.sample()
+        self.ceiling, reason = self._limit(sample)
+        self.target = self.ceiling
+        self.last_sample = sample
+        self.window_begin = now
+        self.measure_from = now + self.settle_seconds
+        return f"Workers: {self.target} of {self.max_workers} ({reason})"
+
+    def update(self, keys, now=None):
+        """Feed the keys checked so far; returns a log line if target changed"""
+        now = time.monotonic() if now is None else now
+        if self.measure_from is None or now < self.measure_from:
+            return None
+        if self.window_keys is None:
+            self.window_keys = keys
+            self.window_begin = now
+            return None
+        elapsed = now - self.window_begin
+        if elapsed < self.window_seconds:
+            return None
+
+        rate = (keys - self.window_keys) / elapsed
+        sample = self.sample()
+        decay = math.exp(-elapsed / LOAD_SECONDS)
+        self.own_load = self.own_load * decay + self.target * (1 - decay)
+        throttled = self._throttled(sample)
+        self.last_sample = sample
+
+        previous = self.target
+        reason = self._decide(rate, throttled, sample)
+        self.window_keys = None
+        self.measure_from = now + (self.settle_seconds if self.target != previous else 0)
+        if reason is None:
+            return None
+        if self.target == previous:
+            return f"Workers: staying at {self.target}: {reason}"
+        return f"Workers: {previous} -> {self.target}: {reason}"
+
+    def _decide(self, rate, throttled, sample):
+        """Move target for one measured window; returns the reason or None"""
+        ceiling, why = self._limit(sample)
+        grown = ceiling > self.ceiling
+        self.ceiling = ceiling
+        if self.target > ceiling:
+            self.target = ceiling
+            self.trial = None
+            self.hold = self.hold_windows
+            return why
+        if grown and self.trial is None:
+            # Room came back: try it at the next window
+            self.direction = 1
+            self.hold = 0
+
+        if self.trial is not None:
+            workers, base = self.trial
+            self.trial = None
+            if rate <= base * (1 + self.tolerance):
+                tried, self.target = self.target, workers
+                self.direction = -self.direction
+                self.hold = self.hold_windows
+                return f"{rate:,.0f} keys/sec at {tried} is no better than {base:,.0f} at {workers}"
+            # Better: keep going the same way from here
+            return self._probe(rate, throttled, f"{rate:,.0f} keys/sec, up from {base:,.0f} at {workers}")
+
+        if self.hold:
+            self.hold -= 1
+            return None
+        return self._probe(rate, throttled)
+
+    def _probe(self, rate, throttled, reason=None):
+        """Try one worker more or less; reason says why the current count was kept
+
+        After a kept change only the same way is tried; turning back would
+        retry the count just left.
+        """
+        directions = (self.direction,) if reason else (self.direction, -self.direction)
+        for direction in directions:
+            workers = self.target + direction
+            if direction > 0 and throttled > THROTTLE_LIMIT:
+                continue
+            if self.min_workers <= workers <= self.ceiling:
+                break
+        else:
+            self.hold = self.hold_windows
+            return reason
+        self.direction = direction
+        self.trial = (self.target, rate)
+        self.target = workers
+        trying = f"trying {workers} ({rate:,.0f} keys/sec at {self.trial[0]})"
+        if throttled > THROTTLE_LIMIT:
+            trying += f", throttled in {throttled:.0%} of cgroup periods"
+        return f"{reason}; {trying}" if reason else trying
+
+
+class AdaptiveScanner(HybridScheduler):
+    """Scan intervals with CPU workers whose number follows a ConcurrencyController
+
+    Up to workers processes are started as they are first needed. notes
+    collects the controller's log lines for the solver to show.
+    """
+
+    def __init__(self, intervals, target, workers=None, batch_size=DEFAULT_BATCH_SIZE,
+                 backend=DEFAULT_BACKEND, hasher=DEFAULT_HASHER, setup=None, profile_dir=None,
+                 placement=None, controller=None):
+        workers = workers or default_workers()
+        super().__init__(
+            intervals, target, None, (), workers, batch_size, backend, hasher, setup, profile_dir,
+            placement=placement, chunk_seconds=CHUNK_SECONDS
+        )
+        self.controller = controller or ConcurrencyController(workers)
+        self.notes = []
+
+    def start(self):
+        self.notes.append(self.controller.start())
+        self.set_active(self.controller.target)
+        super().start()
+
+    def poll(self, timeout=0.0):
+        over = super().poll(timeout)
+        if not over:
+            note = self.controller.update(self.total_keys())
+            if note:
+                self.notes.append(note)
+                self.set_active(self.controller.target)
+        return over
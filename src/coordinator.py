@@ -0,0 +1,386 @@
+"""
+Work-unit coordinator for scanning a puzzle on many machines
+Hands out subranges of a puzzle as leased work units over a small JSON/HTTP
+protocol. Units are sized to each worker's reported rate, leases expire
+unless renewed by heartbeats and expired units are handed out again.
+Completed units are recorded in an SQLite database, and a verified key
+cancels every outstanding lease of its puzzle.
+
+Protocol (POST, JSON bodies and replies):
+    /lease      {"worker", "puzzle", "rate"} -> {"status": "leased", "lease",
+                "start", "end", "lease_seconds"} or {"status": "wait" |
+                "exhausted" | "found" | "unknown"}
+    /heartbeat  {"worker", "lease"} -> {"active": bool}
+    /complete   {"worker", "lease", "key"} -> {"status": "done" | "found" |
+                "rejected"}
+    /release    {"worker", "lease"} -> {"released": bool}, for a unit the
+                worker could not finish
+    GET /status -> per-puzzle progress
+"""
+
+import contextlib
+import http.server
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.request
+
+from keys import private_key_to_address
+
+DEFAULT_PORT = 8650
+DEFAULT_DB_PATH = os.path.join(
+    os.path.expanduser("~"), ".local", "share", "bitcoin-puzzle-solver", "coordinator.db"
+)
+# Units take about this long at the worker's reported rate
+DEFAULT_UNIT_SECONDS = 600.0
+# First unit of a worker that has not reported a rate yet; small, so the
+# worker soon comes back with its measured rate
+DEFAULT_UNIT_KEYS = 1 << 20
+MIN_UNIT_KEYS = 1 << 16
+# A lease lasts this fraction of a unit's duration unless renewed by heartbeats
+LEASE_FACTOR = 0.5
+MIN_LEASE_SECONDS = 60.0
+HEARTBEAT_INTERVAL = 10.0
+WAIT_SECONDS = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS puzzles (
+    puzzle INTEGER PRIMARY KEY,
+    address TEXT NOT NULL,
+    range_start TEXT NOT NULL,
+    range_end TEXT NOT NULL,
+    cursor TEXT NOT NULL,
+    found_key TEXT,
+    found_by TEXT
+);
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY,
+    puzzle INTEGER NOT NULL,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    state TEXT NOT NULL,
+    worker TEXT,
+    expires REAL,
+    issued INTEGER NOT NULL DEFAULT 0,
+    completed REAL
+);
+CREATE INDEX IF NOT EXISTS units_state ON units (puzzle, state, start);
+"""
+
+
+def _hex(value):
+    # Fixed width so that SQLite orders keys numerically
+    return f"{value:064x}"
+
+
+class CoordinatorError(Exception):
+    """Coordinator unreachable or replied with an error"""
+
+
+class WorkStore:
+    """Durable record of a puzzle's units and leases
+
+    Every call runs as one transaction, so a crash never loses a recorded
+    completion and a found key cancels all leases atomically.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, unit_seconds=DEFAULT_UNIT_SECONDS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.unit_seconds = unit_seconds
+        self.lease_seconds = max(MIN_LEASE_SECONDS, unit_seconds * LEASE_FACTOR)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.db
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def add_puzzle(self, puzzle_num, address, range_start, range_end):
+        """Register a puzzle; a puzzle that is already known keeps its state"""
+        with self._transaction() as db:
+            db.execute(
+                "INSERT OR IGNORE INTO puzzles (puzzle, address, range_start, range_end, cursor) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (puzzle_num, address, _hex(range_start), _hex(range_end), _hex(range_start))
+            )
+
+    def unit_size(self, rate):
+        if not rate:
+            return DEFAULT_UNIT_KEYS
+        return max(MIN_UNIT_KEYS, int(rate * self.unit_seconds))
+
+    def lease(self, worker, puzzle_num, rate=None, now=None):
+        """Lease the next unit of a puzzle to a worker"""
+        now = time.time() if now is None else now
+        size = self.unit_size(rate)
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT range_end, cursor, found_key FROM puzzles WHERE puzzle = ?", (puzzle_num,)
+            ).fetchone()
+            if row is None:
+                return {"status": "unknown"}
+            range_end, cursor, found_key = int(row[0], 16), int(row[1], 16), row[2]
+            if found_key:
+                return {"status": "found"}
+
+            # Expired leases go back to the pool
+            db.execute(
+                "UPDATE units SET state = 'pending', worker = NULL "
+                "WHERE puzzle = ? AND state = 'leased' AND expires < ?",
+                (puzzle_num, now)
+            )
+
+            unit = db.execute(
+                "SELECT id, start, end FROM units WHERE puzzle = ? AND state = 'pending' "
+                "ORDER BY start LIMIT 1",
+                (puzzle_num,)
+            ).fetchone()
+            if unit:
+                unit_id, start, end = unit[0], int(unit[1], 16), int(unit[2], 16)
+                if end - start + 1 > size:
+                    # Hand out a piece the worker can finish; the rest stays pending
+                    db.execute(
+                        "INSERT INTO units (puzzle, start, end, state) VALUES (?, ?, ?, 'pending')",
+                        (puzzle_num, _hex(start + size), _hex(end))
+                    )
+                    end = start + size - 1
+                db.execute(
+                    "UPDATE units SET end = ?, state = 'leased', worker = ?, expires = ?, "
+                    "issued = issued + 1 WHERE id = ?",
+                    (_hex(end), worker, now + self.lease_seconds, unit_id)
+                )
+            elif cursor <= range_end:
+                start = cursor
+                end = min(range_end, start + size - 1)
+                unit_id = db.execute(
+                    "INSERT INTO units (puzzle, start, end, state, worker, expires, issued) "
+                    "VALUES (?, ?, ?, 'leased', ?, ?, 1)",
+                    (puzzle_num, _hex(start), _hex(end), worker, now + self.lease_seconds)
+                ).lastrowid
+                db.execute("UPDATE puzzles SET cursor = ? WHERE puzzle = ?", (_hex(end + 1), puzzle_num))
+            else:
+                leased = db.execute(
+                    "SELECT MIN(expires) FROM units WHERE puzzle = ? AND state = 'leased'", (puzzle_num,)
+                ).fetchone()[0]
+                if leased is None:
+                    return {"status": "exhausted"}
+                return {"status": "wait", "retry": min(WAIT_SECONDS, max(1.0, leased - now))}
+
+        return {
+            "status": "leased",
+            "lease": unit_id,
+            "start": _hex(start),
+            "end": _hex(end),
+            "lease_seconds": self.lease_seconds
+        }
+
+    def heartbeat(self, worker, lease_id, now=None):
+        """Extend a lease; False if the worker should drop the unit"""
+        now = time.time() if now is None else now
+        with self._transaction() as db:
+            updated = db.execute(
+                "UPDATE units SET expires = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+                (now + self.lease_seconds, lease_id, worker)
+            ).rowcount
+        return updated == 1
+
+    def release(self, worker, lease_id):
+        """Put a unit the worker could not finish back in the pool"""
+        with self._transaction() as db:
+            updated = db.execute(
+                "UPDATE units SET state = 'pending', worker = NULL, expires = NULL "
+                "WHERE id = ? AND worker = ? AND state = 'leased'",
+                (lease_id, worker)
+            ).rowcount
+        return updated == 1
+
+    def complete(self, worker, lease_id, key=None, now=None):
+        """Record a finished unit, or the key a worker found in it"""
+        now = time.time() if now is None else now
+        with self._transaction() as db:
+            unit = db.execute(
+                "SELECT u.puzzle, u.start, u.end, u.state, p.address FROM units u "
+                "JOIN puzzles p ON p.puzzle = u.puzzle WHERE u.id = ?",
+                (lease_id,)
+            ).fetchone()
+            if unit is None:
+                return {"status": "rejected"}
+            puzzle_num, start, end, state, address = unit
+
+            if key is not None:
+                if not (int(start, 16) <= key <= int(end, 16)) or private_key_to_address(key) != address:
+                    return {"status": "rejected"}
+                db.execute(
+                    "UPDATE puzzles SET found_key = ?, found_by = ? WHERE puzzle = ?",
+                    (_hex(key), worker, puzzle_num)
+                )
+                db.execute(
+                    "UPDATE units SET state = 'cancelled', worker = NULL "
+                    "WHERE puzzle = ? AND state IN ('leased', 'pending')",
+                    (puzzle_num,)
+                )
+                return {"status": "found"}
+
+            # The work was done even if the lease expired meanwhile
+            if state in ("leased", "pending"):
+                db.execute(
+                    "UPDATE units SET state = 'done', worker = ?, completed = ? WHERE id = ?",
+                    (worker, now, lease_id)
+                )
+            return {"status": "done"}
+
+    def status(self):
+        """Per-puzzle progress summary"""
+        result = {}
+        with self._transaction() as db:
+            puzzles = db.execute(
+                "SELECT puzzle, range_start, range_end, found_key, found_by FROM puzzles"
+            ).fetchall()
+            for puzzle_num, range_start, range_end, found_key, found_by in puzzles:
+                counts = {"done": 0, "leased": 0, "pending": 0, "cancelled": 0}
+                keys_done = 0
+                workers = set()
+                for start, end, state, worker in db.execute(
+                    "SELECT start, end, state, worker FROM units WHERE puzzle = ?", (puzzle_num,)
+                ):
+                    counts[state] += 1
+                    if state == "done":
+                        keys_done += int(end, 16) - int(start, 16) + 1
+                    elif state == "leased":
+                        workers.add(worker)
+                total = int(range_end, 16) - int(range_start, 16) + 1
+                result[str(puzzle_num)] = {
+                    "units": counts,
+                    "keys_done": keys_done,
+                    "keys_total": total,
+                    "workers": sorted(workers),
+                    "found_key": found_key,
+                    "found_by": found_by
+                }
+        return result
+
+
+class _CoordinatorHandler(http.server.BaseHTTPRequestHandler):
+    def _reply(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/status":
+            self._reply(404, {"error": "not found"})
+            return
+        self._reply(200, self.server.store.status())
+
+    def do_POST(self):
+        store = self.server.store
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            worker = str(request["worker"])
+            if self.path == "/lease":
+                reply = store.lease(worker, int(request["puzzle"]), request.get("rate"))
+            elif self.path == "/heartbeat":
+                reply = {"active": store.heartbeat(worker, int(request["lease"]))}
+            elif self.path == "/release":
+                reply = {"released": store.release(worker, int(request["lease"]))}
+            elif self.path == "/complete":
+                key = request.get("key")
+                reply = store.complete(worker, int(request["lease"]), int(key, 16) if key else None)
+            else:
+                self._reply(404, {"error": "not found"})
+                return
+        except (KeyError, TypeError, ValueError) as e:
+            self._reply(400, {"error": f"bad request: {e}"})
+            return
+        self._reply(200, reply)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CoordinatorServer:
+    """Serve a WorkStore over HTTP"""
+
+    def __init__(self, store, port=DEFAULT_PORT, host="127.0.0.1"):
+        self.httpd = http.server.ThreadingHTTPServer((host, port), _CoordinatorHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.store = store
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def start(self):
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class CoordinatorClient:
+    """Worker side of the coordinator protocol"""
+
+    def __init__(self, url, worker=None, timeout=10.0):
+        self.url = url.rstrip("/")
+        self.worker = worker or default_worker_id()
+        self.timeout = timeout
+
+    def _post(self, path, body):
+        body = dict(body, worker=self.worker)
+        request = urllib.request.Request(
+            self.url + path,
+            data=json.dumps(body).encode(),
+            headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except (OSError, ValueError) as e:
+            raise CoordinatorError(f"{self.url}{path}: {e}") from e
+
+    def lease(self, puzzle_num, rate=None):
+        return self._post("/lease", {"puzzle": puzzle_num, "rate": rate})
+
+    def heartbeat(self, lease_id):
+        return self._post("/heartbeat", {"lease": lease_id})["active"]
+
+    def release(self, lease_id):
+        return self._post("/release", {"lease": lease_id})["released"]
+
+    def complete(self, lease_id, key=None):
+        return self._post("/complete", {"lease": lease_id, "key": f"{key:064x}" if key is not None else None})
+
+    def status(self):
+        try:
+            with urllib.request.urlopen(self.url + "/status", timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except (OSError, ValueError) as e:
+            raise CoordinatorError(f"{self.url}/status: {e}") from e
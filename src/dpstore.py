@@ -0,0 +1,305 @@
+"""
+Persistent distinguished point store for kangaroo runs
+Each kangaroo run appends its distinguished points to its own file of
+fixed-width records (truncated x-coordinate, signed distance, herd), so
+any number of machines can produce DPs without sharing anything. A merge
+sorts the new records in bounded runs, merges them with the sorted store
+in one linear pass and checks every group of equal x-coordinates that
+gained a record for a tame/wild collision.
+
+Worker files are never rewritten; the store's manifest remembers how much
+of each one was merged, so a later merge only reads what was appended
+since. Every file carries the run context (target, range, jump table):
+DPs only collide usefully when their walks share it.
+"""
+
+import heapq
+import json
+import os
+import socket
+import struct
+
+MAGIC = b"BPSDPF01"
+# magic, puzzle number, kangaroo context digest
+HEADER = struct.Struct(">8sH32s")
+# x-coordinate >> 160, distance (signed), herd e: 0 tame, +/-1 wild
+RECORD = struct.Struct(">12s20sb")
+X_BYTES = 12
+
+DEFAULT_DP_DIR = os.path.join(
+    os.path.expanduser("~"), ".local", "share", "bitcoin-puzzle-solver", "dps"
+)
+STORE_FILE = "store.dps"
+MANIFEST_FILE = "store.json"
+WORKER_SUFFIX = ".dps"
+# Records sorted in memory per run, about 100 MB as Python bytes objects
+RUN_RECORDS = 1 << 20
+READ_RECORDS = 4096
+FLUSH_RECORDS = 1024
+
+
+class DPStoreError(ValueError):
+    """A DP file is damaged or belongs to another puzzle or context"""
+
+
+def pack(x, herd, distance):
+    return RECORD.pack(
+        (x >> 160).to_bytes(X_BYTES, "big"), distance.to_bytes(20, "big", signed=True), herd
+    )
+
+
+def unpack(record):
+    """(x >> 160, herd, distance) of a packed record"""
+    x, distance, herd = RECORD.unpack(record)
+    return int.from_bytes(x, "big"), herd, int.from_bytes(distance, "big", signed=True)
+
+
+def puzzle_dir(directory, puzzle_num):
+    """Directory of a puzzle's worker files; its store is the store subdirectory"""
+    return os.path.join(directory, f"puzzle{puzzle_num}")
+
+
+def worker_file_path(directory, puzzle_num):
+    """A new append-only DP file for this process"""
+    name = f"{socket.gethostname()}-{os.getpid()}{WORKER_SUFFIX}"
+    return os.path.join(puzzle_dir(directory, puzzle_num), name)
+
+
+def read_header(path):
+    """(puzzle number, context digest) of a DP file"""
+    with open(path, "rb") as f:
+        data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise DPStoreError(f"{path} is too short for a DP file")
+    magic, puzzle_num, context = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise DPStoreError(f"{path} is not a DP file")
+    return puzzle_num, context
+
+
+class DPWriter:
+    """Append distinguished points to one worker's file
+
+    Records are written in blocks and a partial last record (a crash while
+    writing) is ignored by readers.
+    """
+
+    def __init__(self, path, puzzle_num, context):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path):
+            if read_header(path) != (puzzle_num, context):
+                raise DPStoreError(f"{path} belongs to another puzzle or context")
+            self.file = open(path, "ab")
+        else:
+            self.file = open(path, "ab")
+            self.file.write(HEADER.pack(MAGIC, puzzle_num, context))
+        self.buffer = bytearray()
+        self.count = 0
+
+    def append(self, x, herd, distance):
+        self.buffer += pack(x, herd, distance)
+        self.count += 1
+        if len(self.buffer) >= FLUSH_RECORDS * RECORD.size:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+
+def _read_records(path, start=HEADER.size, end=None):
+    # Whole records between byte offsets start and end
+    if end is None:
+        end = os.path.getsize(path)
+    end -= (end - HEADER.size) % RECORD.size
+    size = RECORD.size
+    with open(path, "rb") as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            chunk = f.read(min(end - position, READ_RECORDS * size))
+            if not chunk:
+                return
+            position += len(chunk)
+            for offset in range(0, len(chunk) - size + 1, size):
+                yield chunk[offset:offset + size]
+
+
+def _write_run(path, records):
+    records.sort()
+    with open(path, "wb") as f:
+        f.write(b"".join(records))
+
+
+def _read_run(path):
+    size = RECORD.size
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_RECORDS * size)
+            if not chunk:
+                return
+            for offset in range(0, len(chunk), size):
+                yield chunk[offset:offset + size]
+
+
+class DPStore:
+    """Sorted DP store of one puzzle and context in a directory
+
+    merge() folds new worker records into store.dps; store.json records the
+    context and how many bytes of each worker file are merged.
+    """
+
+    def __init__(self, directory, puzzle_num):
+        self.directory = directory
+        self.puzzle_num = puzzle_num
+        self.path = os.path.join(directory, STORE_FILE)
+        self.manifest_path = os.path.join(directory, MANIFEST_FILE)
+        try:
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {"puzzle": puzzle_num, "context": None, "records": 0, "files": {}}
+        if self.manifest["puzzle"] != puzzle_num:
+            raise DPStoreError(f"{directory} holds DPs of Puzzle #{self.manifest['puzzle']}")
+
+    @property
+    def records(self):
+        return self.manifest["records"]
+
+    def pending(self, paths):
+        """(path, start offset, end offset) of the unmerged part of each worker file"""
+        result = []
+        for path in paths:
+            puzzle_num, context = read_header(path)
+            if puzzle_num != self.puzzle_num:
+                raise DPStoreError(f"{path} holds DPs of Puzzle #{puzzle_num}")
+            if self.manifest["context"] is None:
+                self.manifest["context"] = context.hex()
+            elif context.hex() != self.manifest["context"]:
+                raise DPStoreError(f"{path} was written with another target or jump table")
+            start = self.manifest["files"].get(os.path.abspath(path), HEADER.size)
+            end = os.path.getsize(path)
+            end -= (end - HEADER.size) % RECORD.size
+            if end > start:
+                result.append((path, start, end))
+        return result
+
+    def merge(self, paths, check=None, run_records=RUN_RECORDS, should_stop=None):
+        """Merge the new records of worker files into the store
+
+        check(entry_a, entry_b), given two (herd, distance) entries with the
+        same truncated x, returns the private key or None; it is called for
+        every pair in an x group that involves a new record. Returns
+        (key or None, records added). Memory use is bounded by run_records
+        however large the files and the store are.
+        """
+        pending = self.pending(paths)
+        if not pending:
+            return None, 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        run_prefix = os.path.join(self.directory, f"merge.{os.getpid()}.run")
+        runs = []
+        try:
+            records = []
+            for path, start, end in pending:
+                for record in _read_records(path, start, end):
+                    records.append(record)
+                    if len(records) >= run_records:
+                        runs.append(f"{run_prefix}{len(runs)}")
+                        _write_run(runs[-1], records)
+                        records = []
+                if should_stop and should_stop():
+                    return None, 0
+            if records:
+                runs.append(f"{run_prefix}{len(runs)}")
+                _write_run(runs[-1], records)
+                records = []
+
+            # Old records are tagged 0 and new ones 1, so a group is only
+            # checked when it gained a record
+            sources = [((record, 1) for record in _read_run(run)) for run in runs]
+            if os.path.exists(self.path):
+                sources.append(((record, 0) for record in _read_records(self.path)))
+
+            key, added = self._merge_sorted(heapq.merge(*sources), check)
+        finally:
+            for run in runs:
+                os.remove(run)
+
+        for path, start, end in pending:
+            self.manifest["files"][os.path.abspath(path)] = end
+        self.manifest["records"] += added
+        self._save_manifest()
+        return key, added
+
+    def _merge_sorted(self, records, check):
+        temp = f"{self.path}.{os.getpid()}.tmp"
+        key = None
+        added = 0
+        group = []
+        previous = None
+        with open(temp, "wb") as out:
+            out.write(HEADER.pack(MAGIC, self.puzzle_num, bytes.fromhex(self.manifest["context"])))
+            buffer = bytearray()
+            for record, new in records:
+                if record == previous:
+                    # The same DP merged twice, e.g. after an interrupted merge
+                    continue
+                previous = record
+                buffer += record
+                added += new
+                if len(buffer) >= READ_RECORDS * RECORD.size:
+                    out.write(buffer)
+                    buffer.clear()
+
+                if group and group[0][0][:X_BYTES] != record[:X_BYTES]:
+                    key = key or self._check_group(group, check)
+                    group = []
+                group.append((record, new))
+            key = key or self._check_group(group, check)
+            out.write(buffer)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(temp, self.path)
+        return key, added
+
+    def _check_group(self, group, check):
+        if len(group) < 2 or check is None or not any(new for _, new in group):
+            return None
+        entries = [(unpack(record)[1:], new) for record, new in group]
+        for i, (entry_a, new_a) in enumerate(entries):
+            for entry_b, new_b in entries[i + 1:]:
+                if new_a or new_b:
+                    key = check(entry_a, entry_b)
+                    if key is not None:
+                        return key
+        return None
+
+    def _save_manifest(self):
+        temp = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(temp, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+            f.write("\n")
+        os.replace(temp, self.manifest_path)
+
+
+def find_worker_files(inputs):
+    """DP files named by inputs, directories expanded to the files inside"""
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            paths += sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.endswith(WORKER_SUFFIX) and os.path.isfile(os.path.join(path, name))
+            )
+        else:
+            paths.append(path)
+    return paths
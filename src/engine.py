@@ -0,0 +1,109 @@
+"""
+Batched CPU key-scanning engine
+Walks a key range by point addition and shares one modular inversion
+across a whole batch of points (Montgomery batch inversion).
+"""
+
+import time
+
+import secp256k1_numpy
+from hashing import DEFAULT_HASHER, HASHERS
+from secp256k1 import P, G, batch_inverse, point_add, point_mul, serialize_compressed
+from keys import hash160
+
+DEFAULT_BATCH_SIZE = 4096
+
+# Field arithmetic for the lanes: Python ints, or NumPy limb arrays
+BACKENDS = ("python", "numpy")
+DEFAULT_BACKEND = "numpy" if secp256k1_numpy.AVAILABLE else "python"
+
+
+def init_lanes(start, count):
+    """Points start*G, (start+1)*G, ... for count consecutive keys"""
+    point = point_mul(start)
+    lanes = [point]
+    for _ in range(count - 1):
+        point = point_add(point, G)
+        lanes.append(point)
+    return lanes
+
+
+def advance_lanes(lanes, step):
+    """Add the same point to every lane with one shared inversion"""
+    sx, sy = step
+    deltas = [(sx - x) % P for x, _ in lanes]
+    if 0 in deltas:
+        # A lane hit +/- step, which only happens for tiny keys
+        return [point_add(lane, step) for lane in lanes]
+
+    inverses = batch_inverse(deltas)
+    result = []
+    append = result.append
+    for (x, y), inv in zip(lanes, inverses):
+        lam = (sy - y) * inv % P
+        x3 = (lam * lam - x - sx) % P
+        append((x3, (lam * (x - x3) - y) % P))
+    return result
+
+
+def serialize_keys(lanes, count, out):
+    """Write the compressed public keys of the first count lanes into out"""
+    out[:33 * count] = b"".join([
+        (b"\x03" if y & 1 else b"\x02") + x.to_bytes(32, "big") for x, y in lanes[:count]
+    ])
+
+
+def scan_range(range_start, range_end, target_hash160, batch_size=DEFAULT_BATCH_SIZE,
+               backend=DEFAULT_BACKEND, hasher=DEFAULT_HASHER, should_stop=None, on_progress=None,
+               on_stage=None):
+    """Scan keys range_start..range_end (inclusive) for a hash160 match
+
+    The batch is a set of lanes at consecutive keys; every round checks all
+    lanes and then advances each of them by batch_size*G, so a round costs
+    one inversion plus a handful of multiplications per key.
+    on_stage(stage, seconds) receives the time of each round per stage.
+    backend is one of BACKENDS and hasher one of hashing.HASHERS.
+    Returns the private key as an int, or None if not found or stopped.
+    """
+    batch_size = max(1, min(batch_size, range_end - range_start + 1))
+    lanes = init_lanes(range_start, batch_size)
+    step = point_mul(batch_size)
+    serialize, advance = serialize_keys, advance_lanes
+    if backend == "numpy":
+        lanes = secp256k1_numpy.from_points(lanes)
+        serialize, advance = secp256k1_numpy.serialize_keys, secp256k1_numpy.advance_lanes
+    stage = HASHERS[hasher](target_hash160, batch_size)
+    base = range_start
+
+    while base <= range_end:
+        if should_stop and should_stop():
+            return None
+
+        count = min(batch_size, range_end - base + 1)
+        started = time.perf_counter()
+        serialize(lanes, count, stage.keys)
+        stage.hash(count)
+        hashed = time.perf_counter()
+        index = stage.match()
+        if on_stage:
+            on_stage("hash", hashed - started)
+            on_stage("compare", time.perf_counter() - hashed)
+        if index is not None:
+            # Re-derive the hit from scratch so a lane arithmetic fault
+            # cannot report a wrong key
+            key = base + index
+            if hash160(serialize_compressed(point_mul(key))) != target_hash160:
+                raise RuntimeError(f"Lane arithmetic mismatch at key {key:#x}")
+            return key
+
+        if on_progress:
+            on_progress(count)
+
+        base += batch_size
+        if base <= range_end:
+            started = time.perf_counter()
+            lanes = advance(lanes, step)
+            if on_stage:
+                on_stage("ec", time.perf_counter() - started)
+
+    return None
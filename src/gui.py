@@ -2,131 +2,165 @@
 """
 Bitcoin Puzzle Solver - Complete GUI Application
 A tool for solving Bitcoin puzzle challenges with GPU acceleration support
+
+Only the Solver tab is built before the window first paints; the other
+tabs are built when first shown, and the engines, tables and service
+client load on first use.
 """
 
+import importlib.util
+import json
+import resource
 import sys
 import os
-import subprocess
-import threading
+import types
+import multiprocessing
 import time
 from datetime import datetime
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QPushButton, QLineEdit, QComboBox, QTextEdit, QGroupBox,
+    QLabel, QPushButton, QLineEdit, QComboBox, QTextEdit, QPlainTextEdit, QGroupBox,
     QProgressBar, QMessageBox, QTabWidget, QSpinBox, QCheckBox,
     QFileDialog, QStatusBar
 )
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QThread
 from PyQt6.QtGui import QFont, QPalette, QColor
 
-# Bitcoin puzzle data
-PUZZLES = {
-    71: {"bits": 71, "range_start": "0x400000000000000000", "range_end": "0x7FFFFFFFFFFFFFFFFFF", "balance": "~1 BTC", "status": "Unsolved"},
-    72: {"bits": 72, "range_start": "0x800000000000000000", "range_end": "0xFFFFFFFFFFFFFFFFFFF", "balance": "~1 BTC", "status": "Unsolved"},
-    73: {"bits": 73, "range_start": "0x1000000000000000000", "range_end": "0x1FFFFFFFFFFFFFFFFFFFFFF", "balance": "~1 BTC", "status": "Unsolved"},
-    74: {"bits": 74, "range_start": "0x2000000000000000000", "range_end": "0x3FFFFFFFFFFFFFFFFFFFFFF", "balance": "~1 BTC", "status": "Unsolved"},
-    75: {"bits": 75, "range_start": "0x4000000000000000000", "range_end": "0x7FFFFFFFFFFFFFFFFFFFFFF", "balance": "~1 BTC", "status": "Unsolved"},
-}
+import catalog
+from telemetry import DEFAULT_LOG_DIR, DEFAULT_LOG_LINES, LogRing
+
+# Modules imported by _lazy_import, loaded on first attribute access
+DEFERRED_MODULES = {}
+
+
+def _lazy_import(name):
+    """Module object for name that executes the module on first use"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    DEFERRED_MODULES[name] = module
+    return module
+
+
+def loaded_deferred_modules():
+    """Names of the deferred modules that have been loaded so far"""
+    # A lazy module turns into a plain module once it is loaded
+    return sorted(name for name, module in DEFERRED_MODULES.items() if type(module) is types.ModuleType)
+
+
+asyncio = _lazy_import("asyncio")
+bitcrack = _lazy_import("bitcrack")
+bsgs = _lazy_import("bsgs")
+engine = _lazy_import("engine")
+journal = _lazy_import("journal")
+parallel = _lazy_import("parallel")
+permutation = _lazy_import("permutation")
+profiling = _lazy_import("profiling")
+service = _lazy_import("service")
+solver = _lazy_import("solver")
+tables = _lazy_import("tables")
+topology = _lazy_import("topology")
 
 
 class SolverThread(QThread):
     """Background thread for running the solver"""
     progress_update = pyqtSignal(str)
     status_update = pyqtSignal(str)
-    keys_checked = pyqtSignal(int)
+    # object, not int: Qt ints are 32-bit and key counts are not
+    keys_checked = pyqtSignal(object)
+    rate_update = pyqtSignal(float)
     solution_found = pyqtSignal(str)
     
-    def __init__(self, puzzle_num, wallet_address, use_gpu=False):
+    def __init__(self, puzzle_num, wallet_address, use_gpu=False, **options):
         super().__init__()
-        self.puzzle_num = puzzle_num
-        self.wallet_address = wallet_address
-        self.use_gpu = use_gpu
-        self.running = True
-        self.total_keys = 0
+        self.solver = solver.Solver(
+            puzzle_num, wallet_address,
+            on_progress=self.progress_update.emit,
+            on_status=self.status_update.emit,
+            on_keys=self.keys_checked.emit,
+            on_rate=self.rate_update.emit,
+            on_solution=self.solution_found.emit,
+            **solver.split_options(dict(options, use_gpu=use_gpu))
+        )
         
     def run(self):
         """Main solver loop"""
-        self.progress_update.emit(f"Starting solver for Puzzle #{self.puzzle_num}")
-        self.status_update.emit("Running")
-        
-        puzzle = PUZZLES.get(self.puzzle_num)
-        if not puzzle:
-            self.progress_update.emit(f"ERROR: Puzzle #{self.puzzle_num} not found")
-            self.status_update.emit("Error")
-            return
-        
-        # Check for BitCrack
-        bitcrack_path = self.find_bitcrack()
-        
-        if self.use_gpu and bitcrack_path:
-            self.run_gpu_solver(bitcrack_path, puzzle)
-        else:
-            self.run_cpu_solver(puzzle)
-    
-    def find_bitcrack(self):
-        """Find BitCrack executable"""
-        possible_paths = [
-            "/usr/local/bin/clBitCrack",
-            os.path.expanduser("~/Applications/BitcoinPuzzleSolver/clBitCrack"),
-            "./clBitCrack"
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path) and os.access(path, os.X_OK):
-                self.progress_update.emit(f"Found BitCrack at: {path}")
-                return path
-        
-        self.progress_update.emit("BitCrack not found - using CPU mode")
-        return None
-    
-    def run_gpu_solver(self, bitcrack_path, puzzle):
-        """Run GPU-accelerated solver using BitCrack"""
-        self.progress_update.emit("Starting GPU solver...")
-        
-        # Simulate GPU solving (replace with actual BitCrack integration)
-        start_time = time.time()
-        while self.running:
-            self.total_keys += 1000000  # 1M keys per iteration
-            self.keys_checked.emit(self.total_keys)
-            
-            elapsed = time.time() - start_time
-            rate = self.total_keys / elapsed if elapsed > 0 else 0
-            
-            self.progress_update.emit(
-                f"GPU: {self.total_keys:,} keys checked | "
-                f"{rate:,.0f} keys/sec | "
-                f"Time: {int(elapsed)}s"
-            )
-            
-            time.sleep(0.1)
-    
-    def run_cpu_solver(self, puzzle):
-        """Run CPU-based solver (slower)"""
-        self.progress_update.emit("Starting CPU solver (slow)...")
-        self.progress_update.emit("Tip: Install BitCrack for GPU acceleration!")
-        
-        # Simulate CPU solving
-        start_time = time.time()
-        while self.running:
-            self.total_keys += 1000  # 1K keys per iteration
-            self.keys_checked.emit(self.total_keys)
-            
-            elapsed = time.time() - start_time
-            rate = self.total_keys / elapsed if elapsed > 0 else 0
-            
-            self.progress_update.emit(
-                f"CPU: {self.total_keys:,} keys checked | "
-                f"{rate:,.0f} keys/sec | "
-                f"Time: {int(elapsed)}s"
-            )
-            
-            time.sleep(1)
+        self.solver.run()
     
     def stop(self):
         """Stop the solver"""
-        self.running = False
-        self.progress_update.emit("Stopping solver...")
-        self.status_update.emit("Stopped")
+        self.solver.stop()
+
+
+class ServiceMonitor(QThread):
+    """Follow the run of a background solver service without owning it"""
+    progress_update = pyqtSignal(str)
+    status_update = pyqtSignal(str)
+    keys_checked = pyqtSignal(object)
+    rate_update = pyqtSignal(float)
+    solution_found = pyqtSignal(str)
+    run_finished = pyqtSignal()
+    
+    def __init__(self, path, replay=None):
+        super().__init__()
+        self.path = path
+        self.snapshot_seq = 0
+        # Created here so detach() can cancel the task before run() starts
+        self.loop = asyncio.new_event_loop()
+        self.task = self.loop.create_task(service.follow(path, self.on_event, replay))
+        
+    def run(self):
+        """Relay service events until detached or the service goes away"""
+        try:
+            self.loop.run_until_complete(self.task)
+            self.progress_update.emit("Solver service closed the connection")
+        except asyncio.CancelledError:
+            pass
+        except OSError as e:
+            self.progress_update.emit(f"ERROR: Cannot attach to the solver service: {e}")
+        finally:
+            self.loop.close()
+    
+    def detach(self):
+        """Disconnect, leaving the run going"""
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.task.cancel)
+    
+    def on_event(self, record):
+        event = record["event"]
+        # Events up to the snapshot are replayed history, not news
+        live = record["seq"] > self.snapshot_seq
+        if event == "snapshot":
+            self.snapshot_seq = record["seq"]
+            self.keys_checked.emit(record["keys"])
+            self.rate_update.emit(float(record["rate"]))
+            if record["status"]:
+                self.status_update.emit(record["status"])
+            if record["puzzle"] is not None:
+                self.progress_update.emit(
+                    f"Attached to the solver service: Puzzle #{record['puzzle']} ({record['state']})"
+                )
+        elif event == "progress":
+            self.progress_update.emit(record["message"])
+        elif event == "status":
+            self.status_update.emit(record["status"])
+        elif event == "keys":
+            self.keys_checked.emit(record["keys"])
+            self.rate_update.emit(float(record["rate"]))
+        elif event == "started":
+            self.progress_update.emit(f"Service started Puzzle #{record['puzzle']}")
+        elif event == "solution":
+            if live:
+                self.solution_found.emit(record["private_key"])
+            else:
+                self.progress_update.emit(f"SOLUTION FOUND: {record['private_key']}")
+        elif event == "finished" and live:
+            self.run_finished.emit()
 
 
 class BitcoinPuzzleSolver(QMainWindow):
@@ -135,8 +169,16 @@ class BitcoinPuzzleSolver(QMainWindow):
     def __init__(self):
         super().__init__()
         self.solver_thread = None
+        self.service_monitor = None
+        self.painted = False
+        # Called once the window has painted, e.g. by the startup probe
+        self.on_first_paint = None
         self.total_keys_checked = 0
         self.start_time = None
+        self.log_ring = LogRing(
+            DEFAULT_LOG_LINES,
+            os.path.join(DEFAULT_LOG_DIR, f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+        )
         self.init_ui()
         
     def init_ui(self):
@@ -166,17 +208,12 @@ class BitcoinPuzzleSolver(QMainWindow):
         solver_tab = self.create_solver_tab()
         tabs.addTab(solver_tab, "Solver")
         
-        # Tab 2: Puzzles
-        puzzles_tab = self.create_puzzles_tab()
-        tabs.addTab(puzzles_tab, "Puzzles")
-        
-        # Tab 3: Settings
-        settings_tab = self.create_settings_tab()
-        tabs.addTab(settings_tab, "Settings")
-        
-        # Tab 4: About
-        about_tab = self.create_about_tab()
-        tabs.addTab(about_tab, "About")
+        # Tabs 2-4 are built the first time they are shown
+        self.deferred_tabs = {}
+        self.add_deferred_tab(tabs, "Puzzles", self.create_puzzles_tab)
+        self.settings_tab = self.add_deferred_tab(tabs, "Settings", self.create_settings_tab)
+        self.add_deferred_tab(tabs, "About", self.create_about_tab)
+        tabs.currentChanged.connect(lambda index: self.build_tab(tabs.widget(index)))
         
         # Status bar
         self.statusBar = QStatusBar()
@@ -186,6 +223,38 @@ class BitcoinPuzzleSolver(QMainWindow):
         # Apply dark theme
         self.apply_dark_theme()
     
+    def add_deferred_tab(self, tabs, title, create):
+        """Add an empty tab that create() fills the first time it is shown"""
+        placeholder = QWidget()
+        layout = QVBoxLayout(placeholder)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.deferred_tabs[placeholder] = create
+        tabs.addTab(placeholder, title)
+        return placeholder
+    
+    def build_tab(self, placeholder):
+        """Build a deferred tab unless it is built already"""
+        create = self.deferred_tabs.pop(placeholder, None)
+        if create:
+            placeholder.layout().addWidget(create())
+    
+    def paintEvent(self, event):
+        """Paint, then start the work kept off the startup path"""
+        super().paintEvent(event)
+        if not self.painted:
+            self.painted = True
+            QTimer.singleShot(0, self.after_first_paint)
+    
+    def after_first_paint(self):
+        """Startup work that can wait until the window is up"""
+        if self.on_first_paint:
+            self.on_first_paint()
+            return
+        
+        # Pick up a run left going in the background service
+        if service.is_running(service.DEFAULT_SOCKET_PATH):
+            self.attach_service()
+    
     def create_solver_tab(self):
         """Create the main solver tab"""
         tab = QWidget()
@@ -210,12 +279,15 @@ class BitcoinPuzzleSolver(QMainWindow):
         puzzle_label = QLabel("Select Puzzle:")
         puzzle_label.setMinimumWidth(150)
         self.puzzle_combo = QComboBox()
-        for puzzle_num in sorted(PUZZLES.keys()):
-            puzzle = PUZZLES[puzzle_num]
+        targets = [puzzle for puzzle in catalog.all_puzzles() if puzzle.address]
+        for puzzle in targets:
             self.puzzle_combo.addItem(
-                f"Puzzle #{puzzle_num} ({puzzle['bits']} bits) - {puzzle['status']}", 
-                puzzle_num
+                f"Puzzle #{puzzle.number} ({puzzle.bits} bits) - {puzzle.status}", 
+                puzzle.number
             )
+        unsolved = [puzzle.number for puzzle in targets if not puzzle.solved]
+        if unsolved:
+            self.puzzle_combo.setCurrentIndex(self.puzzle_combo.findData(unsolved[0]))
         puzzle_layout.addWidget(puzzle_label)
         puzzle_layout.addWidget(self.puzzle_combo)
         config_layout.addLayout(puzzle_layout)
@@ -228,6 +300,29 @@ class BitcoinPuzzleSolver(QMainWindow):
         gpu_layout.addStretch()
         config_layout.addLayout(gpu_layout)
         
+        # Background service checkbox
+        service_layout = QHBoxLayout()
+        self.service_checkbox = QCheckBox("Run solver in background service")
+        self.service_checkbox.setChecked(False)
+        self.service_checkbox.setToolTip(
+            "The run keeps going when this window closes; reopen it or use "
+            "'cli.py status --follow' to watch"
+        )
+        service_layout.addWidget(self.service_checkbox)
+        service_layout.addStretch()
+        config_layout.addLayout(service_layout)
+        
+        # Algorithm selection
+        algorithm_layout = QHBoxLayout()
+        algorithm_label = QLabel("Algorithm:")
+        algorithm_label.setMinimumWidth(150)
+        self.algorithm_combo = QComboBox()
+        for algorithm, name in catalog.ALGORITHMS.items():
+            self.algorithm_combo.addItem(name, algorithm)
+        algorithm_layout.addWidget(algorithm_label)
+        algorithm_layout.addWidget(self.algorithm_combo)
+        config_layout.addLayout(algorithm_layout)
+        
         config_group.setLayout(config_layout)
         layout.addWidget(config_group)
         
@@ -242,8 +337,14 @@ class BitcoinPuzzleSolver(QMainWindow):
         self.stop_button.setEnabled(False)
         self.stop_button.setMinimumHeight(40)
         
+        self.attach_button = QPushButton("Attach")
+        self.attach_button.clicked.connect(self.toggle_attach)
+        self.attach_button.setToolTip("Follow or let go of the background service's run")
+        self.attach_button.setMinimumHeight(40)
+        
         button_layout.addWidget(self.start_button)
         button_layout.addWidget(self.stop_button)
+        button_layout.addWidget(self.attach_button)
         layout.addLayout(button_layout)
         
         # Progress group
@@ -275,15 +376,17 @@ class BitcoinPuzzleSolver(QMainWindow):
         log_group = QGroupBox("Log Output")
         log_layout = QVBoxLayout()
         
-        self.log_output = QTextEdit()
+        # The view keeps the newest lines; older ones spill to the session log file
+        self.log_output = QPlainTextEdit()
         self.log_output.setReadOnly(True)
+        self.log_output.setMaximumBlockCount(DEFAULT_LOG_LINES)
         self.log_output.setMinimumHeight(250)
         log_layout.addWidget(self.log_output)
         
         # Log controls
         log_controls = QHBoxLayout()
         clear_log_btn = QPushButton("Clear Log")
-        clear_log_btn.clicked.connect(self.log_output.clear)
+        clear_log_btn.clicked.connect(self.clear_log)
         save_log_btn = QPushButton("Save Log")
         save_log_btn.clicked.connect(self.save_log)
         log_controls.addStretch()
@@ -305,15 +408,16 @@ class BitcoinPuzzleSolver(QMainWindow):
         info.setReadOnly(True)
         
         puzzle_info = "# Bitcoin Puzzle Challenges\n\n"
-        puzzle_info += "## Available Puzzles\n\n"
-        
-        for puzzle_num in sorted(PUZZLES.keys()):
-            puzzle = PUZZLES[puzzle_num]
-            puzzle_info += f"### Puzzle #{puzzle_num}\n"
-            puzzle_info += f"- **Bits:** {puzzle['bits']}\n"
-            puzzle_info += f"- **Range:** {puzzle['range_start']} to {puzzle['range_end']}\n"
-            puzzle_info += f"- **Balance:** {puzzle['balance']}\n"
-            puzzle_info += f"- **Status:** {puzzle['status']}\n\n"
+        puzzle_info += "## Puzzle Catalog\n\n"
+        puzzle_info += "| Puzzle | Range | Address | Public Key | Status |\n"
+        puzzle_info += "|--------|-------|---------|------------|--------|\n"
+        
+        for puzzle in catalog.all_puzzles():
+            puzzle_info += (
+                f"| #{puzzle.number} | {puzzle.range_start:#x} to {puzzle.range_end:#x} "
+                f"| {puzzle.address or 'not in catalog'} "
+                f"| {'Known' if puzzle.pubkey else '-'} | {puzzle.status} |\n"
+            )
         
         puzzle_info += "\n## Difficulty Estimates\n\n"
         puzzle_info += "| Puzzle | Keys to Check | CPU Time | GPU Time (M1/M2) |\n"
@@ -348,6 +452,36 @@ class BitcoinPuzzleSolver(QMainWindow):
         path_layout.addWidget(browse_btn)
         bitcrack_layout.addLayout(path_layout)
         
+        # Keyspace chunk size
+        chunk_layout = QHBoxLayout()
+        chunk_label = QLabel("Keyspace Chunk (bits):")
+        self.gpu_chunk_spin = QSpinBox()
+        self.gpu_chunk_spin.setRange(20, 64)
+        self.gpu_chunk_spin.setValue(bitcrack.DEFAULT_CHUNK_BITS)
+        self.gpu_chunk_spin.setToolTip("Keys per BitCrack --keyspace run; finished chunks are checkpointed")
+        chunk_layout.addWidget(chunk_label)
+        chunk_layout.addWidget(self.gpu_chunk_spin)
+        chunk_layout.addStretch()
+        bitcrack_layout.addLayout(chunk_layout)
+        
+        # Engine config for several supervised engine processes
+        engines_layout = QHBoxLayout()
+        engines_label = QLabel("Engine Config:")
+        self.engine_config_input = QLineEdit()
+        self.engine_config_input.setPlaceholderText("Optional JSON file: several engine processes, e.g. one per GPU")
+        engines_browse_btn = QPushButton("Browse...")
+        engines_browse_btn.clicked.connect(self.browse_engine_config)
+        engines_layout.addWidget(engines_label)
+        engines_layout.addWidget(self.engine_config_input)
+        engines_layout.addWidget(engines_browse_btn)
+        bitcrack_layout.addLayout(engines_layout)
+        
+        self.hybrid_checkbox = QCheckBox("Also scan with CPU workers")
+        self.hybrid_checkbox.setToolTip(
+            "Run CPU workers next to the engines on the same range, with chunks sized to each one's rate"
+        )
+        bitcrack_layout.addWidget(self.hybrid_checkbox)
+        
         # Check BitCrack
         check_btn = QPushButton("Check BitCrack Installation")
         check_btn.clicked.connect(self.check_bitcrack)
@@ -366,6 +500,200 @@ class BitcoinPuzzleSolver(QMainWindow):
         bitcrack_group.setLayout(bitcrack_layout)
         layout.addWidget(bitcrack_group)
         
+        # CPU solver settings
+        cpu_group = QGroupBox("CPU Solver")
+        cpu_layout = QVBoxLayout()
+        
+        batch_layout = QHBoxLayout()
+        batch_label = QLabel("Batch Size:")
+        self.batch_size_spin = QSpinBox()
+        self.batch_size_spin.setRange(1, 1 << 20)
+        self.batch_size_spin.setSingleStep(1024)
+        self.batch_size_spin.setValue(engine.DEFAULT_BATCH_SIZE)
+        self.batch_size_spin.setToolTip("Points sharing one modular inversion per step")
+        batch_layout.addWidget(batch_label)
+        batch_layout.addWidget(self.batch_size_spin)
+        batch_layout.addStretch()
+        cpu_layout.addLayout(batch_layout)
+        
+        workers_layout = QHBoxLayout()
+        workers_label = QLabel("Worker Processes:")
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, 1024)
+        self.workers_spin.setValue(parallel.default_workers())
+        self.workers_spin.setToolTip("One process per core scans its own slice of the range")
+        workers_layout.addWidget(workers_label)
+        workers_layout.addWidget(self.workers_spin)
+        workers_layout.addStretch()
+        cpu_layout.addLayout(workers_layout)
+        
+        backend_layout = QHBoxLayout()
+        backend_label = QLabel("Arithmetic:")
+        self.backend_combo = QComboBox()
+        for backend in engine.BACKENDS:
+            self.backend_combo.addItem(backend.capitalize(), backend)
+        self.backend_combo.setCurrentIndex(engine.BACKENDS.index(engine.DEFAULT_BACKEND))
+        self.backend_combo.setToolTip("NumPy works on the whole batch at once; Python is the reference")
+        backend_layout.addWidget(backend_label)
+        backend_layout.addWidget(self.backend_combo)
+        backend_layout.addStretch()
+        cpu_layout.addLayout(backend_layout)
+        
+        order_layout = QHBoxLayout()
+        order_label = QLabel("Scan Order:")
+        self.order_combo = QComboBox()
+        for order in permutation.ORDERS:
+            self.order_combo.addItem(order.capitalize(), order)
+        self.order_combo.setToolTip(
+            "Random visits 2^24-key chunks in an order seeded per installation, "
+            "so different installs do not all start at the low end"
+        )
+        order_layout.addWidget(order_label)
+        order_layout.addWidget(self.order_combo)
+        order_layout.addStretch()
+        cpu_layout.addLayout(order_layout)
+        
+        placement_layout = QHBoxLayout()
+        placement_label = QLabel("CPU Placement:")
+        self.placement_combo = QComboBox()
+        self.placement_combo.setEditable(True)
+        self.placement_combo.addItems(topology.PLACEMENT_MODES)
+        self.placement_combo.setCurrentText(topology.DEFAULT_PLACEMENT)
+        self.placement_combo.setToolTip(
+            "Pin workers to CPUs grouped by NUMA node: auto does so on multi-node machines; "
+            "type a CPU list such as 0-7,16-23 to choose the CPUs"
+        )
+        self.smt_checkbox = QCheckBox("Leave SMT siblings unused")
+        self.smt_checkbox.setToolTip("One worker per physical core; sometimes faster than using every thread")
+        placement_layout.addWidget(placement_label)
+        placement_layout.addWidget(self.placement_combo)
+        placement_layout.addWidget(self.smt_checkbox)
+        placement_layout.addStretch()
+        cpu_layout.addLayout(placement_layout)
+        
+        self.adaptive_checkbox = QCheckBox("Adapt the worker count to CPU quota and load")
+        self.adaptive_checkbox.setToolTip(
+            "Sequential scans use up to Worker Processes workers, as many as give the most keys/sec "
+            "under the container's CPU quota and other jobs' load"
+        )
+        cpu_layout.addWidget(self.adaptive_checkbox)
+        
+        cpu_group.setLayout(cpu_layout)
+        layout.addWidget(cpu_group)
+        
+        # Kangaroo settings
+        kangaroo_group = QGroupBox("Kangaroo Solver")
+        kangaroo_layout = QVBoxLayout()
+        
+        dp_layout = QHBoxLayout()
+        dp_label = QLabel("Distinguished Point Bits:")
+        self.dp_bits_spin = QSpinBox()
+        self.dp_bits_spin.setRange(0, 40)
+        self.dp_bits_spin.setSpecialValueText("Auto")
+        self.dp_bits_spin.setToolTip("Zero bits of x that mark a distinguished point")
+        dp_layout.addWidget(dp_label)
+        dp_layout.addWidget(self.dp_bits_spin)
+        dp_layout.addStretch()
+        kangaroo_layout.addLayout(dp_layout)
+        
+        targets_layout = QHBoxLayout()
+        targets_label = QLabel("Extra Targets:")
+        self.targets_input = QLineEdit()
+        self.targets_input.setPlaceholderText("Puzzle numbers, e.g. 135, 140")
+        self.targets_input.setToolTip(
+            "More puzzles with a known public key to solve in the same run; they share one tame herd"
+        )
+        targets_layout.addWidget(targets_label)
+        targets_layout.addWidget(self.targets_input)
+        kangaroo_layout.addLayout(targets_layout)
+        
+        kangaroo_group.setLayout(kangaroo_layout)
+        layout.addWidget(kangaroo_group)
+        
+        # BSGS settings
+        bsgs_group = QGroupBox("Baby-Step Giant-Step Solver")
+        bsgs_layout = QVBoxLayout()
+        
+        memory_layout = QHBoxLayout()
+        memory_label = QLabel("Bloom Filter Memory (MB):")
+        self.bsgs_memory_spin = QSpinBox()
+        self.bsgs_memory_spin.setRange(1, 1 << 20)
+        self.bsgs_memory_spin.setValue(bsgs.DEFAULT_MEMORY_MB)
+        self.bsgs_memory_spin.setToolTip(
+            "Sets the baby-step count; the exact table lives on disk and is memory-mapped"
+        )
+        memory_layout.addWidget(memory_label)
+        memory_layout.addWidget(self.bsgs_memory_spin)
+        memory_layout.addStretch()
+        bsgs_layout.addLayout(memory_layout)
+        
+        bsgs_group.setLayout(bsgs_layout)
+        layout.addWidget(bsgs_group)
+        
+        # Precomputed tables
+        tables_group = QGroupBox("Precomputed Tables")
+        tables_layout = QVBoxLayout()
+        
+        table_dir_layout = QHBoxLayout()
+        table_dir_label = QLabel("Table Directory:")
+        self.table_dir_input = QLineEdit()
+        self.table_dir_input.setText(tables.DEFAULT_TABLE_DIR)
+        self.table_dir_input.setToolTip("Built once and shared by every run and worker process")
+        table_dir_btn = QPushButton("Browse...")
+        table_dir_btn.clicked.connect(lambda: self.browse_directory(self.table_dir_input, "Select Table Directory"))
+        table_dir_layout.addWidget(table_dir_label)
+        table_dir_layout.addWidget(self.table_dir_input)
+        table_dir_layout.addWidget(table_dir_btn)
+        tables_layout.addLayout(table_dir_layout)
+        
+        tables_group.setLayout(tables_layout)
+        layout.addWidget(tables_group)
+        
+        # Checkpoints
+        checkpoint_group = QGroupBox("Checkpoints")
+        checkpoint_layout = QVBoxLayout()
+        
+        checkpoint_dir_layout = QHBoxLayout()
+        checkpoint_dir_label = QLabel("Checkpoint Directory:")
+        self.checkpoint_dir_input = QLineEdit()
+        self.checkpoint_dir_input.setText(journal.DEFAULT_CHECKPOINT_DIR)
+        self.checkpoint_dir_input.setToolTip("Scanned subranges per puzzle; restarts skip them")
+        checkpoint_dir_btn = QPushButton("Browse...")
+        checkpoint_dir_btn.clicked.connect(
+            lambda: self.browse_directory(self.checkpoint_dir_input, "Select Checkpoint Directory")
+        )
+        checkpoint_dir_layout.addWidget(checkpoint_dir_label)
+        checkpoint_dir_layout.addWidget(self.checkpoint_dir_input)
+        checkpoint_dir_layout.addWidget(checkpoint_dir_btn)
+        checkpoint_layout.addLayout(checkpoint_dir_layout)
+        
+        checkpoint_group.setLayout(checkpoint_layout)
+        layout.addWidget(checkpoint_group)
+        
+        # Metrics endpoint
+        metrics_group = QGroupBox("Metrics")
+        metrics_layout = QVBoxLayout()
+        
+        metrics_port_layout = QHBoxLayout()
+        metrics_port_label = QLabel("Prometheus Port:")
+        self.metrics_port_spin = QSpinBox()
+        self.metrics_port_spin.setRange(0, 65535)
+        self.metrics_port_spin.setSpecialValueText("Off")
+        self.metrics_port_spin.setToolTip("Serve rates and stage times at http://127.0.0.1:<port>/metrics")
+        metrics_port_layout.addWidget(metrics_port_label)
+        metrics_port_layout.addWidget(self.metrics_port_spin)
+        metrics_port_layout.addStretch()
+        metrics_layout.addLayout(metrics_port_layout)
+        
+        self.profile_checkbox = QCheckBox("Profile engine processes")
+        self.profile_checkbox.setToolTip(
+            f"cProfile and stack samples of every worker, reported under {profiling.DEFAULT_PROFILE_DIR}"
+        )
+        metrics_layout.addWidget(self.profile_checkbox)
+        
+        metrics_group.setLayout(metrics_layout)
+        layout.addWidget(metrics_group)
+        
         layout.addStretch()
         
         return tab
@@ -431,6 +759,9 @@ MIT License - See repository for details
     
     def start_solving(self):
         """Start the solving process"""
+        # The run's options are on the Settings tab
+        self.build_tab(self.settings_tab)
+        
         # Validate inputs
         wallet = self.wallet_input.text().strip()
         if not wallet:
@@ -452,6 +783,17 @@ MIT License - See repository for details
         # Get selected puzzle
         puzzle_num = self.puzzle_combo.currentData()
         use_gpu = self.use_gpu_checkbox.isChecked()
+        algorithm = self.algorithm_combo.currentData()
+        
+        try:
+            targets = [int(n) for n in self.targets_input.text().replace(",", " ").split()]
+        except ValueError:
+            QMessageBox.warning(
+                self,
+                "Invalid Targets",
+                "Extra targets are puzzle numbers separated by commas."
+            )
+            return
         
         # Confirm start
         reply = QMessageBox.question(
@@ -459,6 +801,7 @@ MIT License - See repository for details
             "Start Solving",
             f"Start solving Puzzle #{puzzle_num}?\n\n"
             f"Mode: {'GPU' if use_gpu else 'CPU'}\n"
+            f"Algorithm: {catalog.ALGORITHMS[algorithm]}\n"
             f"Wallet: {wallet}\n\n"
             f"This may run for hours/days/months.",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
@@ -471,13 +814,41 @@ MIT License - See repository for details
         self.log(f"Starting solver for Puzzle #{puzzle_num}")
         self.log(f"Your wallet: {wallet}")
         self.log(f"Mode: {'GPU (BitCrack)' if use_gpu else 'CPU'}")
+        self.log(f"Algorithm: {catalog.ALGORITHMS[algorithm]}")
         self.log("-" * 60)
         
-        self.solver_thread = SolverThread(puzzle_num, wallet, use_gpu)
+        options = dict(
+            batch_size=self.batch_size_spin.value(),
+            workers=self.workers_spin.value(),
+            placement=self.placement_combo.currentText().strip() or topology.DEFAULT_PLACEMENT,
+            smt=not self.smt_checkbox.isChecked(),
+            adaptive=self.adaptive_checkbox.isChecked(),
+            backend=self.backend_combo.currentData(),
+            scan_order=self.order_combo.currentData(),
+            algorithm=algorithm,
+            dp_bits=self.dp_bits_spin.value() or None,
+            targets=targets or None,
+            bsgs_memory_mb=self.bsgs_memory_spin.value(),
+            table_dir=self.table_dir_input.text().strip() or tables.DEFAULT_TABLE_DIR,
+            checkpoint_dir=self.checkpoint_dir_input.text().strip() or journal.DEFAULT_CHECKPOINT_DIR,
+            bitcrack_path=self.bitcrack_path_input.text().strip() or None,
+            gpu_chunk_bits=self.gpu_chunk_spin.value(),
+            engine_config=self.engine_config_input.text().strip() or None,
+            hybrid=self.hybrid_checkbox.isChecked(),
+            metrics_port=self.metrics_port_spin.value() or None,
+            profile_dir=profiling.DEFAULT_PROFILE_DIR if self.profile_checkbox.isChecked() else None
+        )
+        if self.service_checkbox.isChecked():
+            self.start_service_run(puzzle_num, wallet, use_gpu, options)
+            return
+        
+        self.solver_thread = SolverThread(puzzle_num, wallet, use_gpu, **options)
         self.solver_thread.progress_update.connect(self.log)
         self.solver_thread.status_update.connect(self.update_status)
         self.solver_thread.keys_checked.connect(self.update_keys)
+        self.solver_thread.rate_update.connect(self.update_rate)
         self.solver_thread.solution_found.connect(self.solution_found)
+        self.solver_thread.finished.connect(self.solver_finished)
         self.solver_thread.start()
         
         # Update UI
@@ -485,14 +856,13 @@ MIT License - See repository for details
         self.stop_button.setEnabled(True)
         self.progress_bar.setVisible(True)
         self.start_time = time.time()
-        
-        # Start timer for rate calculation
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_rate)
-        self.timer.start(1000)
     
     def stop_solving(self):
         """Stop the solving process"""
+        if self.service_monitor and not (self.solver_thread and self.solver_thread.isRunning()):
+            self.stop_service_run()
+            return
+        
         if self.solver_thread:
             self.log("Stopping solver...")
             self.solver_thread.stop()
@@ -503,14 +873,115 @@ MIT License - See repository for details
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.progress_bar.setVisible(False)
+    
+    def solver_finished(self):
+        """The solver thread's run ended, found the key, failed or ran out of range"""
+        self.start_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        self.progress_bar.setVisible(False)
+    
+    def start_service_run(self, puzzle_num, wallet, use_gpu, options):
+        """Start the run in the background service, starting the service if needed"""
+        path = service.DEFAULT_SOCKET_PATH
+        try:
+            if not service.is_running(path):
+                self.log("Starting the solver service...")
+                service.spawn(path)
+            if not self.service_monitor:
+                self.attach_service(replay=0)
+            reply = service.call(
+                path, "start", puzzle=puzzle_num, wallet_address=wallet, use_gpu=use_gpu, options=options
+            )
+        except service.ServiceError as e:
+            QMessageBox.critical(self, "Solver Service", str(e))
+            return
         
-        if hasattr(self, 'timer'):
-            self.timer.stop()
+        if reply["event"] == "error":
+            QMessageBox.warning(self, "Solver Service", reply["message"])
+            return
+        
+        self.start_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.progress_bar.setVisible(True)
+        self.start_time = time.time()
+    
+    def stop_service_run(self):
+        """Ask the background service to stop its run"""
+        try:
+            service.call(service.DEFAULT_SOCKET_PATH, "stop")
+            self.log("Stopping solver...")
+        except service.ServiceError as e:
+            self.log(f"ERROR: {e}")
+            self.service_run_finished()
+    
+    def attach_service(self, replay=None):
+        """Follow the background service, replaying its recent history"""
+        try:
+            snapshot = service.call(service.DEFAULT_SOCKET_PATH, "status")
+        except service.ServiceError as e:
+            self.log(f"ERROR: {e}")
+            return
+        
+        self.service_monitor = ServiceMonitor(service.DEFAULT_SOCKET_PATH, replay)
+        self.service_monitor.progress_update.connect(self.log)
+        self.service_monitor.status_update.connect(self.update_status)
+        self.service_monitor.keys_checked.connect(self.update_keys)
+        self.service_monitor.rate_update.connect(self.update_rate)
+        self.service_monitor.solution_found.connect(self.solution_found)
+        self.service_monitor.run_finished.connect(self.service_run_finished)
+        self.service_monitor.finished.connect(self.service_detached)
+        self.service_monitor.start()
+        
+        running = snapshot["state"] == "running"
+        self.attach_button.setText("Detach")
+        self.start_button.setEnabled(not running)
+        self.stop_button.setEnabled(running)
+        self.progress_bar.setVisible(running)
+    
+    def detach_service(self):
+        """Stop following the background service; its run goes on"""
+        if self.service_monitor:
+            self.service_monitor.detach()
+            self.service_monitor.wait()
+    
+    def toggle_attach(self):
+        """Attach to or detach from the background service"""
+        if self.service_monitor:
+            self.detach_service()
+        elif service.is_running(service.DEFAULT_SOCKET_PATH):
+            self.attach_service()
+        else:
+            self.log("No solver service is running")
+    
+    def service_run_finished(self):
+        """The background service's run ended"""
+        self.start_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        self.progress_bar.setVisible(False)
+    
+    def service_detached(self):
+        """The service monitor stopped, by request or because the service went away"""
+        self.service_monitor = None
+        self.attach_button.setText("Attach")
+        self.log("Detached from the solver service")
+        self.service_run_finished()
+    
+    def closeEvent(self, event):
+        """Detach from the background service; its run keeps going"""
+        self.detach_service()
+        super().closeEvent(event)
     
     def log(self, message):
         """Add message to log"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_output.append(f"[{timestamp}] {message}")
+        line = f"[{timestamp}] {message}"
+        self.log_ring.append(line)
+        self.log_output.appendPlainText(line)
+    
+    def clear_log(self):
+        """Clear the log view and the session log"""
+        self.log_ring.clear()
+        self.log_output.clear()
         
     def update_status(self, status):
         """Update status label"""
@@ -522,13 +993,9 @@ MIT License - See repository for details
         self.total_keys_checked = total_keys
         self.keys_label.setText(f"Keys Checked: {total_keys:,}")
     
-    def update_rate(self):
-        """Update solving rate"""
-        if self.start_time:
-            elapsed = time.time() - self.start_time
-            if elapsed > 0:
-                rate = self.total_keys_checked / elapsed
-                self.rate_label.setText(f"Rate: {rate:,.0f} keys/s")
+    def update_rate(self, rate):
+        """Update solving rate (keys/s over the last minute)"""
+        self.rate_label.setText(f"Rate: {rate:,.0f} keys/s")
     
     def solution_found(self, private_key):
         """Handle solution found"""
@@ -553,7 +1020,7 @@ MIT License - See repository for details
         if filename:
             try:
                 with open(filename, 'w') as f:
-                    f.write(self.log_output.toPlainText())
+                    f.write(self.log_ring.text())
                 self.log(f"Log saved to: {filename}")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to save log: {str(e)}")
@@ -570,26 +1037,35 @@ MIT License - See repository for details
         if filename:
             self.bitcrack_path_input.setText(filename)
     
+    def browse_engine_config(self):
+        """Browse for an engine config file"""
+        filename, _ = QFileDialog.getOpenFileName(
+            self,
+            "Select Engine Config",
+            os.path.expanduser("~"),
+            "JSON Files (*.json)"
+        )
+        
+        if filename:
+            self.engine_config_input.setText(filename)
+    
+    def browse_directory(self, line_edit, title):
+        """Browse for a directory and put it in a path input"""
+        directory = QFileDialog.getExistingDirectory(self, title, line_edit.text())
+        
+        if directory:
+            line_edit.setText(directory)
+    
     def check_bitcrack(self):
         """Check if BitCrack is installed"""
-        paths_to_check = [
-            self.bitcrack_path_input.text(),
-            "/usr/local/bin/clBitCrack",
-            os.path.expanduser("~/Applications/BitcoinPuzzleSolver/clBitCrack")
-        ]
-        
-        found = False
-        for path in paths_to_check:
-            if path and os.path.exists(path) and os.access(path, os.X_OK):
-                QMessageBox.information(
-                    self,
-                    "BitCrack Found",
-                    f"BitCrack is installed at:\n{path}"
-                )
-                found = True
-                break
-        
-        if not found:
+        path = bitcrack.find_bitcrack(self.bitcrack_path_input.text().strip() or None)
+        if path:
+            QMessageBox.information(
+                self,
+                "BitCrack Found",
+                f"BitCrack is installed at:\n{path}"
+            )
+        else:
             QMessageBox.warning(
                 self,
                 "BitCrack Not Found",
@@ -637,14 +1113,14 @@ MIT License - See repository for details
                 background-color: #555555;
                 color: #888888;
             }
-            QLineEdit, QComboBox, QTextEdit, QSpinBox {
+            QLineEdit, QComboBox, QTextEdit, QPlainTextEdit, QSpinBox {
                 background-color: #3c3c3c;
                 border: 1px solid #555555;
                 border-radius: 3px;
                 padding: 5px;
                 color: #ffffff;
             }
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 font-family: 'Courier New', monospace;
             }
             QProgressBar {
@@ -676,6 +1152,12 @@ MIT License - See repository for details
 
 def main():
     """Main application entry point"""
+    multiprocessing.freeze_support()
+    # Frozen builds start the background service through their own binary
+    if len(sys.argv) == 3 and sys.argv[1] == "--service":
+        import cli
+        sys.exit(cli.main(["serve", "--socket", sys.argv[2]]))
+    
     app = QApplication(sys.argv)
     app.setApplicationName("Bitcoin Puzzle Solver")
     
@@ -684,6 +1166,18 @@ def main():
     app.setFont(font)
     
     window = BitcoinPuzzleSolver()
+    if sys.argv[1:] == ["--startup-probe"]:
+        # Report the first paint to benchmark.measure_gui_startup and quit
+        def report():
+            print(json.dumps({
+                "first_paint": time.time(),
+                "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                "modules": len(sys.modules),
+                "deferred_loaded": loaded_deferred_modules(),
+            }), flush=True)
+            app.quit()
+        
+        window.on_first_paint = report
     window.show()
     
     sys.exit(app.exec())
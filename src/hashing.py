@@ -0,0 +1,322 @@
+"""
+Batched hash160 stage between the EC engine and the target compare
+The engine serializes a batch of compressed public keys into the stage's
+preallocated buffer; the stage hashes the whole batch and reports the lane
+that matches the target. The batched stage reuses pre-built hasher
+objects, compares a 32-bit prefix of every hash160 as an integer and only
+checks the full 20 bytes on prefix hits. The NumPy stage computes both
+hashes itself on word arrays, so it allocates nothing per key.
+
+NumPy is optional; the numpy hasher is only in HASHERS when it is installed.
+"""
+
+import hashlib
+import itertools
+import os
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from keys import hash160
+
+KEY_SIZE = 33
+HASH_SIZE = 20
+
+
+class Hash160Stage:
+    """Reference stage: one hash160() call per key and a list search"""
+
+    def __init__(self, target_hash160, capacity):
+        self.target = target_hash160
+        self.capacity = capacity
+        # Filled by the engine with capacity 33-byte compressed keys
+        self.keys = bytearray(KEY_SIZE * capacity)
+        self.hashes = []
+
+    def hash(self, count):
+        """Hash the first count keys of the buffer"""
+        keys = self.keys
+        self.hashes = [hash160(keys[i:i + KEY_SIZE]) for i in range(0, KEY_SIZE * count, KEY_SIZE)]
+
+    def match(self):
+        """Index of the key hashing to the target, or None"""
+        if self.target in self.hashes:
+            return self.hashes.index(self.target)
+        return None
+
+
+class BatchedHash160Stage(Hash160Stage):
+    """Hash a batch with reused hasher state and prefix-filter the results
+
+    Per-lane views of the key buffer and the digest buffer are made once,
+    so a batch allocates no lists, slices or joined output. hashlib has no
+    digest_into() or reset, so each key still costs two hasher copies and
+    two digest bytes objects, and the prefix can only be compared once the
+    full RIPEMD-160 is done.
+    """
+
+    def __init__(self, target_hash160, capacity):
+        super().__init__(target_hash160, capacity)
+        view = memoryview(self.keys)
+        self.key_views = [view[i:i + KEY_SIZE] for i in range(0, KEY_SIZE * capacity, KEY_SIZE)]
+        # Reused across batches; only the first count digests are current
+        self.digests = bytearray(HASH_SIZE * capacity)
+        digests = memoryview(self.digests)
+        self.digest_views = [digests[i:i + HASH_SIZE] for i in range(0, HASH_SIZE * capacity, HASH_SIZE)]
+        self.words = digests.cast("I")
+        self.sha256 = hashlib.sha256()
+        self.ripemd160 = hashlib.new("ripemd160")
+        # The prefix as read back through a native uint32 view of the digests
+        self.prefix = int.from_bytes(target_hash160[:4], sys.byteorder)
+        self.count = 0
+
+    def hash(self, count):
+        new_sha256 = self.sha256.copy
+        new_ripemd160 = self.ripemd160.copy
+        for key, digest in itertools.islice(zip(self.key_views, self.digest_views), count):
+            sha = new_sha256()
+            sha.update(key)
+            ripemd = new_ripemd160()
+            ripemd.update(sha.digest())
+            digest[:] = ripemd.digest()
+        self.count = count
+
+    def match(self):
+        step = HASH_SIZE // 4
+        prefixes = self.words[:self.count * step:step].tolist()
+        index = -1
+        while True:
+            try:
+                index = prefixes.index(self.prefix, index + 1)
+            except ValueError:
+                return None
+            offset = index * HASH_SIZE
+            if self.digests[offset:offset + HASH_SIZE] == self.target:
+                return index
+
+
+# SHA-256 round constants and initial state
+SHA256_K = (
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+)
+SHA256_H = (0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19)
+
+# RIPEMD-160 message word order, rotations and constants of the left and right lines
+RIPEMD_R = (
+    0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15,
+    7, 4, 13, 1, 10, 6, 15, 3, 12, 0, 9, 5, 2, 14, 11, 8,
+    3, 10, 14, 4, 9, 15, 8, 1, 2, 7, 0, 6, 13, 11, 5, 12,
+    1, 9, 11, 10, 0, 8, 12, 4, 13, 3, 7, 15, 14, 5, 6, 2,
+    4, 0, 5, 9, 7, 12, 2, 10, 14, 1, 3, 8, 11, 6, 15, 13,
+)
+RIPEMD_R2 = (
+    5, 14, 7, 0, 9, 2, 11, 4, 13, 6, 15, 8, 1, 10, 3, 12,
+    6, 11, 3, 7, 0, 13, 5, 10, 14, 15, 8, 12, 4, 9, 1, 2,
+    15, 5, 1, 3, 7, 14, 6, 9, 11, 8, 12, 2, 10, 0, 4, 13,
+    8, 6, 4, 1, 3, 11, 15, 0, 5, 12, 2, 13, 9, 7, 10, 14,
+    12, 15, 10, 4, 1, 5, 8, 7, 6, 2, 13, 14, 0, 3, 9, 11,
+)
+RIPEMD_S = (
+    11, 14, 15, 12, 5, 8, 7, 9, 11, 13, 14, 15, 6, 7, 9, 8,
+    7, 6, 8, 13, 11, 9, 7, 15, 7, 12, 15, 9, 11, 7, 13, 12,
+    11, 13, 6, 7, 14, 9, 13, 15, 14, 8, 13, 6, 5, 12, 7, 5,
+    11, 12, 14, 15, 14, 15, 9, 8, 9, 14, 5, 6, 8, 6, 5, 12,
+    9, 15, 5, 11, 6, 8, 13, 12, 5, 12, 13, 14, 11, 8, 5, 6,
+)
+RIPEMD_S2 = (
+    8, 9, 9, 11, 13, 15, 15, 5, 7, 7, 8, 11, 14, 14, 12, 6,
+    9, 13, 15, 7, 12, 8, 9, 11, 7, 7, 12, 7, 6, 15, 13, 11,
+    9, 7, 15, 11, 8, 6, 6, 14, 12, 13, 5, 14, 13, 13, 7, 5,
+    15, 5, 8, 11, 14, 14, 6, 14, 6, 9, 12, 9, 12, 5, 15, 8,
+    8, 5, 12, 9, 12, 5, 14, 6, 8, 13, 6, 5, 15, 13, 11, 11,
+)
+RIPEMD_K = (0x00000000, 0x5a827999, 0x6ed9eba1, 0x8f1bbcdc, 0xa953fd4e)
+RIPEMD_K2 = (0x50a28be6, 0x5c4dd124, 0x6d703ef3, 0x7a6d76e9, 0x00000000)
+RIPEMD_H = (0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476, 0xc3d2e1f0)
+
+
+class NumpyHash160Stage(Hash160Stage):
+    """Hash a batch as arrays of 32-bit words, one lane per key
+
+    SHA-256 and RIPEMD-160 run on (words, lanes) uint32 arrays made once
+    per stage, with every operation writing into one of them, so a batch
+    allocates nothing per key and only a few array views per batch. Both
+    messages fit in one block: a key is 33 bytes and its SHA-256 digest 32.
+    All lanes are hashed; match() only looks at the first count.
+    """
+
+    def __init__(self, target_hash160, capacity):
+        super().__init__(target_hash160, capacity)
+        u32 = np.uint32
+        self.key_rows = np.frombuffer(self.keys, dtype=np.uint8).reshape(capacity, KEY_SIZE)
+        # Padded SHA-256 blocks: key, 0x80, zeros, bit length 264
+        self.block = np.zeros((capacity, 64), dtype=np.uint8)
+        self.block[:, KEY_SIZE] = 0x80
+        self.block[:, 62:] = (0x01, 0x08)
+        self.block_words = self.block.view(">u4").T
+        self.schedule = np.empty((64, capacity), dtype=u32)
+        self.round_constants = np.array(SHA256_K, dtype=u32).reshape(64, 1)
+        self.state = np.empty((8, capacity), dtype=u32)
+        # RIPEMD-160 message: the digest's words, 0x80, zeros, bit length 256
+        self.message = np.zeros((16, capacity), dtype=u32)
+        self.message[8] = 0x80
+        self.message[14] = 256
+        self.left = np.empty((5, capacity), dtype=u32)
+        self.right = np.empty((5, capacity), dtype=u32)
+        self.digest = np.empty((5, capacity), dtype=u32)
+        self.scratch = np.empty((3, capacity), dtype=u32)
+        self.hits = np.empty(capacity, dtype=bool)
+        self.target_words = [int.from_bytes(target_hash160[i:i + 4], "little") for i in range(0, HASH_SIZE, 4)]
+        self.count = 0
+
+    def _rotr_xor(self, x, shifts, out, shift=None):
+        """out = x rotated right by each of shifts, xored, then xor x >> shift"""
+        t = self.scratch[2]
+        np.right_shift(x, shifts[0], out=out)
+        for n in shifts[1:]:
+            np.right_shift(x, n, out=t)
+            out ^= t
+        for n in shifts:
+            np.left_shift(x, 32 - n, out=t)
+            out ^= t
+        if shift is not None:
+            np.right_shift(x, shift, out=t)
+            out ^= t
+
+    def _rotl(self, x, n):
+        """x rotated left by n, in place"""
+        t = self.scratch[2]
+        np.right_shift(x, 32 - n, out=t)
+        np.left_shift(x, n, out=x)
+        x |= t
+
+    def _sha256(self):
+        w = self.schedule
+        u, v = self.scratch[0], self.scratch[1]
+        np.copyto(w[:16], self.block_words)
+        for t in range(16, 64):
+            self._rotr_xor(w[t - 2], (17, 19), w[t], 10)
+            self._rotr_xor(w[t - 15], (7, 18), u, 3)
+            w[t] += u
+            w[t] += w[t - 7]
+            w[t] += w[t - 16]
+        # Fold the round constants into the schedule
+        w += self.round_constants
+
+        state = self.state
+        for i, value in enumerate(SHA256_H):
+            state[i] = value
+        a, b, c, d, e, f, g, h = state
+        for t in range(64):
+            # h becomes T1 and then the new a; d becomes the new e
+            self._rotr_xor(e, (6, 11, 25), u)
+            h += u
+            np.bitwise_xor(f, g, out=u)
+            u &= e
+            u ^= g
+            h += u
+            h += w[t]
+            d += h
+            self._rotr_xor(a, (2, 13, 22), u)
+            h += u
+            np.bitwise_or(a, b, out=u)
+            u &= c
+            np.bitwise_and(a, b, out=v)
+            u |= v
+            h += u
+            a, b, c, d, e, f, g, h = h, a, b, c, d, e, f, g
+        for row, value in zip(state, SHA256_H):
+            row += np.uint32(value)
+
+    def _ripemd_line(self, words, order, shifts, constants, backwards):
+        """One of the two lines of the RIPEMD-160 compression"""
+        x = self.message
+        u = self.scratch[0]
+        for i, value in enumerate(RIPEMD_H):
+            words[i] = value
+        a, b, c, d, e = words
+        for j in range(80):
+            round_ = 4 - j // 16 if backwards else j // 16
+            if round_ == 0:
+                np.bitwise_xor(b, c, out=u)
+                u ^= d
+            elif round_ == 1:
+                np.bitwise_xor(c, d, out=u)
+                u &= b
+                u ^= d
+            elif round_ == 2:
+                np.invert(c, out=u)
+                u |= b
+                u ^= d
+            elif round_ == 3:
+                np.bitwise_xor(b, c, out=u)
+                u &= d
+                u ^= c
+            else:
+                np.invert(d, out=u)
+                u |= c
+                u ^= b
+            a += u
+            a += x[order[j]]
+            a += np.uint32(constants[j // 16])
+            self._rotl(a, shifts[j])
+            a += e
+            self._rotl(c, 10)
+            a, b, c, d, e = e, a, b, c, d
+
+    def _ripemd160(self):
+        left, right, digest = self.left, self.right, self.digest
+        self._ripemd_line(left, RIPEMD_R, RIPEMD_S, RIPEMD_K, False)
+        self._ripemd_line(right, RIPEMD_R2, RIPEMD_S2, RIPEMD_K2, True)
+        for i in range(5):
+            digest[i] = RIPEMD_H[(i + 1) % 5]
+            digest[i] += left[(i + 2) % 5]
+            digest[i] += right[(i + 3) % 5]
+
+    def hash(self, count):
+        self.block[:, :KEY_SIZE] = self.key_rows
+        self._sha256()
+        # RIPEMD-160 reads the digest bytes as little-endian words
+        np.copyto(self.message[:8], self.state)
+        self.message[:8].byteswap(inplace=True)
+        self._ripemd160()
+        self.count = count
+
+    def match(self):
+        hits = self.hits[:self.count]
+        np.equal(self.digest[0, :self.count], self.target_words[0], out=hits)
+        for index in np.flatnonzero(hits):
+            if all(self.digest[i, index] == word for i, word in enumerate(self.target_words)):
+                return int(index)
+        return None
+
+
+HASHERS = {
+    "simple": Hash160Stage,
+    "batched": BatchedHash160Stage,
+}
+if np is not None:
+    HASHERS["numpy"] = NumpyHash160Stage
+DEFAULT_HASHER = "batched"
+
+
+def benchmark(name, batch_size=4096, rounds=10):
+    """Keys/sec of one hash stage on random keys, hashing and matching only"""
+    stage = HASHERS[name](os.urandom(HASH_SIZE), batch_size)
+    stage.keys[:] = os.urandom(KEY_SIZE * batch_size)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        stage.hash(batch_size)
+        stage.match()
+    return batch_size * rounds / (time.perf_counter() - started)
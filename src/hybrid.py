@@ -0,0 +1,532 @@
+"""
+Hybrid scheduler for CPU workers and external engines on one node
+Runs CPU scanner processes and BitCrack-compatible engine processes over
+the same range at once. The range is not split up front: every slot gets
+chunks of about CHUNK_SECONDS at its measured keys/sec, and near the end
+of the range chunks shrink to the slot's share of what is left, so all
+slots run out at about the same time.
+
+Each slot has one chunk planned behind the one it is running. A slot that
+runs dry takes the tail of the planned chunk of the slot that would finish
+last, sized so both finish together. Planned chunks have not been given
+to any process yet, so no key is scanned twice; the finished keys of all
+slots go into one coverage list for the solver's journal.
+
+set_active() changes how many CPU workers take chunks while the scan
+runs: a parked worker finishes the chunk it is running and its planned
+chunk goes back to the queue, so no keys are lost either way.
+"""
+
+import collections
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import time
+
+from bitcrack import DEFAULT_CHUNK_BITS, MAX_CHUNK_FAILURES, EngineProcess, keyspace
+from engine import DEFAULT_BACKEND, DEFAULT_BATCH_SIZE, scan_range
+from hashing import DEFAULT_HASHER
+from keys import private_key_to_address
+from parallel import STOP_TIMEOUT
+from profiling import profiled
+from supervisor import DEFAULT_HEARTBEAT_SECONDS
+from telemetry import CounterBlock, StageTimes
+from topology import pin
+
+# Run time of one chunk once the slot's rate is known
+CHUNK_SECONDS = 60.0
+# Shortest chunk worth planning, except for the last keys of the range
+MIN_CHUNK_SECONDS = 2.0
+MIN_CHUNK_KEYS = 1 << 12
+# First chunk of a CPU worker, before its rate is known
+PROBE_CHUNK_KEYS = 1 << 16
+# A running CPU chunk gives a rate once it has run this long
+RATE_WINDOW_SECONDS = 1.0
+
+
+def _run_cpu_worker(index, conn, args, setup, counters, stage_times, stop_event, profile_dir, cpus):
+    """Process entry point: scan the chunks sent on conn until told to stop"""
+    def on_progress(count):
+        counters.add(index, count)
+
+    def on_stage(stage, seconds):
+        stage_times.add(index, stage, seconds)
+
+    def serve():
+        while True:
+            try:
+                chunk = conn.recv()
+            except EOFError:
+                return
+            if chunk is None:
+                return
+            key = scan_range(
+                chunk[0], chunk[1], *args,
+                should_stop=stop_event.is_set,
+                on_progress=on_progress,
+                on_stage=on_stage
+            )
+            if key is not None:
+                stop_event.set()
+            conn.send((key, None))
+
+    # Same signal handling as parallel._run_task: the parent decides when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        if cpus:
+            pin(cpus)
+        if setup:
+            setup[0](*setup[1])
+        profiled(profile_dir, f"worker{index}", serve)
+    except Exception as e:
+        try:
+            conn.send((None, str(e)))
+        except OSError:
+            pass
+
+
+def _size(chunk):
+    return chunk[1] - chunk[0] + 1
+
+
+class Slot:
+    """A CPU worker process or an engine, with its running and planned chunks"""
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.rate = 0.0
+        self.current = None
+        self.planned = collections.deque()
+        self.started = 0.0
+        self.keys = 0
+        self.alive = True
+        # Parked CPU workers take no new chunks (see HybridScheduler.set_active)
+        self.parked = False
+        # CPU workers: the pipe, the process and its counter when the chunk started
+        self.conn = None
+        self.process = None
+        self.launched = False
+        self.base = 0
+        self.reported = 0
+        # Engines: the spec and the running child
+        self.spec = None
+        self.child = None
+        self.last_output = 0.0
+        self.failures = 0
+
+    def backlog(self):
+        """Keys still to scan in the running and planned chunks"""
+        keys = sum(_size(chunk) for chunk in self.planned)
+        if self.current:
+            keys += _size(self.current) - self.chunk_keys()
+        return keys
+
+    def chunk_keys(self):
+        """Keys of the running chunk checked so far"""
+        return self.child.keys if self.child else 0
+
+
+class CpuSlot(Slot):
+    """A CPU worker slot, whose progress is its shared counter"""
+
+    def __init__(self, name, counters, index):
+        super().__init__(name, "cpu")
+        self.counters = counters
+        self.index = index
+
+    def chunk_keys(self):
+        return self.counters[self.index] - self.base if self.current else 0
+
+
+class HybridScheduler:
+    """Scan intervals with CPU workers and engine processes sharing one queue
+
+    specs are supervisor.EngineSpec entries, one engine process at a time
+    each; workers is the number of CPU processes, pinned to the CPU sets of
+    placement if given. Used like WorkerPool: start(), poll(), stop(). A
+    failed engine chunk goes back to the queue; an engine that crashes or
+    prints nothing for heartbeat_seconds MAX_CHUNK_FAILURES times in a row
+    is dropped. CPU workers are started the first time they are active.
+    """
+
+    def __init__(self, intervals, target, address, specs, workers, batch_size=DEFAULT_BATCH_SIZE,
+                 backend=DEFAULT_BACKEND, hasher=DEFAULT_HASHER, setup=None, profile_dir=None,
+                 max_engine_chunk=1 << DEFAULT_CHUNK_BITS, heartbeat_seconds=DEFAULT_HEARTBEAT_SECONDS,
+                 placement=None, chunk_seconds=CHUNK_SECONDS):
+        self.address = address
+        self.unassigned = [interval for interval in intervals if interval[0] <= interval[1]]
+        self.total = sum(_size(interval) for interval in self.unassigned)
+        self.max_engine_chunk = max_engine_chunk
+        self.heartbeat_seconds = heartbeat_seconds
+        self.chunk_seconds = chunk_seconds
+        self.active = workers
+
+        ctx = multiprocessing.get_context()
+        self.counters = CounterBlock(workers, ctx=ctx)
+        self.stage_times = StageTimes(workers, ctx=ctx)
+        self.stop_event = ctx.Event()
+        self.slots = []
+        for index in range(workers):
+            slot = CpuSlot(f"cpu{index}", self.counters, index)
+            slot.conn, child_conn = ctx.Pipe()
+            slot.process = ctx.Process(
+                target=_run_cpu_worker,
+                args=(
+                    index, child_conn, (target, batch_size, backend, hasher), setup,
+                    self.counters, self.stage_times, self.stop_event, profile_dir,
+                    placement[index] if placement else None
+                ),
+                daemon=True
+            )
+            self.slots.append(slot)
+        for spec in specs:
+            slot = Slot(spec.name, "engine")
+            slot.spec = spec
+            self.slots.append(slot)
+
+        self.completed = []
+        self.steals = 0
+        self.io_seconds = 0.0
+        self.found_key = None
+        self.errors = []
+        self.started = False
+        self.stopped = False
+
+    @property
+    def engine_rate(self):
+        """Keys/sec currently reported by the engine processes"""
+        return sum(slot.child.rate for slot in self.slots if slot.child)
+
+    @property
+    def unfinished(self):
+        """Keys no slot is left to scan, after failures or stop()"""
+        return sum(_size(interval) for interval in self.unassigned) + sum(
+            slot.backlog() for slot in self.slots
+        )
+
+    def total_keys(self):
+        return sum(slot.keys + slot.chunk_keys() for slot in self.slots)
+
+    def worker_progress(self):
+        """(keys checked, keys handed out) per slot, CPU workers first"""
+        return [
+            (slot.keys + slot.chunk_keys(), slot.keys + slot.chunk_keys() + slot.backlog())
+            for slot in self.slots
+        ]
+
+    def stage_seconds(self):
+        """CPU engine stage times plus the time spent reading engine output"""
+        return {**self.stage_times.totals(), "io": self.io_seconds}
+
+    def start(self):
+        self.started = True
+        for slot in self.slots:
+            if slot.process and not slot.parked:
+                self._launch(slot)
+        self._schedule()
+
+    def _launch(self, slot):
+        slot.process.start()
+        slot.launched = True
+
+    def _in_use(self, slot):
+        return slot.alive and not slot.parked
+
+    def set_active(self, count):
+        """Let the first count CPU workers take chunks and park the others"""
+        self.active = count
+        for slot in self.slots:
+            if slot.kind != "cpu" or not slot.alive:
+                continue
+            slot.parked = slot.index >= count
+            if slot.parked:
+                while slot.planned:
+                    self._give_back(slot.planned.pop())
+            elif self.started and not slot.launched:
+                self._launch(slot)
+        self._schedule()
+
+    def _measure(self, slot, now):
+        """Update a slot's keys/sec from its running chunk"""
+        if slot.child:
+            if slot.child.rate:
+                slot.rate = slot.child.rate
+        elif slot.current and now - slot.started >= RATE_WINDOW_SECONDS:
+            done = slot.chunk_keys()
+            if done:
+                slot.rate = done / (now - slot.started)
+
+    def _chunk_size(self, slot):
+        """Keys of the next chunk for a slot whose rate is known"""
+        left = sum(_size(interval) for interval in self.unassigned)
+        total_rate = sum(other.rate for other in self.slots if self._in_use(other))
+        share = left * slot.rate / total_rate
+        size = min(slot.rate * self.chunk_seconds, max(share, slot.rate * MIN_CHUNK_SECONDS, MIN_CHUNK_KEYS))
+        if slot.kind == "engine":
+            size = min(size, self.max_engine_chunk)
+        return max(1, int(size))
+
+    def _carve(self, size):
+        """Take up to size keys off the front of the unassigned intervals"""
+        if not self.unassigned:
+            return None
+        start, end = self.unassigned[0]
+        stop = min(end, start + size - 1)
+        if stop == end:
+            self.unassigned.pop(0)
+        else:
+            self.unassigned[0] = (stop + 1, end)
+        return (start, stop)
+
+    def _steal(self, thief):
+        """Take the tail of the planned chunk of the slot that would finish last"""
+        if not thief.rate:
+            return None
+        victims = [slot for slot in self.slots if slot is not thief and slot.planned]
+        if not victims:
+            return None
+
+        def finish(slot):
+            return slot.backlog() / slot.rate if slot.rate else float("inf")
+
+        victim = max(victims, key=finish)
+        start, end = victim.planned[-1]
+        if victim.rate:
+            # Both finish together when the thief takes this share of the backlog
+            take = int(victim.backlog() * thief.rate / (thief.rate + victim.rate))
+        else:
+            take = end - start + 1
+        take = min(take, end - start + 1)
+        if take < min(MIN_CHUNK_KEYS, end - start + 1):
+            return None
+        if take == end - start + 1:
+            victim.planned.pop()
+        else:
+            victim.planned[-1] = (start, end - take)
+        self.steals += 1
+        return (end - take + 1, end)
+
+    def _next_chunk(self, slot):
+        if slot.planned:
+            return slot.planned.popleft()
+        if slot.rate:
+            return self._carve(self._chunk_size(slot)) or self._steal(slot)
+        if slot.kind == "cpu":
+            return self._carve(PROBE_CHUNK_KEYS)
+        # An engine's first chunk: its rate is only known once it runs
+        left = sum(_size(interval) for interval in self.unassigned)
+        alive = sum(1 for other in self.slots if self._in_use(other))
+        return self._carve(min(self.max_engine_chunk, max(MIN_CHUNK_KEYS, left // alive)))
+
+    def _give_back(self, chunk):
+        """Return keys a slot will not scan to the front of the queue"""
+        if chunk[0] <= chunk[1]:
+            self.unassigned.insert(0, chunk)
+
+    def _drop(self, slot, reason):
+        """Stop using a slot and hand its chunks to the others"""
+        slot.alive = False
+        self.errors.append((slot.name, reason))
+        while slot.planned:
+            self._give_back(slot.planned.pop())
+
+    def _dispatch(self, slot, chunk, now):
+        slot.current = chunk
+        slot.started = now
+        if slot.kind == "cpu":
+            slot.base = self.counters[slot.index]
+            slot.reported = 0
+            try:
+                slot.conn.send(chunk)
+            except OSError as e:
+                slot.current = None
+                self._give_back(chunk)
+                self._drop(slot, f"Worker is gone: {e}")
+            return
+        try:
+            slot.child = EngineProcess(slot.spec.binary, self.address, chunk, slot.spec.args)
+        except OSError as e:
+            slot.current = None
+            self._give_back(chunk)
+            self._drop(slot, f"Cannot start {slot.spec.binary}: {e}")
+            return
+        slot.last_output = now
+
+    def _schedule(self):
+        """Start idle slots and plan the next chunk of busy ones"""
+        if self.stopped or not self.started:
+            return
+        now = time.monotonic()
+        for slot in self.slots:
+            if not self._in_use(slot):
+                continue
+            self._measure(slot, now)
+            if slot.current is None:
+                chunk = self._next_chunk(slot)
+                if chunk:
+                    self._dispatch(slot, chunk, now)
+        # Planned only once rates are known, so the sizes are right
+        for slot in self.slots:
+            if self._in_use(slot) and slot.current and not slot.planned and slot.rate and self.unassigned:
+                slot.planned.append(self._carve(self._chunk_size(slot)))
+
+    def _cpu_done(self, slot, key, error):
+        """A CPU worker finished, was stopped in or failed its chunk"""
+        chunk, slot.current = slot.current, None
+        done = self.counters[slot.index] - slot.base
+        if done > slot.reported:
+            self.completed.append((chunk[0] + slot.reported, chunk[0] + done - 1))
+        slot.keys += done
+        elapsed = time.monotonic() - slot.started
+        if done and elapsed > 0:
+            slot.rate = done / elapsed
+        if key is not None and self.found_key is None:
+            self.found_key = key
+        if done < _size(chunk) and key is None:
+            self._give_back((chunk[0] + done, chunk[1]))
+        if error:
+            self._drop(slot, error)
+
+    def _engine_done(self, slot, hung=False):
+        """An engine child exited or hung; a failed chunk is run again"""
+        child, slot.child = slot.child, None
+        chunk, slot.current = slot.current, None
+        child.close()
+        if hung:
+            child.kill()
+        code = child.process.wait()
+        if self.stopped:
+            return
+        if code == 0 and not hung:
+            slot.keys += child.size
+            self.completed.append(chunk)
+            slot.failures = 0
+            elapsed = time.monotonic() - slot.started
+            if not slot.rate and elapsed > 0:
+                slot.rate = child.size / elapsed
+            return
+
+        # Other slots may take the chunk, so failures count per engine
+        self._give_back(chunk)
+        slot.failures += 1
+        reason = f"no output for {self.heartbeat_seconds:g}s" if hung else f"exited with code {code}"
+        if slot.failures >= MAX_CHUNK_FAILURES:
+            self._drop(slot, f"Engine failed {slot.failures} times in a row ({reason}), dropping it")
+        else:
+            self.errors.append((slot.name, f"Engine {reason}, requeued {keyspace(chunk)}"))
+
+    def _read(self, slot):
+        child = slot.child
+        started = time.perf_counter()
+        try:
+            data = os.read(child.fd, 65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            # A pty reports EIO once the child has exited
+            data = b""
+        if not data:
+            self._engine_done(slot)
+            return
+        slot.last_output = time.monotonic()
+        child.feed(data)
+        self.io_seconds += time.perf_counter() - started
+        if child.found_key is not None:
+            key, child.found_key = child.found_key, None
+            if private_key_to_address(key) == self.address:
+                self.found_key = key
+            else:
+                self.errors.append((slot.name, f"Engine reported a key that does not match: {key:x}"))
+
+    def _running(self):
+        return any(slot.current for slot in self.slots)
+
+    def poll(self, timeout=0.0):
+        """Collect worker results and engine output; True once the run is over"""
+        deadline = time.monotonic() + timeout
+        while True:
+            waiting = {}
+            for slot in self.slots:
+                if slot.child:
+                    waiting[slot.child.fd] = slot
+                elif slot.current and slot.conn:
+                    waiting[slot.conn] = slot
+            wait = max(0.0, deadline - time.monotonic())
+            for ready in multiprocessing.connection.wait(list(waiting), wait if waiting else 0):
+                slot = waiting[ready]
+                if slot.child:
+                    self._read(slot)
+                    continue
+                try:
+                    key, error = slot.conn.recv()
+                except (EOFError, OSError):
+                    key, error = None, "Worker exited unexpectedly"
+                self._cpu_done(slot, key, error)
+
+            now = time.monotonic()
+            for slot in self.slots:
+                if slot.child and now - slot.last_output >= self.heartbeat_seconds:
+                    self._engine_done(slot, hung=True)
+
+            if self.found_key is not None:
+                self.stop()
+                return True
+            self._schedule()
+            if not self._running():
+                return True
+            if now >= deadline:
+                return False
+
+    def new_coverage(self):
+        """Keys finished since the last call, for the coverage journal
+
+        Engine chunks count once they exit cleanly; CPU workers scan in
+        ascending order, so the checked prefix of their running chunk counts
+        as it grows.
+        """
+        result, self.completed = self.completed, []
+        for slot in self.slots:
+            if slot.kind == "cpu" and slot.current:
+                done = slot.chunk_keys()
+                if done > slot.reported:
+                    result.append((slot.current[0] + slot.reported, slot.current[0] + done - 1))
+                    slot.reported = done
+        return result
+
+    def stop(self):
+        """Stop all workers and engines; unscanned keys are left for the next run"""
+        if self.stopped:
+            return
+        self.stopped = True
+        self.stop_event.set()
+        for slot in self.slots:
+            if slot.child:
+                slot.child.kill()
+                slot.child.close()
+                slot.keys += slot.child.keys
+                slot.child = None
+                self._give_back(slot.current)
+                slot.current = None
+            elif slot.launched:
+                try:
+                    slot.conn.send(None)
+                except OSError:
+                    pass
+        for slot in self.slots:
+            if not slot.launched:
+                continue
+            if slot.current:
+                # The worker answers once scan_range sees the stop event
+                if slot.conn.poll(STOP_TIMEOUT):
+                    try:
+                        key, error = slot.conn.recv()
+                    except (EOFError, OSError):
+                        key, error = None, None
+                    self._cpu_done(slot, key, error)
+            slot.process.join(STOP_TIMEOUT)
+            if slot.process.is_alive():
+                slot.process.terminate()
+                slot.process.join()
@@ -0,0 +1,223 @@
+"""
+Crash-safe coverage journal
+Records which subranges of a puzzle have been fully scanned so a restarted
+solver can skip them. The journal is an append-only file of checksummed
+interval records; appends are fsynced in batches and the file is compacted
+to the merged interval set in a background thread.
+"""
+
+import bisect
+import os
+import struct
+import threading
+import time
+import zlib
+
+DEFAULT_CHECKPOINT_DIR = os.path.join(
+    os.path.expanduser("~"), ".local", "share", "bitcoin-puzzle-solver", "checkpoints"
+)
+DEFAULT_FSYNC_INTERVAL = 30.0
+
+MAGIC = b"BPSJRNL1"
+# start, end (inclusive), crc32 of both
+RECORD = struct.Struct(">32s32sI")
+
+# Compact once the file holds this many more records than merged intervals
+COMPACT_SLACK = 4096
+
+
+def journal_path(directory, puzzle_num, variant=None):
+    """Journal file for a puzzle, or for another traversal of it such as a random order"""
+    if variant:
+        return os.path.join(directory, f"puzzle-{puzzle_num}.{variant}.journal")
+    return os.path.join(directory, f"puzzle-{puzzle_num}.journal")
+
+
+class IntervalSet:
+    """Sorted set of disjoint inclusive integer intervals"""
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in intervals:
+            self.add(start, end)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return iter(zip(self.starts, self.ends))
+
+    def add(self, start, end):
+        """Insert start..end, merging with overlapping or adjacent intervals"""
+        if end < start:
+            return
+        i = bisect.bisect_left(self.ends, start - 1)
+        j = bisect.bisect_right(self.starts, end + 1)
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def covered(self, lo, hi):
+        """Number of keys in lo..hi that are in the set"""
+        total = 0
+        i = bisect.bisect_left(self.ends, lo)
+        while i < len(self.starts) and self.starts[i] <= hi:
+            total += min(hi, self.ends[i]) - max(lo, self.starts[i]) + 1
+            i += 1
+        return total
+
+    def gaps(self, lo, hi):
+        """Intervals of lo..hi that are not in the set"""
+        result = []
+        cursor = lo
+        i = bisect.bisect_left(self.ends, lo)
+        while i < len(self.starts) and self.starts[i] <= hi:
+            if self.starts[i] > cursor:
+                result.append((cursor, self.starts[i] - 1))
+            cursor = max(cursor, self.ends[i] + 1)
+            i += 1
+        if cursor <= hi:
+            result.append((cursor, hi))
+        return result
+
+
+def _pack(start, end):
+    raw = start.to_bytes(32, "big") + end.to_bytes(32, "big")
+    return RECORD.pack(raw[:32], raw[32:], zlib.crc32(raw))
+
+
+def _fsync_directory(path):
+    """Make a rename into path's directory durable, where directories can be opened"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class CoverageJournal:
+    """Append-only, periodically fsynced record of scanned intervals"""
+
+    def __init__(self, path, fsync_interval=DEFAULT_FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.covered = IntervalSet()
+        self.lock = threading.Lock()
+        self.records = 0
+        self.dirty = False
+        self.last_sync = time.monotonic()
+        self.compactor = None
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        valid_size = self._load()
+        self.file = open(path, "r+b" if valid_size else "w+b")
+        if valid_size:
+            # Drop a torn or corrupt tail left by a crash
+            self.file.truncate(valid_size)
+            self.file.seek(valid_size)
+        else:
+            self.file.write(MAGIC)
+            self._fsync()
+
+    def _load(self):
+        """Read existing records; returns the size of the valid prefix"""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+
+        if not data.startswith(MAGIC):
+            return 0
+
+        offset = len(MAGIC)
+        while offset + RECORD.size <= len(data):
+            start, end, crc = RECORD.unpack_from(data, offset)
+            if zlib.crc32(start + end) != crc:
+                break
+            self.covered.add(int.from_bytes(start, "big"), int.from_bytes(end, "big"))
+            self.records += 1
+            offset += RECORD.size
+        return offset
+
+    def _fsync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.dirty = False
+        self.last_sync = time.monotonic()
+
+    def add(self, start, end):
+        """Record start..end as scanned; durable after the next sync"""
+        if end < start:
+            return
+        with self.lock:
+            self.covered.add(start, end)
+            self.file.write(_pack(start, end))
+            self.records += 1
+            self.dirty = True
+            if time.monotonic() - self.last_sync >= self.fsync_interval:
+                self._fsync()
+        if self.records > len(self.covered) + COMPACT_SLACK:
+            self.compact_in_background()
+
+    def sync(self):
+        """Force buffered records to disk"""
+        with self.lock:
+            if self.dirty:
+                self._fsync()
+
+    def compact(self):
+        """Rewrite the journal as the merged interval set
+
+        The merged set is written and fsynced without holding the lock, so
+        add() is not held up by the rewrite. Records appended meanwhile are
+        copied over from the old file just before the swap.
+        """
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self.lock:
+            intervals = list(self.covered)
+            self.file.flush()
+            offset = self.file.tell()
+
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            for start, end in intervals:
+                f.write(_pack(start, end))
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self.lock:
+            self.file.flush()
+            self.file.seek(offset)
+            tail = self.file.read()
+            with open(tmp_path, "ab") as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            _fsync_directory(self.path)
+            self.file.close()
+            self.file = open(self.path, "r+b")
+            self.file.seek(0, os.SEEK_END)
+            self.records = len(intervals) + len(tail) // RECORD.size
+            self.dirty = False
+
+    def compact_in_background(self):
+        """Start a compaction thread unless one is already running"""
+        if self.compactor and self.compactor.is_alive():
+            return
+        self.compactor = threading.Thread(target=self.compact, daemon=True)
+        self.compactor.start()
+
+    def close(self):
+        """Sync and close the journal"""
+        if self.compactor:
+            self.compactor.join()
+        with self.lock:
+            self._fsync()
+            self.file.close()
@@ -0,0 +1,378 @@
+"""
+Pollard's kangaroo solver for puzzles with a known public key
+Tame and wild herds walk with pseudo-random jumps and store distinguished
+points; a tame/wild collision yields the private key in about 2*sqrt(range)
+group operations, less with the negation map. MultiKangarooSolver shares
+one tame herd between several public keys.
+"""
+
+import hashlib
+import math
+import random
+
+from secp256k1 import N, P, batch_inverse, point_add, point_mul, point_neg, serialize_compressed
+
+DEFAULT_HERD_SIZE = 256
+DEFAULT_MAX_DP_ENTRIES = 1 << 22
+JUMP_COUNT = 32
+
+TAME = 0
+WILD = 1
+
+
+def auto_dp_bits(width, kangaroos):
+    """Distinguished point bits that keep DP overhead small for a range"""
+    per_kangaroo = math.sqrt(width) / max(1, kangaroos)
+    return max(0, int(math.log2(per_kangaroo)) - 3) if per_kangaroo > 1 else 0
+
+
+def collision_offsets(entry_a, entry_b):
+    """Offsets d (key = center + d) consistent with two colliding states (e, s)"""
+    e1, s1 = entry_a
+    e2, s2 = entry_b
+    for sign in (1, -1):
+        # e1*d + s1 = sign*(e2*d + s2)
+        coeff = (e1 - sign * e2) % N
+        if coeff:
+            yield (sign * s2 - s1) * pow(coeff, -1, N) % N
+
+
+def collision_key(range_start, range_end, pubkey, entry_a, entry_b):
+    """The private key if two colliding states solve pubkey in the range, else None"""
+    center = range_start + (range_end - range_start + 1) // 2
+    for d in collision_offsets(entry_a, entry_b):
+        for offset in (d, d - N):
+            key = center + offset
+            if range_start <= key <= range_end and point_mul(key) == pubkey:
+                return key
+    return None
+
+
+class KangarooSolver:
+    """Parallel kangaroo over range_start..range_end for one public key
+
+    Every kangaroo is a point e*Q' + s*G, where Q' is the target shifted to
+    the middle of the range and e is 0 for tame and +/-1 for wild ones.
+    With the negation map each point is replaced by whichever of +/-R has an
+    even y, which halves the effective search space.
+
+    Walks only merge when they share the jump table, so runs whose DPs are
+    pooled (dp_writer, see dpstore.py) draw it from a fixed jump_seed;
+    context() identifies everything a pooled DP depends on.
+    """
+
+    def __init__(self, range_start, range_end, pubkey, herd_size=DEFAULT_HERD_SIZE,
+                 dp_bits=None, negation=True, max_dp_entries=DEFAULT_MAX_DP_ENTRIES, seed=None,
+                 jump_seed=None, dp_writer=None):
+        self.range_start = range_start
+        self.range_end = range_end
+        self.pubkey = pubkey
+        self.width = range_end - range_start + 1
+        self.center = range_start + self.width // 2
+        self.target = point_add(pubkey, point_neg(point_mul(self.center)))
+        self.herd_size = herd_size
+        self.negation = negation
+        self.max_dp_entries = max_dp_entries
+        self.rng = random.Random(seed)
+        self.dp_writer = dp_writer
+
+        kangaroos = self.kangaroo_count()
+        self.dp_bits = auto_dp_bits(self.width, kangaroos) if dp_bits is None else dp_bits
+        self.dp_mask = (1 << self.dp_bits) - 1
+
+        # van Oorschot-Wiener mean jump, over half the range with negation
+        span = self.width // 2 if negation else self.width
+        mean = max(1, int(kangaroos * math.sqrt(span) / 4))
+        jump_rng = self.rng if jump_seed is None else random.Random(jump_seed)
+        self.jumps = [jump_rng.randint(1, 2 * mean) for _ in range(JUMP_COUNT)]
+        self.jump_points = [point_mul(jump) for jump in self.jumps]
+
+        self.dp_table = {}
+        self.operations = 0
+        self.dp_count = 0
+        self.restarts = 0
+        self.key = None
+        # Walk state per kangaroo, set up by solve()
+        self.kinds = []
+        self.points = []
+        self.es = []
+        self.ss = []
+        self.last_jump = []
+
+    def kangaroo_count(self):
+        return 2 * self.herd_size
+
+    def _herds(self):
+        """Kind of every kangaroo"""
+        return [TAME] * self.herd_size + [WILD] * self.herd_size
+
+    def _spawn(self, kind):
+        """Random starting state (point, e, s) for a new kangaroo"""
+        half = self.width // 2
+        if kind == TAME:
+            e = 0
+            s = self.rng.randint(0 if self.negation else -half, half)
+            point = point_mul(s) if s else None
+        else:
+            e = 1
+            s = self.rng.randint(-half // 2, half // 2)
+            point = point_add(self.target, point_mul(s) if s else None)
+        return self._canonical(point, e, s)
+
+    def _canonical(self, point, e, s):
+        """Pick the even-y representative of +/-point under the negation map"""
+        if point is None:
+            # Landed exactly on infinity; nudge the kangaroo by one jump
+            point = self.jump_points[0]
+            s += self.jumps[0]
+        if self.negation and point[1] & 1:
+            return (point[0], P - point[1]), -e, -s
+        return point, e, s
+
+    def context(self):
+        """Digest of the target, range, negation map and jump table"""
+        data = b"".join([
+            serialize_compressed(self.pubkey),
+            self.range_start.to_bytes(32, "big"),
+            self.range_end.to_bytes(32, "big"),
+            bytes([self.negation]),
+            *(jump.to_bytes(32, "big") for jump in self.jumps),
+        ])
+        return hashlib.sha256(data).digest()
+
+    def _check_collision(self, entry_a, entry_b):
+        """Return the private key if a collision solves the target"""
+        return collision_key(self.range_start, self.range_end, self.pubkey, entry_a, entry_b)
+
+    def _store_dp(self, x, entry):
+        """Record a distinguished point, returns the colliding entry if any"""
+        if self.dp_writer:
+            self.dp_writer.append(x, *entry)
+        other = self.dp_table.get(x)
+        if other is not None:
+            return other
+
+        self.dp_table[x] = entry
+        self.dp_count += 1
+        if len(self.dp_table) > self.max_dp_entries:
+            self._raise_dp_bits()
+        return None
+
+    def _restart(self, i):
+        self.points[i], self.es[i], self.ss[i] = self._spawn(self.kinds[i])
+        self.last_jump[i] = -1
+        self.restarts += 1
+
+    def _distinguished(self, i, x):
+        """Store kangaroo i's DP and act on a collision; True once the search is over"""
+        entry = (self.es[i], self.ss[i])
+        other = self._store_dp(x, entry)
+        if other is None:
+            return False
+        if entry[0] or other[0]:
+            key = self._check_collision(entry, other)
+            if key is not None:
+                self.key = key
+                return True
+        # Same-herd or fruitless collision: restart this one
+        self._restart(i)
+        return False
+
+    def _raise_dp_bits(self):
+        """Keep the DP table bounded by making points rarer"""
+        while len(self.dp_table) > self.max_dp_entries // 2:
+            self.dp_bits += 1
+            self.dp_mask = (1 << self.dp_bits) - 1
+            self.dp_table = {
+                x: entry for x, entry in self.dp_table.items() if x & self.dp_mask == 0
+            }
+
+    def solve(self, should_stop=None, on_progress=None):
+        """Run the herds until the key is found; returns the key or None"""
+        kinds = self.kinds = self._herds()
+        states = [self._spawn(kind) for kind in kinds]
+        points = self.points = [state[0] for state in states]
+        es = self.es = [state[1] for state in states]
+        ss = self.ss = [state[2] for state in states]
+        last_jump = self.last_jump = [-1] * len(kinds)
+        since_dp = [0] * len(kinds)
+        stall_limit = 32 << self.dp_bits
+
+        jumps = self.jumps
+        jump_points = self.jump_points
+        negation = self.negation
+        count = len(kinds)
+
+        while not (should_stop and should_stop()):
+            # Jump index depends on x only; never repeat the previous jump,
+            # which rules out the fruitless 2-cycles of the negation map
+            indices = []
+            deltas = []
+            for i in range(count):
+                j = points[i][0] % JUMP_COUNT
+                if j == last_jump[i]:
+                    j = (j + 1) % JUMP_COUNT
+                indices.append(j)
+                deltas.append((jump_points[j][0] - points[i][0]) % P)
+
+            if 0 in deltas:
+                inverses = None
+            else:
+                inverses = batch_inverse(deltas)
+
+            for i in range(count):
+                j = indices[i]
+                jx, jy = jump_points[j]
+                x, y = points[i]
+                if inverses is None:
+                    new_point = point_add(points[i], jump_points[j])
+                    if new_point is None:
+                        points[i], es[i], ss[i] = self._spawn(kinds[i])
+                        last_jump[i] = -1
+                        continue
+                    x3, y3 = new_point
+                else:
+                    lam = (jy - y) * inverses[i] % P
+                    x3 = (lam * lam - x - jx) % P
+                    y3 = (lam * (x - x3) - y) % P
+
+                e = es[i]
+                s = ss[i] + jumps[j]
+                if negation and y3 & 1:
+                    y3 = P - y3
+                    e = -e
+                    s = -s
+
+                points[i] = (x3, y3)
+                es[i] = e
+                ss[i] = s
+                last_jump[i] = j
+                since_dp[i] += 1
+
+                if x3 & self.dp_mask == 0:
+                    since_dp[i] = 0
+                    if self._distinguished(i, x3):
+                        self.operations += count
+                        return self.key
+                elif since_dp[i] > stall_limit:
+                    # Probably trapped in a longer fruitless cycle
+                    since_dp[i] = 0
+                    self._restart(i)
+
+            stall_limit = 32 << self.dp_bits
+            self.operations += count
+            if on_progress:
+                on_progress(count)
+
+        return None
+
+
+class KangarooTarget:
+    """One public key of a multi-target run, shifted to the middle of its range"""
+
+    def __init__(self, range_start, range_end, pubkey):
+        self.range_start = range_start
+        self.range_end = range_end
+        self.pubkey = pubkey
+        self.width = range_end - range_start + 1
+        self.center = range_start + self.width // 2
+        self.shifted = point_add(pubkey, point_neg(point_mul(self.center)))
+        self.key = None
+
+    def solve(self, entry_a, entry_b):
+        return collision_key(self.range_start, self.range_end, self.pubkey, entry_a, entry_b)
+
+
+class MultiKangarooSolver(KangarooSolver):
+    """Kangaroo over several public keys with one shared tame herd
+
+    targets are (range_start, range_end, pubkey) triples. Each target is
+    shifted so its range is centred on 0, which puts all of them in one
+    normalized interval, as wide as the widest range; the tame herd walks
+    that interval once for all of them and every target has a wild herd of
+    wild_herd_size kangaroos. DP entries are (e, s, kind) with kind TAME or
+    WILD + target index, all in one table, so one lookup checks a point
+    against every target. A solved target's wild kangaroos know their own
+    logarithms and walk on as tame ones, and so do its stored DPs.
+
+    solve() runs until every target is solved and returns {index: key};
+    on_key(index, key) is called as each one is found. DPs are not
+    written to a DP store, whose records carry no target.
+    """
+
+    def __init__(self, targets, herd_size=DEFAULT_HERD_SIZE, wild_herd_size=None, dp_bits=None,
+                 negation=True, max_dp_entries=DEFAULT_MAX_DP_ENTRIES, seed=None, jump_seed=None,
+                 on_key=None):
+        self.targets = [KangarooTarget(*target) for target in targets]
+        self.wild_herd_size = wild_herd_size or max(1, herd_size // len(self.targets))
+        self.on_key = on_key
+        widest = max(self.targets, key=lambda target: target.width)
+        super().__init__(
+            widest.range_start, widest.range_end, widest.pubkey, herd_size, dp_bits, negation,
+            max_dp_entries, seed, jump_seed
+        )
+
+    def kangaroo_count(self):
+        return self.herd_size + self.wild_herd_size * len(self.targets)
+
+    def _herds(self):
+        kinds = [TAME] * self.herd_size
+        for index, target in enumerate(self.targets):
+            kinds += [TAME if target.key is not None else WILD + index] * self.wild_herd_size
+        return kinds
+
+    def _spawn(self, kind):
+        if kind == TAME:
+            return super()._spawn(kind)
+        target = self.targets[kind - WILD]
+        quarter = target.width // 4
+        s = self.rng.randint(-quarter, quarter)
+        point = point_add(target.shifted, point_mul(s) if s else None)
+        return self._canonical(point, 1, s)
+
+    def _as_tame(self, entry):
+        """An entry with the logarithm of a solved target filled in"""
+        e, s, kind = entry
+        if kind == TAME or self.targets[kind - WILD].key is None:
+            return entry
+        target = self.targets[kind - WILD]
+        return (0, e * (target.key - target.center) + s, TAME)
+
+    def _distinguished(self, i, x):
+        entry = (self.es[i], self.ss[i], self.kinds[i])
+        other = self._store_dp(x, entry)
+        if other is None:
+            return False
+        a, b = self._as_tame(entry), self._as_tame(other)
+        # Tame/tame and wild walks of two different open targets tell nothing
+        wild = {kind for _, _, kind in (a, b) if kind != TAME}
+        if len(wild) == 1:
+            index = wild.pop() - WILD
+            key = self.targets[index].solve(a[:2], b[:2])
+            if key is not None:
+                self._solved(index, key)
+                if all(target.key is not None for target in self.targets):
+                    return True
+        # Kangaroo i now follows the other walk's trail, so it starts afresh
+        self._restart(i)
+        return False
+
+    def _solved(self, index, key):
+        """Record a key and turn the target's wild herd tame"""
+        target = self.targets[index]
+        target.key = key
+        offset = key - target.center
+        for i, kind in enumerate(self.kinds):
+            if kind == WILD + index:
+                self.kinds[i] = TAME
+                self.ss[i] += self.es[i] * offset
+                self.es[i] = 0
+        if self.on_key:
+            self.on_key(index, key)
+
+    def solve(self, should_stop=None, on_progress=None):
+        """Run the herds until every target is solved; returns {index: key} of those found"""
+        super().solve(should_stop, on_progress)
+        return {
+            index: target.key for index, target in enumerate(self.targets) if target.key is not None
+        }
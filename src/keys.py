@@ -0,0 +1,65 @@
+"""
+Bitcoin key and address helpers
+Hash160 and Base58Check encoding for P2PKH addresses.
+"""
+
+import hashlib
+
+from secp256k1 import point_mul, serialize_compressed
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_BASE58_INDEX = {char: index for index, char in enumerate(BASE58_ALPHABET)}
+
+
+def hash160(data):
+    """RIPEMD-160 of SHA-256"""
+    return hashlib.new("ripemd160", hashlib.sha256(data).digest()).digest()
+
+
+def b58decode_check(text):
+    """Decode a Base58Check string and verify its checksum"""
+    value = 0
+    for char in text:
+        if char not in _BASE58_INDEX:
+            raise ValueError(f"Invalid Base58 character: {char!r}")
+        value = value * 58 + _BASE58_INDEX[char]
+
+    pad = len(text) - len(text.lstrip("1"))
+    raw = b"\x00" * pad + value.to_bytes((value.bit_length() + 7) // 8, "big")
+    if len(raw) < 5:
+        raise ValueError("Base58Check string too short")
+
+    payload, checksum = raw[:-4], raw[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum:
+        raise ValueError("Base58Check checksum mismatch")
+    return payload
+
+
+def b58encode_check(payload):
+    """Encode bytes as a Base58Check string"""
+    raw = payload + hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4]
+    value = int.from_bytes(raw, "big")
+    chars = []
+    while value:
+        value, rem = divmod(value, 58)
+        chars.append(BASE58_ALPHABET[rem])
+    pad = len(raw) - len(raw.lstrip(b"\x00"))
+    return "1" * pad + "".join(reversed(chars))
+
+
+def address_to_hash160(address):
+    """Extract the 20-byte hash160 from a P2PKH address"""
+    payload = b58decode_check(address)
+    if len(payload) != 21 or payload[0] != 0:
+        raise ValueError(f"Not a P2PKH address: {address}")
+    return payload[1:]
+
+
+def hash160_to_address(h160):
+    """Build a P2PKH address from a 20-byte hash160"""
+    return b58encode_check(b"\x00" + h160)
+
+
+def private_key_to_address(private_key):
+    """Compressed P2PKH address for a private key"""
+    return hash160_to_address(hash160(serialize_compressed(point_mul(private_key))))
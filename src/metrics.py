@@ -0,0 +1,193 @@
+"""
+Solver metrics
+Smoothed and sliding-window key rates for the whole run and for each
+worker, engine stage times, and slow-worker detection, served in the
+Prometheus text format on a localhost HTTP port for scraping.
+"""
+
+import collections
+import http.server
+import statistics
+import threading
+import time
+
+from telemetry import STAGES
+
+DEFAULT_RATE_WINDOW = 60.0
+DEFAULT_EWMA_HALFLIFE = 10.0
+# A worker is flagged when its windowed rate drops below this fraction of
+# the median worker rate
+DEFAULT_STALL_FRACTION = 0.5
+METRICS_HOST = "127.0.0.1"
+PREFIX = "bitcoin_puzzle"
+
+
+class RateMeter:
+    """Keys/sec of a growing counter as an EWMA and over a sliding window"""
+
+    def __init__(self, window=DEFAULT_RATE_WINDOW, halflife=DEFAULT_EWMA_HALFLIFE):
+        self.window = window
+        self.halflife = halflife
+        self.samples = collections.deque()
+        self.ewma = 0.0
+
+    def update(self, total, now):
+        if self.samples:
+            last_time, last_total = self.samples[-1]
+            dt = now - last_time
+            if dt <= 0:
+                return
+            rate = (total - last_total) / dt
+            if len(self.samples) == 1:
+                self.ewma = rate
+            else:
+                self.ewma += (1 - 0.5 ** (dt / self.halflife)) * (rate - self.ewma)
+        self.samples.append((now, total))
+        # Keep one sample at or before the window start
+        while len(self.samples) > 2 and self.samples[1][0] <= now - self.window:
+            self.samples.popleft()
+
+    @property
+    def window_rate(self):
+        if len(self.samples) < 2:
+            return 0.0
+        (t0, n0), (t1, n1) = self.samples[0], self.samples[-1]
+        return (n1 - n0) / (t1 - t0)
+
+    @property
+    def span(self):
+        """Seconds covered by the window so far"""
+        if not self.samples:
+            return 0.0
+        return self.samples[-1][0] - self.samples[0][0]
+
+
+class Metrics:
+    """Metrics of one solver run
+
+    update() is fed a snapshot per sample interval; render() returns the
+    current values in the Prometheus text exposition format.
+    """
+
+    def __init__(self, puzzle_num, engine, window=DEFAULT_RATE_WINDOW,
+                 halflife=DEFAULT_EWMA_HALFLIFE, stall_fraction=DEFAULT_STALL_FRACTION):
+        self.labels = f'puzzle="{puzzle_num}",engine="{engine}"'
+        self.window = window
+        self.halflife = halflife
+        self.stall_fraction = stall_fraction
+        self.lock = threading.Lock()
+        self.start_time = time.monotonic()
+        self.total = RateMeter(window, halflife)
+        self.workers = []
+        self.keys = 0
+        self.worker_keys = []
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.stalled = set()
+
+    def update(self, workers, stages, now=None):
+        """Record a snapshot and re-check the workers for stalls
+
+        workers is a list of (keys checked, keys assigned or None) per
+        worker and stages maps stage names to seconds. Returns the workers
+        that became stalled and those that recovered since the last update.
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            while len(self.workers) < len(workers):
+                self.workers.append(RateMeter(self.window, self.halflife))
+            self.worker_keys = [keys for keys, _ in workers]
+            self.keys = sum(self.worker_keys)
+            self.total.update(self.keys, now)
+            for meter, keys in zip(self.workers, self.worker_keys):
+                meter.update(keys, now)
+            self.stages.update(stages)
+
+            # Only compare workers that still have work and a full window
+            active = [
+                i for i, (keys, size) in enumerate(workers)
+                if (size is None or keys < size) and self.workers[i].span >= self.window / 2
+            ]
+            stalled = set()
+            if len(active) > 1:
+                median = statistics.median(self.workers[i].window_rate for i in active)
+                stalled = {i for i in active if self.workers[i].window_rate < self.stall_fraction * median}
+            became = sorted(stalled - self.stalled)
+            recovered = sorted(self.stalled - stalled)
+            self.stalled = stalled
+            return became, recovered
+
+    @property
+    def rate(self):
+        """Keys/sec over the sliding window"""
+        return self.total.window_rate
+
+    def render(self):
+        """Current metrics in the Prometheus text format"""
+        labels = self.labels
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for extra, value in samples:
+                lines.append(f"{PREFIX}_{name}{{{labels}{extra}}} {value}")
+
+        with self.lock:
+            window = f"{self.window:g}s"
+            metric("keys_total", "counter", "Keys checked in this run", [("", self.keys)])
+            metric("elapsed_seconds", "gauge", "Seconds since the run started",
+                   [("", round(time.monotonic() - self.start_time, 3))])
+            metric("keys_per_second", "gauge", "Key rate, smoothed and over a sliding window", [
+                (',window="ewma"', round(self.total.ewma, 1)),
+                (f',window="{window}"', round(self.total.window_rate, 1)),
+            ])
+            metric("worker_keys_total", "counter", "Keys checked per worker",
+                   [(f',worker="{i}"', keys) for i, keys in enumerate(self.worker_keys)])
+            metric("worker_keys_per_second", "gauge", "Key rate per worker over a sliding window",
+                   [(f',worker="{i}"', round(meter.window_rate, 1)) for i, meter in enumerate(self.workers)])
+            metric("worker_stalled", "gauge", "1 if the worker is well below the median worker rate",
+                   [(f',worker="{i}"', int(i in self.stalled)) for i in range(len(self.workers))])
+            metric("stage_seconds_total", "counter", "Time spent per engine stage",
+                   [(f',stage="{stage}"', round(seconds, 6)) for stage, seconds in self.stages.items()])
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """Serve a Metrics object at http://127.0.0.1:port/metrics"""
+
+    def __init__(self, metrics, port, host=METRICS_HOST):
+        self.httpd = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.metrics = metrics
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def start(self):
+        self.thread.start()
+
+    def set_metrics(self, metrics):
+        self.httpd.metrics = metrics
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
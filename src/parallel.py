@@ -0,0 +1,269 @@
+"""
+Multi-process keyspace scanning
+Splits the unscanned part of a puzzle range into disjoint subranges and
+scans each one in its own process, so the CPU solver is not limited to one
+core by the GIL.
+"""
+
+import multiprocessing
+import os
+import queue
+import signal
+
+from engine import DEFAULT_BACKEND, DEFAULT_BATCH_SIZE, scan_range
+from hashing import DEFAULT_HASHER
+from profiling import profiled
+from telemetry import CounterBlock, StageTimes
+from topology import pin
+
+# How long stop() waits for workers before terminating them
+STOP_TIMEOUT = 5.0
+
+
+def default_workers():
+    """Number of worker processes to use when none is configured"""
+    return os.cpu_count() or 1
+
+
+def partition_intervals(intervals, parts):
+    """Split disjoint intervals into per-worker lists with equal key counts
+
+    Each worker gets its keys in ascending order; together the lists cover
+    exactly the input intervals.
+    """
+    total = sum(end - start + 1 for start, end in intervals)
+    if total == 0:
+        return []
+    parts = max(1, min(parts, total))
+    size, extra = divmod(total, parts)
+
+    assignments = []
+    pending = list(intervals)
+    for i in range(parts):
+        need = size + (1 if i < extra else 0)
+        assignment = []
+        while need:
+            start, end = pending[0]
+            take = min(need, end - start + 1)
+            assignment.append((start, start + take - 1))
+            need -= take
+            if start + take > end:
+                pending.pop(0)
+            else:
+                pending[0] = (start + take, end)
+        assignments.append(assignment)
+    return assignments
+
+
+def slice_intervals(intervals, begin, end):
+    """Intervals covering key offsets begin..end-1 of an ordered interval list"""
+    result = []
+    offset = 0
+    for start, stop in intervals:
+        length = stop - start + 1
+        lo = max(begin, offset)
+        hi = min(end, offset + length)
+        if lo < hi:
+            result.append((start + lo - offset, start + hi - offset - 1))
+        offset += length
+        if offset >= end:
+            break
+    return result
+
+
+def _run_task(task, index, intervals, args, setup, counters, stage_times, stop_event, results,
+              profile_dir, cpus):
+    """Process entry point: run a task over assigned intervals and report the outcome"""
+    def on_progress(count):
+        counters.add(index, count)
+
+    def on_stage(stage, seconds):
+        stage_times.add(index, stage, seconds)
+
+    def search():
+        for range_start, range_end in intervals:
+            if stop_event.is_set():
+                break
+            key = task(
+                range_start, range_end, *args,
+                should_stop=stop_event.is_set,
+                on_progress=on_progress,
+                on_stage=on_stage
+            )
+            if key is not None:
+                return key
+        return None
+
+    # Ctrl-C reaches the whole process group; the parent decides when to stop.
+    # Forked workers also inherit the parent's SIGTERM handler, so restore it.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    key = None
+    try:
+        # Pinned before setup, so the tables are mapped from this CPU's node
+        if cpus:
+            pin(cpus)
+        if setup:
+            setup[0](*setup[1])
+        key = profiled(profile_dir, f"worker{index}", search)
+    except Exception as e:
+        results.put((index, None, str(e)))
+        return
+
+    if key is not None:
+        stop_event.set()
+    results.put((index, key, None))
+
+
+class WorkerPool:
+    """Run a search task over disjoint intervals, one process per assignment
+
+    The task is a module-level function called as
+    task(range_start, range_end, *args, should_stop=..., on_progress=..., on_stage=...)
+    for each interval of a worker's assignment in order; it returns the
+    private key or None and reports keys in ascending order, so a worker's
+    counter is always the length of the prefix it has finished. on_stage
+    takes per-stage timings (see telemetry.STAGES).
+    An optional setup (function, args) pair runs in each worker first,
+    e.g. to map precomputed tables. With a profile_dir, every worker dumps
+    its profile there when it ends (see profiling.write_report). placement
+    is a CPU set per worker to pin it to (see topology.py). A worker that
+    raises or dies without reporting counts as an error, and the keys it
+    left go into unfinished.
+    """
+
+    def __init__(self, task, assignments, args=(), setup=None, profile_dir=None, placement=None):
+        self.assignments = assignments
+        self.total = sum(end - start + 1 for intervals in assignments for start, end in intervals)
+        self.sizes = [sum(end - start + 1 for start, end in intervals) for intervals in assignments]
+        self.reported = [0] * len(assignments)
+
+        ctx = multiprocessing.get_context()
+        self.counters = CounterBlock(len(assignments), ctx=ctx)
+        self.stage_times = StageTimes(len(assignments), ctx=ctx)
+        self.stop_event = ctx.Event()
+        self.results = ctx.Queue()
+        self.processes = [
+            ctx.Process(
+                target=_run_task,
+                args=(
+                    task, i, intervals, args, setup,
+                    self.counters, self.stage_times, self.stop_event, self.results,
+                    profile_dir, placement[i] if placement else None
+                ),
+                daemon=True
+            )
+            for i, intervals in enumerate(assignments)
+        ]
+        self.pending = len(self.processes)
+        self.done = [False] * len(self.processes)
+        self.failed = set()
+        self.found_key = None
+        self.errors = []
+
+    @property
+    def workers(self):
+        return len(self.processes)
+
+    def start(self):
+        """Launch all worker processes"""
+        for process in self.processes:
+            process.start()
+
+    def total_keys(self):
+        """Keys checked so far across all workers"""
+        return self.counters.total()
+
+    def worker_progress(self):
+        """(keys checked, keys assigned) for each worker"""
+        return [(self.counters[i], size) for i, size in enumerate(self.sizes)]
+
+    def stage_seconds(self):
+        """Seconds per engine stage summed over all workers"""
+        return self.stage_times.totals()
+
+    @property
+    def unfinished(self):
+        """Keys left unscanned by workers that failed or died"""
+        return sum(max(0, self.sizes[i] - self.counters[i]) for i in self.failed)
+
+    def new_coverage(self):
+        """Intervals finished since the last call, for the coverage journal"""
+        result = []
+        for i, intervals in enumerate(self.assignments):
+            done = self.counters[i]
+            if done > self.reported[i]:
+                result.extend(slice_intervals(intervals, self.reported[i], done))
+                self.reported[i] = done
+        return result
+
+    def poll(self, timeout=0.0):
+        """Collect finished workers; returns True once the search is over"""
+        self._collect(timeout)
+        if self.pending:
+            # A worker killed outright (OOM killer, SIGKILL) never reports.
+            # Its result would already be in the queue, so collect once more.
+            dead = [i for i, process in enumerate(self.processes)
+                    if not self.done[i] and process.exitcode is not None]
+            if dead:
+                self._collect(0.0)
+            for i in dead:
+                if self.done[i]:
+                    continue
+                if self.stop_event.is_set():
+                    # Terminated while stopping, which is not a failure
+                    self._finish(i, None, None)
+                else:
+                    self._finish(i, None, f"Worker exited with code {self.processes[i].exitcode} "
+                                          "without reporting")
+        return self.pending == 0 or self.found_key is not None
+
+    def _collect(self, timeout):
+        while self.pending:
+            try:
+                index, key, error = self.results.get(timeout=timeout)
+            except queue.Empty:
+                break
+            timeout = 0.0
+            self._finish(index, key, error)
+
+    def _finish(self, index, key, error):
+        if self.done[index]:
+            return
+        self.done[index] = True
+        self.pending -= 1
+        if error:
+            self.errors.append((index, error))
+            self.failed.add(index)
+        if key is not None and self.found_key is None:
+            self.found_key = key
+
+    def stop(self):
+        """Signal every worker to stop and wait for them to exit"""
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(STOP_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.poll()
+
+
+class ParallelScanner(WorkerPool):
+    """Scan intervals with the keys split evenly across worker processes"""
+
+    def __init__(self, intervals, target, workers=None, batch_size=DEFAULT_BATCH_SIZE,
+                 backend=DEFAULT_BACKEND, hasher=DEFAULT_HASHER, setup=None, profile_dir=None,
+                 placement=None):
+        super().__init__(
+            scan_range,
+            partition_intervals(intervals, workers or default_workers()),
+            (target, batch_size, backend, hasher),
+            setup,
+            profile_dir,
+            placement
+        )
+        self.target = target
+        self.batch_size = batch_size
+        self.backend = backend
+        self.hasher = hasher
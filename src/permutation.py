@@ -0,0 +1,182 @@
+"""
+Randomized chunk order over a key range
+Splits a range into fixed-size chunks and visits them in the order of a
+keyed pseudo-random permutation of the chunk indices: a Feistel network
+over the next even bit width, cycle-walked down to the chunk count.
+Nothing is stored per chunk, so a traversal is fully described by its seed
+and how far it got, whatever the size of the range.
+
+Machines sharing a seed take every nodes-th position starting at their
+node number, so their traversals are disjoint without coordination.
+Each node's traversal is a virtual key space: virtual key v is offset
+v % chunk_size of the chunk at position v // chunk_size, so worker pools,
+progress counters and the coverage journal work on virtual intervals
+exactly as they do on real ones.
+"""
+
+import hashlib
+import os
+
+from engine import DEFAULT_BACKEND, DEFAULT_BATCH_SIZE, scan_range
+from hashing import DEFAULT_HASHER
+
+ORDERS = ("sequential", "random")
+DEFAULT_CHUNK_BITS = 24
+FEISTEL_ROUNDS = 8
+SEED_FILE = "random-order.seed"
+
+
+class FeistelPermutation:
+    """Keyed bijection of 0..size-1"""
+
+    def __init__(self, size, key):
+        if size < 1:
+            raise ValueError("Permutation size must be positive")
+        self.size = size
+        self.key = key
+        self.half = max(1, ((size - 1).bit_length() + 1) // 2)
+        self.mask = (1 << self.half) - 1
+        self.width = (self.half + 7) // 8
+
+    def _round(self, i, value):
+        data = bytes([i]) + value.to_bytes(self.width, "little")
+        digest = hashlib.blake2b(data, key=self.key, digest_size=min(64, self.width)).digest()
+        return int.from_bytes(digest, "little") & self.mask
+
+    def _encrypt(self, x):
+        left, right = x >> self.half, x & self.mask
+        for i in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ self._round(i, right)
+        return (left << self.half) | right
+
+    def _decrypt(self, x):
+        left, right = x >> self.half, x & self.mask
+        for i in reversed(range(FEISTEL_ROUNDS)):
+            left, right = right ^ self._round(i, left), left
+        return (left << self.half) | right
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        # Cycle-walk: re-encrypt until the value falls inside the domain
+        value = self._encrypt(index)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+    def index(self, value):
+        """Inverse permutation: the index that maps to value"""
+        if not 0 <= value < self.size:
+            raise ValueError(value)
+        index = self._decrypt(value)
+        while index >= self.size:
+            index = self._decrypt(index)
+        return index
+
+
+def order_key(seed, range_start, range_end, chunk_bits):
+    """Permutation key for a seed; the same seed orders other ranges differently"""
+    data = f"{seed}:{range_start:x}:{range_end:x}:{chunk_bits}".encode()
+    return hashlib.blake2b(data, digest_size=32, person=b"chunk-order").digest()
+
+
+def load_seed(directory):
+    """This installation's random order seed, created on first use"""
+    path = os.path.join(directory, SEED_FILE)
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    os.makedirs(directory, exist_ok=True)
+    seed = os.urandom(16).hex()
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "w") as f:
+        f.write(seed + "\n")
+    os.replace(temp, path)
+    return seed
+
+
+class ChunkOrder:
+    """One node's seeded traversal of the chunks of range_start..range_end
+
+    Positions are numbered 0..positions-1 for this node; virtual keys run
+    over 0..length-1. The last chunk of the range may be short, its missing
+    virtual keys are skipped but still counted as scanned.
+    """
+
+    def __init__(self, range_start, range_end, seed, chunk_bits=DEFAULT_CHUNK_BITS, node=0, nodes=1):
+        if not 0 <= node < nodes:
+            raise ValueError(f"Node {node} is not in 0..{nodes - 1}")
+        self.range_start = range_start
+        self.range_end = range_end
+        self.chunk_bits = chunk_bits
+        self.chunk_size = 1 << chunk_bits
+        self.chunks = (range_end - range_start) // self.chunk_size + 1
+        self.node = node
+        self.nodes = nodes
+        self.key = order_key(seed, range_start, range_end, chunk_bits)
+        self.permutation = FeistelPermutation(self.chunks, self.key)
+        self.positions = len(range(node, self.chunks, nodes))
+        self.length = self.positions * self.chunk_size
+
+    @property
+    def name(self):
+        """Identifies the traversal, e.g. for its coverage journal"""
+        return f"random-{self.key.hex()[:16]}-{self.node}of{self.nodes}"
+
+    def chunk(self, position):
+        """Key interval (start, end) of the chunk at a position"""
+        index = self.permutation[self.node + self.nodes * position]
+        start = self.range_start + index * self.chunk_size
+        return start, min(start + self.chunk_size - 1, self.range_end)
+
+    def position(self, key):
+        """This node's position of the chunk holding key, or None if another node has it"""
+        index = (key - self.range_start) >> self.chunk_bits
+        node_position, node = divmod(self.permutation.index(index), self.nodes)
+        return node_position if node == self.node else None
+
+    def key_intervals(self, virtual_start, virtual_end):
+        """Key intervals of virtual keys virtual_start..virtual_end, in scan order"""
+        virtual = virtual_start
+        while virtual <= virtual_end:
+            position, offset = divmod(virtual, self.chunk_size)
+            stop = min(virtual_end, virtual - offset + self.chunk_size - 1)
+            start, end = self.chunk(position)
+            if start + offset <= end:
+                yield start + offset, min(end, start + stop - virtual + offset)
+            virtual = stop + 1
+
+
+def scan_chunks(virtual_start, virtual_end, order, target_hash160, batch_size=DEFAULT_BATCH_SIZE,
+                backend=DEFAULT_BACKEND, hasher=DEFAULT_HASHER, should_stop=None, on_progress=None,
+                on_stage=None):
+    """WorkerPool task: scan virtual keys virtual_start..virtual_end of a ChunkOrder
+
+    Each chunk piece is scanned with engine.scan_range; progress is counted
+    in virtual keys. Returns the private key, or None.
+    """
+    virtual = virtual_start
+    while virtual <= virtual_end:
+        offset = virtual % order.chunk_size
+        stop = min(virtual_end, virtual - offset + order.chunk_size - 1)
+        scanned = 0
+        for start, end in order.key_intervals(virtual, stop):
+            key = scan_range(
+                start, end, target_hash160, batch_size, backend, hasher,
+                should_stop, on_progress, on_stage
+            )
+            if key is not None:
+                return key
+            scanned = end - start + 1
+        if should_stop and should_stop():
+            return None
+        # Virtual keys past the end of a short last chunk
+        if on_progress and stop - virtual + 1 > scanned:
+            on_progress(stop - virtual + 1 - scanned)
+        virtual = stop + 1
+    return None
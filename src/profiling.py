@@ -0,0 +1,240 @@
+"""
+Profiling and micro-benchmarks for the scanning hot path
+Micro-benchmarks time each primitive of the per-key pipeline on its own:
+field multiply and inverse, lane point addition, batch inversion, key
+serialization, hash160 and the target compare.
+
+The profiling mode runs each engine process under cProfile and a stack
+sampler and dumps both when it ends; write_report() merges the dumps into
+one pstats file, one collapsed-stack file (flamegraph.pl, speedscope) and
+a text report with the engine stage times. When profiling is off,
+profiled() is a plain call, so the hooks stay in every build.
+"""
+
+import cProfile
+import collections
+import glob
+import io
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+
+import secp256k1
+import secp256k1_numpy
+from engine import DEFAULT_BACKEND, advance_lanes, serialize_keys
+from hashing import DEFAULT_HASHER, HASH_SIZE, HASHERS, KEY_SIZE
+from secp256k1 import P
+
+DEFAULT_PROFILE_DIR = os.path.join(
+    os.path.expanduser("~"), ".local", "share", "bitcoin-puzzle-solver", "profiles"
+)
+# Seconds between stack samples of a profiled thread
+DEFAULT_STACK_INTERVAL = 0.005
+PROFILE_FILE = "profile.prof"
+STACKS_FILE = "profile.folded"
+REPORT_FILE = "report.txt"
+
+PRIMITIVES = ("field_mul", "field_inv", "point_add", "batch_inverse", "serialize", "hash160", "compare")
+
+
+class StackSampler:
+    """Count the call stacks of one thread, sampled from a background thread
+
+    Stacks stop below root, if given, so forked workers do not carry the
+    parent's frames.
+    """
+
+    def __init__(self, thread_id, interval=DEFAULT_STACK_INTERVAL, root=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root = root
+        self.stacks = collections.Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None and frame is not self.root:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+
+class Profile:
+    """cProfile plus a stack sampler on the calling thread, used as a context manager"""
+
+    def __init__(self, interval=DEFAULT_STACK_INTERVAL):
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), interval)
+
+    def __enter__(self):
+        self.sampler.root = sys._getframe(1)
+        self.sampler.start()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.disable()
+        self.sampler.stop()
+
+    def dump(self, directory, name):
+        """Write name-<pid>.prof and name-<pid>.folded into directory"""
+        os.makedirs(directory, exist_ok=True)
+        prefix = os.path.join(directory, f"{name}-{os.getpid()}")
+        self.profiler.dump_stats(prefix + ".prof")
+        _write_stacks(self.sampler.stacks, prefix + ".folded")
+
+
+def profiled(directory, name, function, *args, **kwargs):
+    """Call function, profiling it into directory unless directory is None"""
+    if directory is None:
+        return function(*args, **kwargs)
+    profile = Profile()
+    try:
+        with profile:
+            return function(*args, **kwargs)
+    finally:
+        profile.dump(directory, name)
+
+
+def _write_stacks(stacks, path):
+    with open(path, "w") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def _read_stacks(path, stacks):
+    with open(path) as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack:
+                stacks[stack] += int(count)
+
+
+def write_report(directory, stage_seconds, keys, top=25):
+    """Merge the per-process dumps in directory and write the report
+
+    stage_seconds maps engine stages to seconds summed over all workers and
+    keys is the number of keys checked. Returns the report path, or None if
+    no process left a dump (e.g. an external engine did the work).
+    """
+    parts = sorted(glob.glob(os.path.join(directory, "*-*.prof")))
+    if not parts:
+        return None
+    listing = io.StringIO()
+    stats = pstats.Stats(*parts, stream=listing)
+    stats.dump_stats(os.path.join(directory, PROFILE_FILE))
+
+    stacks = collections.Counter()
+    for path in glob.glob(os.path.join(directory, "*-*.folded")):
+        _read_stacks(path, stacks)
+    _write_stacks(stacks, os.path.join(directory, STACKS_FILE))
+
+    total = sum(stage_seconds.values())
+    lines = [f"Keys checked: {keys:,}", "", "Engine stages (seconds summed over workers):"]
+    for stage, seconds in stage_seconds.items():
+        share = seconds / total if total else 0.0
+        per_key = f"{seconds * 1e9 / keys:12,.1f} ns/key" if keys else ""
+        lines.append(f"  {stage:8} {seconds:12.3f} s {share:7.1%} {per_key}")
+    lines += [
+        "",
+        f"Top {top} functions by cumulative time ({len(parts)} processes, "
+        "with cProfile overhead on every call):",
+        "",
+    ]
+    stats.sort_stats("cumulative").print_stats(top)
+
+    path = os.path.join(directory, REPORT_FILE)
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n" + listing.getvalue())
+    return path
+
+
+def _random_points(rng, count):
+    start = rng.randrange(1, 1 << 64)
+    points = [secp256k1.point_mul(start)]
+    for _ in range(count - 1):
+        points.append(secp256k1.point_add(points[-1], secp256k1.G))
+    return points
+
+
+def _setup(primitive, backend, hasher, count, rng):
+    # Returns a function doing one round of count operations
+    numpy = backend == "numpy"
+    if primitive == "field_mul":
+        a = [rng.randrange(P) for _ in range(count)]
+        b = [rng.randrange(P) for _ in range(count)]
+        if numpy:
+            la, lb = secp256k1_numpy.to_limbs(a), secp256k1_numpy.to_limbs(b)
+            return lambda: secp256k1_numpy.mul(la, lb)
+        return lambda: [x * y % P for x, y in zip(a, b)]
+    if primitive == "field_inv":
+        # One full modular inversion per element, what batch inversion avoids
+        a = [rng.randrange(1, P) for _ in range(count)]
+        return lambda: [pow(x, -1, P) for x in a]
+    if primitive == "batch_inverse":
+        a = [rng.randrange(1, P) for _ in range(count)]
+        if numpy:
+            la = secp256k1_numpy.to_limbs(a)
+            return lambda: secp256k1_numpy.batch_inverse(la)
+        return lambda: secp256k1.batch_inverse(a)
+
+    points = _random_points(rng, count)
+    if primitive == "point_add":
+        # Lane advance as the scanner does it, inversion shared by the batch
+        step = secp256k1.point_mul(count)
+        if numpy:
+            lanes = secp256k1_numpy.from_points(points)
+            return lambda: secp256k1_numpy.advance_lanes(lanes, step)
+        return lambda: advance_lanes(points, step)
+    if primitive == "serialize":
+        out = bytearray(KEY_SIZE * count)
+        if numpy:
+            lanes = secp256k1_numpy.from_points(points)
+            return lambda: secp256k1_numpy.serialize_keys(lanes, count, out)
+        return lambda: serialize_keys(points, count, out)
+
+    stage = HASHERS[hasher](os.urandom(HASH_SIZE), count)
+    serialize_keys(points, count, stage.keys)
+    if primitive == "hash160":
+        return lambda: stage.hash(count)
+    if primitive == "compare":
+        stage.hash(count)
+        return stage.match
+    raise ValueError(f"Unknown primitive {primitive}")
+
+
+def microbenchmark(primitive, backend=DEFAULT_BACKEND, hasher=DEFAULT_HASHER, batch_size=4096,
+                   rounds=10, seed=None):
+    """Nanoseconds per element of one primitive over batches of batch_size
+
+    backend selects the field arithmetic for field_mul, point_add,
+    batch_inverse and serialize; hasher the stage for hash160 and compare.
+    The best of rounds is reported, so the figure is the cost without
+    interference from the rest of the machine.
+    """
+    if backend == "numpy" and not secp256k1_numpy.AVAILABLE:
+        raise ValueError("NumPy is not installed")
+    run = _setup(primitive, backend, hasher, batch_size, random.Random(seed))
+    run()
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e9 / batch_size
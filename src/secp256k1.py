@@ -0,0 +1,192 @@
+"""
+secp256k1 elliptic curve arithmetic
+Affine points are (x, y) tuples of ints, None is the point at infinity.
+"""
+
+# Curve parameters
+P = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F
+N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+GX = 0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798
+GY = 0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8
+G = (GX, GY)
+
+
+def inverse(value):
+    """Modular inverse in the field"""
+    return pow(value, -1, P)
+
+
+def batch_inverse(values):
+    """Invert many field elements with a single modular inversion
+
+    Montgomery's trick: one inversion plus three multiplications per element.
+    All values must be non-zero.
+    """
+    count = len(values)
+    if count == 0:
+        return []
+
+    prefix = [0] * count
+    acc = 1
+    for i, value in enumerate(values):
+        prefix[i] = acc
+        acc = acc * value % P
+
+    acc = pow(acc, -1, P)
+    result = [0] * count
+    for i in range(count - 1, -1, -1):
+        result[i] = acc * prefix[i] % P
+        acc = acc * values[i] % P
+    return result
+
+
+def is_on_curve(point):
+    """Check that an affine point satisfies y^2 = x^3 + 7"""
+    if point is None:
+        return True
+    x, y = point
+    return (y * y - x * x * x - 7) % P == 0
+
+
+def point_neg(point):
+    """Negate a point"""
+    if point is None:
+        return None
+    return (point[0], (P - point[1]) % P)
+
+
+def point_add(p1, p2):
+    """Add two affine points"""
+    if p1 is None:
+        return p2
+    if p2 is None:
+        return p1
+
+    x1, y1 = p1
+    x2, y2 = p2
+    if x1 == x2:
+        if (y1 + y2) % P == 0:
+            return None
+        return point_double(p1)
+
+    lam = (y2 - y1) * pow(x2 - x1, -1, P) % P
+    x3 = (lam * lam - x1 - x2) % P
+    y3 = (lam * (x1 - x3) - y1) % P
+    return (x3, y3)
+
+
+def point_double(point):
+    """Double an affine point"""
+    if point is None:
+        return None
+
+    x, y = point
+    if y == 0:
+        return None
+
+    lam = 3 * x * x * pow(2 * y, -1, P) % P
+    x3 = (lam * lam - 2 * x) % P
+    y3 = (lam * (x - x3) - y) % P
+    return (x3, y3)
+
+
+def _jacobian_double(X, Y, Z):
+    if Y == 0:
+        return (0, 1, 0)
+    YY = Y * Y % P
+    S = 4 * X * YY % P
+    M = 3 * X * X % P
+    X3 = (M * M - 2 * S) % P
+    Y3 = (M * (S - X3) - 8 * YY * YY) % P
+    Z3 = 2 * Y * Z % P
+    return (X3, Y3, Z3)
+
+
+def _jacobian_add_affine(X1, Y1, Z1, x2, y2):
+    if Z1 == 0:
+        return (x2, y2, 1)
+    Z1Z1 = Z1 * Z1 % P
+    U2 = x2 * Z1Z1 % P
+    S2 = y2 * Z1 * Z1Z1 % P
+    H = (U2 - X1) % P
+    R = (S2 - Y1) % P
+    if H == 0:
+        if R == 0:
+            return _jacobian_double(X1, Y1, Z1)
+        return (0, 1, 0)
+    HH = H * H % P
+    HHH = H * HH % P
+    V = X1 * HH % P
+    X3 = (R * R - HHH - 2 * V) % P
+    Y3 = (R * (V - X3) - Y1 * HHH) % P
+    Z3 = Z1 * H % P
+    return (X3, Y3, Z3)
+
+
+def _jacobian_to_affine(X, Y, Z):
+    if Z == 0:
+        return None
+    z_inv = pow(Z, -1, P)
+    z_inv2 = z_inv * z_inv % P
+    return (X * z_inv2 % P, Y * z_inv2 * z_inv % P)
+
+
+# Optional precomputed window table for k*G, see tables.GeneratorTable
+_generator_table = None
+
+
+def set_generator_table(table):
+    """Use a window table of multiples of G for fixed-base multiplication"""
+    global _generator_table
+    _generator_table = table
+
+
+def _fixed_base_mul(scalar, table):
+    # One mixed addition per non-zero window digit, no doublings
+    X, Y, Z = 0, 1, 0
+    window = 0
+    while scalar:
+        digit = scalar & table.mask
+        if digit:
+            x2, y2 = table.point(window, digit)
+            X, Y, Z = _jacobian_add_affine(X, Y, Z, x2, y2)
+        scalar >>= table.window_bits
+        window += 1
+    return _jacobian_to_affine(X, Y, Z)
+
+
+def point_mul(scalar, point=G):
+    """Scalar multiplication k*P using Jacobian coordinates"""
+    scalar %= N
+    if scalar == 0 or point is None:
+        return None
+    if _generator_table is not None and point == G:
+        return _fixed_base_mul(scalar, _generator_table)
+
+    x2, y2 = point
+    X, Y, Z = 0, 1, 0
+    for bit in bin(scalar)[2:]:
+        X, Y, Z = _jacobian_double(X, Y, Z)
+        if bit == "1":
+            X, Y, Z = _jacobian_add_affine(X, Y, Z, x2, y2)
+    return _jacobian_to_affine(X, Y, Z)
+
+
+def serialize_compressed(point):
+    """Serialize a point as a 33-byte compressed public key"""
+    x, y = point
+    return bytes((2 + (y & 1),)) + x.to_bytes(32, "big")
+
+
+def deserialize_compressed(data):
+    """Parse a 33-byte compressed public key into an affine point"""
+    if len(data) != 33 or data[0] not in (2, 3):
+        raise ValueError("Invalid compressed public key")
+
+    x = int.from_bytes(data[1:], "big")
+    y = pow((x * x * x + 7) % P, (P + 1) // 4, P)
+    if (y * y - x * x * x - 7) % P != 0:
+        raise ValueError("Public key is not on the curve")
+    if (y & 1) != (data[0] & 1):
+        y = P - y
+    return (x, y)
@@ -0,0 +1,273 @@
+"""
+Vectorized secp256k1 field arithmetic with NumPy
+A batch of N field elements is a (10, N) uint64 array of 26-bit limbs
+(the last limb holds 22 bits), so every multiply, square, add and reduce
+works on the whole batch in a few array operations instead of one Python
+int operation per element. secp256k1.py stays the reference
+implementation; cross_check() compares the two.
+
+Results are kept weakly reduced: limbs 0-8 below 2^27 and limb 9 below
+2^23, which may still be a value of P or more. normalize() gives the
+canonical form needed for hashing and comparisons. Inputs to mul() and
+sqr() may have limbs up to 2^29, so one add() or sub() can be fed back
+without reducing.
+
+NumPy is optional; AVAILABLE is False when it is not installed.
+"""
+
+import random
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import secp256k1
+from secp256k1 import P
+
+AVAILABLE = np is not None
+
+LIMBS = 10
+LIMB_BITS = 26
+MASK = (1 << LIMB_BITS) - 1
+TOP_MASK = (1 << 22) - 1
+# 2^256 = 0x1000003D1 (mod P), spread over limbs as 2^260 and 2^256 folds
+FOLD_260 = (0x3D10, 0x400)
+FOLD_256 = (0x3D1, 0x40)
+# Below this many elements the product tree is finished with Python ints
+TREE_CUTOFF = 32
+
+if AVAILABLE:
+    _U = np.uint64
+    _SHIFT = _U(LIMB_BITS)
+    _MASK = _U(MASK)
+    _TOP_MASK = _U(TOP_MASK)
+    # 4P with each limb above the weakly reduced bound, for subtraction
+    _P4 = np.array([(P >> (LIMB_BITS * i)) & MASK for i in range(LIMBS)], dtype=_U).reshape(LIMBS, 1) * _U(4)
+
+
+def to_limbs(values):
+    """Pack a sequence of ints in 0..P-1 into a (10, N) limb array"""
+    count = len(values)
+    limbs = np.empty((LIMBS, count), dtype=_U)
+    packed = np.frombuffer(b"".join(v.to_bytes(32, "little") for v in values), dtype="<u8")
+    words = packed.reshape(count, 4).T
+    for i in range(LIMBS):
+        bit = LIMB_BITS * i
+        word, shift = divmod(bit, 64)
+        limb = words[word] >> _U(shift)
+        if shift > 64 - LIMB_BITS and word < 3:
+            limb |= words[word + 1] << _U(64 - shift)
+        limbs[i] = limb & _MASK
+    return limbs
+
+
+def from_limbs(limbs):
+    """Unpack a limb array into a list of canonical ints"""
+    data = _words(normalize(limbs)).tobytes()
+    return [int.from_bytes(data[i:i + 32], "big") for i in range(0, len(data), 32)]
+
+
+def _carry(t, rows):
+    # One parallel carry pass over the first rows limbs
+    c = t[:rows] >> _SHIFT
+    t[:rows] &= _MASK
+    t[1:rows + 1] += c
+
+
+def _fold_top(r):
+    # Fold the bits above 2^256 from limb 9 back into limbs 0 and 1
+    c = r[9] >> _U(22)
+    r[9] &= _TOP_MASK
+    r[0] += c * _U(FOLD_256[0])
+    r[1] += c * _U(FOLD_256[1])
+
+
+def _reduce_product(t):
+    # t is a (20, N) schoolbook product; returns it reduced into t[:10]
+    _carry(t, 19)
+    hi = t[10:]
+    r = t[:10]
+    r += hi * _U(FOLD_260[0])
+    r[1:] += hi[:9] * _U(FOLD_260[1])
+    top = hi[9] * _U(FOLD_260[1])
+    r[0] += top * _U(FOLD_260[0])
+    r[1] += top * _U(FOLD_260[1])
+    for _ in range(2):
+        _carry(r, 9)
+        _fold_top(r)
+    return r
+
+
+def mul(a, b):
+    """Elementwise a*b mod P"""
+    t = np.zeros((2 * LIMBS, a.shape[1]), dtype=_U)
+    product = np.empty((LIMBS, a.shape[1]), dtype=_U)
+    for i in range(LIMBS):
+        np.multiply(a[i], b, out=product)
+        t[i:i + LIMBS] += product
+    return _reduce_product(t)
+
+
+def sqr(a):
+    """Elementwise a*a mod P, with the symmetric products computed once"""
+    t = np.zeros((2 * LIMBS, a.shape[1]), dtype=_U)
+    for i in range(LIMBS):
+        t[2 * i] += a[i] * a[i]
+        if i < LIMBS - 1:
+            t[2 * i + 1:i + LIMBS] += (a[i] << _U(1)) * a[i + 1:]
+    return _reduce_product(t)
+
+
+def add(a, b):
+    """Elementwise a+b mod P"""
+    r = a + b
+    _carry(r, 9)
+    _fold_top(r)
+    return r
+
+
+def sub(a, b):
+    """Elementwise a-b mod P"""
+    r = a + _P4 - b
+    _carry(r, 9)
+    _fold_top(r)
+    return r
+
+
+def normalize(a):
+    """Canonical limbs (value in 0..P-1) of a weakly reduced array"""
+    r = a.copy()
+    for _ in range(2):
+        for i in range(LIMBS - 1):
+            r[i + 1] += r[i] >> _SHIFT
+            r[i] &= _MASK
+        _fold_top(r)
+    for i in range(LIMBS - 1):
+        r[i + 1] += r[i] >> _SHIFT
+        r[i] &= _MASK
+
+    # Subtract P where r >= P, i.e. where r + (2^256 - P) reaches 2^256
+    s = r.copy()
+    s[0] += _U(FOLD_256[0])
+    s[1] += _U(FOLD_256[1])
+    for i in range(LIMBS - 1):
+        s[i + 1] += s[i] >> _SHIFT
+        s[i] &= _MASK
+    over = (s[9] >> _U(22)) != 0
+    s[9] &= _TOP_MASK
+    return np.where(over, s, r)
+
+
+def batch_inverse(values):
+    """Invert every element with one modular inversion (product tree)
+
+    Pairs are multiplied level by level up to a few elements, which are
+    inverted with secp256k1.batch_inverse, and the inverses are pushed back
+    down the tree. Returns None if any element is zero.
+    """
+    count = values.shape[1]
+    width = 1
+    while width < count:
+        width *= 2
+    level = values
+    if width != count:
+        level = np.zeros((LIMBS, width), dtype=_U)
+        level[0] = 1
+        level[:, :count] = values
+
+    levels = []
+    while level.shape[1] > TREE_CUTOFF:
+        levels.append(level)
+        level = mul(level[:, 0::2], level[:, 1::2])
+
+    top = from_limbs(level)
+    if 0 in top:
+        return None
+    inverses = to_limbs(secp256k1.batch_inverse(top))
+    for level in reversed(levels):
+        # The inverse of a child is its parent's inverse times its sibling
+        half = level.shape[1] // 2
+        siblings = level.reshape(LIMBS, half, 2)[:, :, ::-1].reshape(LIMBS, 2 * half)
+        inverses = mul(np.repeat(inverses, 2, axis=1), siblings)
+    return inverses[:, :count]
+
+
+def from_points(points):
+    """Limb arrays (xs, ys) of a list of affine points"""
+    return to_limbs([x for x, _ in points]), to_limbs([y for _, y in points])
+
+
+def to_points(lanes):
+    """List of affine points of limb arrays (xs, ys)"""
+    xs, ys = lanes
+    return list(zip(from_limbs(xs), from_limbs(ys)))
+
+
+def advance_lanes(lanes, step):
+    """Add the same point to every lane, vectorized version of engine.advance_lanes"""
+    xs, ys = lanes
+    sx, sy = step
+    sx_limbs, sy_limbs = to_limbs([sx]), to_limbs([sy])
+    inverses = batch_inverse(sub(sx_limbs, xs))
+    if inverses is None:
+        # A lane hit +/- step, which only happens for tiny keys
+        return from_points([secp256k1.point_add(point, step) for point in to_points(lanes)])
+
+    lam = mul(sub(sy_limbs, ys), inverses)
+    x3 = sub(sub(sqr(lam), xs), sx_limbs)
+    y3 = sub(mul(lam, sub(xs, x3)), ys)
+    return x3, y3
+
+
+def _words(limbs):
+    # Canonical limbs as big-endian 64-bit words, one row of four per element
+    l = limbs
+    words = np.empty((l.shape[1], 4), dtype=">u8")
+    words[:, 3] = l[0] | (l[1] << _U(26)) | (l[2] << _U(52))
+    words[:, 2] = (l[2] >> _U(12)) | (l[3] << _U(14)) | (l[4] << _U(40))
+    words[:, 1] = (l[4] >> _U(24)) | (l[5] << _U(2)) | (l[6] << _U(28)) | (l[7] << _U(54))
+    words[:, 0] = (l[7] >> _U(10)) | (l[8] << _U(16)) | (l[9] << _U(42))
+    return words
+
+
+def serialize_keys(lanes, count, out):
+    """Write the compressed public keys of the first count lanes into out"""
+    xs, ys = lanes
+    both = normalize(np.concatenate((xs[:, :count], ys[:, :count]), axis=1))
+    keys = np.frombuffer(out, dtype=np.uint8, count=33 * count).reshape(count, 33)
+    keys[:, 0] = 2 + (both[0, count:] & _U(1))
+    keys[:, 1:] = _words(both[:, :count]).view(np.uint8)
+
+
+def cross_check(lanes=64, rounds=3, seed=None):
+    """Compare this backend against secp256k1.py on random inputs
+
+    Checks the field operations and a few rounds of lane advancing; returns
+    True when every result matches.
+    """
+    rng = random.Random(seed)
+    a = [rng.randrange(P) for _ in range(lanes)] + [0, 1, P - 1]
+    b = [rng.randrange(P) for _ in range(lanes)] + [P - 1, P - 1, P - 1]
+    la, lb = to_limbs(a), to_limbs(b)
+    checks = [
+        (mul(la, lb), [x * y % P for x, y in zip(a, b)]),
+        (sqr(lb), [y * y % P for y in b]),
+        (add(la, lb), [(x + y) % P for x, y in zip(a, b)]),
+        (sub(la, lb), [(x - y) % P for x, y in zip(a, b)]),
+        (mul(sub(la, lb), add(la, lb)), [(x - y) * (x + y) % P for x, y in zip(a, b)]),
+        (batch_inverse(lb), [pow(y, -1, P) for y in b]),
+    ]
+    if any(from_limbs(result) != expected for result, expected in checks):
+        return False
+
+    start = rng.randrange(1, 1 << 64)
+    points = [secp256k1.point_mul(start + i) for i in range(lanes)]
+    step = secp256k1.point_mul(lanes)
+    vector = from_points(points)
+    for _ in range(rounds):
+        points = [secp256k1.point_add(point, step) for point in points]
+        vector = advance_lanes(vector, step)
+    keys = bytearray(33 * lanes)
+    serialize_keys(vector, lanes, keys)
+    return keys == b"".join(secp256k1.serialize_compressed(point) for point in points)
@@ -0,0 +1,317 @@
+"""
+Background solver service
+Runs the solver in a process of its own and serves its progress on a Unix
+domain socket, so the GUI and `cli.py status` can attach, detach and come
+back without touching the run. Requests and events are JSON lines; events
+have the same fields as the output of `cli.py solve`, plus a sequence
+number.
+
+Solver callbacks only record the event and hand it to the event loop.
+Each monitor has its own bounded queue, and one that falls behind loses
+its oldest events instead of slowing down the run or the other monitors.
+Log and status events are kept in a bounded buffer that is replayed to
+monitors when they attach; key counts and rates are in the snapshot that
+precedes the replay.
+"""
+
+import asyncio
+import collections
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+DEFAULT_SOCKET_PATH = os.path.join(
+    os.path.expanduser("~"), ".local", "share", "bitcoin-puzzle-solver", "solver.sock"
+)
+DEFAULT_HISTORY = 1000
+SUBSCRIBER_QUEUE = 1000
+SPAWN_TIMEOUT = 10.0
+
+# Events kept for replay; keys and rates only matter as their latest value
+REPLAYED_EVENTS = ("progress", "status", "solution", "started", "finished")
+
+
+class ServiceError(Exception):
+    """The service is not running or refused a request"""
+
+
+class SolverService:
+    """Serve one solver run at a time on a Unix socket
+
+    Requests: status, subscribe (replay: events to replay, default all),
+    start (puzzle, wallet_address, use_gpu, options: flat Solver option
+    names, see solver.split_options),
+    stop (the run) and shutdown (the run and the service).
+    """
+
+    def __init__(self, path=DEFAULT_SOCKET_PATH, history=DEFAULT_HISTORY):
+        self.path = path
+        self.history = collections.deque(maxlen=history)
+        self.lock = threading.Lock()
+        self.sequence = 0
+        self.subscribers = set()
+        self.loop = None
+        self.shutdown_event = None
+        self.solver = None
+        self.thread = None
+        self.state = {
+            "state": "idle", "puzzle": None, "status": None, "keys": 0, "rate": 0.0,
+            "private_key": None, "started": None,
+        }
+        self.start_time = None
+
+    def emit(self, event, **fields):
+        """Record an event and pass it to the monitors; safe from any thread"""
+        with self.lock:
+            self.sequence += 1
+            record = {"seq": self.sequence, "time": round(time.time(), 3), "event": event, **fields}
+            if event in REPLAYED_EVENTS:
+                self.history.append(record)
+            if event == "status":
+                self.state["status"] = fields["status"]
+            elif event == "keys":
+                self.state["keys"] = fields["keys"]
+            elif event == "solution":
+                self.state["private_key"] = fields["private_key"]
+        self.loop.call_soon_threadsafe(self._broadcast, record)
+
+    def _broadcast(self, record):
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(record)
+
+    def snapshot(self):
+        with self.lock:
+            return {"event": "snapshot", "seq": self.sequence, **self.state}
+
+    def start(self, puzzle_num, wallet_address=None, use_gpu=False, options=None):
+        """Start a run unless one is going; returns an error message or None"""
+        # Loaded with the first run, so clients of this module stay light
+        from solver import Solver, split_options
+
+        if self.thread and self.thread.is_alive():
+            return f"Puzzle #{self.state['puzzle']} is already running"
+
+        def on_rate(rate):
+            with self.lock:
+                self.state["rate"] = rate
+
+        def on_keys(total):
+            elapsed = time.monotonic() - self.start_time
+            self.emit("keys", keys=total, elapsed=round(elapsed, 3), rate=round(self.state["rate"]))
+
+        try:
+            solver = Solver(
+                puzzle_num, wallet_address,
+                on_progress=lambda message: self.emit("progress", message=message),
+                on_status=lambda status: self.emit("status", status=status),
+                on_keys=on_keys,
+                on_rate=on_rate,
+                on_solution=lambda key: self.emit("solution", puzzle=puzzle_num, private_key=key),
+                **split_options(dict(options or {}, use_gpu=use_gpu))
+            )
+        except TypeError as e:
+            return f"Bad solver options: {e}"
+
+        with self.lock:
+            self.state.update(
+                state="running", puzzle=puzzle_num, status=None, keys=0, rate=0.0,
+                private_key=None, started=round(time.time(), 3)
+            )
+        self.solver = solver
+        self.start_time = time.monotonic()
+        self.emit("started", puzzle=puzzle_num, options=options or {})
+        self.thread = threading.Thread(target=self._run, args=(solver,), daemon=True)
+        self.thread.start()
+        return None
+
+    def _run(self, solver):
+        try:
+            solver.run()
+        except Exception as e:
+            self.emit("progress", message=f"ERROR: {e}")
+            self.emit("status", status="Error")
+        with self.lock:
+            self.state["state"] = "finished"
+        self.emit("finished", puzzle=self.state["puzzle"], private_key=self.state["private_key"])
+
+    def stop(self):
+        if self.solver and self.thread.is_alive():
+            self.solver.stop()
+
+    def handle(self, request):
+        """Reply to a request other than subscribe"""
+        command = request.get("command")
+        if command == "status":
+            return self.snapshot()
+        if command == "start":
+            if not isinstance(request.get("puzzle"), int):
+                return {"event": "error", "message": "start needs a puzzle number"}
+            error = self.start(
+                request["puzzle"], request.get("wallet_address"), bool(request.get("use_gpu")),
+                request.get("options")
+            )
+            if error:
+                return {"event": "error", "message": error}
+            return self.snapshot()
+        if command == "stop":
+            self.stop()
+            return self.snapshot()
+        if command == "shutdown":
+            self.stop()
+            self.shutdown_event.set()
+            return {"event": "shutdown"}
+        return {"event": "error", "message": f"Unknown command {command!r}"}
+
+    async def _send(self, writer, record):
+        writer.write(json.dumps(record).encode() + b"\n")
+        await writer.drain()
+
+    async def _subscribe(self, writer, replay):
+        queue = asyncio.Queue(SUBSCRIBER_QUEUE)
+        with self.lock:
+            history = list(self.history)
+            snapshot = {"event": "snapshot", "seq": self.sequence, **self.state}
+        self.subscribers.add(queue)
+        try:
+            await self._send(writer, snapshot)
+            if replay is not None:
+                history = history[max(0, len(history) - replay):]
+            for record in history:
+                await self._send(writer, record)
+            while True:
+                record = await queue.get()
+                # Recorded before the snapshot, so already replayed or counted
+                if record["seq"] > snapshot["seq"]:
+                    await self._send(writer, record)
+        finally:
+            self.subscribers.discard(queue)
+
+    async def _client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    await self._send(writer, {"event": "error", "message": "Requests are JSON objects"})
+                    continue
+                if request.get("command") == "subscribe":
+                    await self._subscribe(writer, request.get("replay"))
+                    break
+                await self._send(writer, self.handle(request))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, on_listening=None):
+        """Serve until a shutdown request; the socket is private to this user"""
+        self.loop = asyncio.get_running_loop()
+        self.shutdown_event = asyncio.Event()
+        if is_running(self.path):
+            raise ServiceError(f"A solver service is already listening on {self.path}")
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self._client, path=self.path)
+        finally:
+            os.umask(umask)
+        if on_listening:
+            on_listening()
+        try:
+            async with server:
+                await self.shutdown_event.wait()
+        finally:
+            self.stop()
+            if self.thread:
+                await self.loop.run_in_executor(None, self.thread.join)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def request_shutdown(self):
+        """Stop the run and the service; safe from signal handlers and other threads"""
+        self.loop.call_soon_threadsafe(self.handle, {"command": "shutdown"})
+
+
+async def request(path, command, **fields):
+    """Send one request and return the reply"""
+    reader, writer = await asyncio.open_unix_connection(path)
+    try:
+        writer.write(json.dumps({"command": command, **fields}).encode() + b"\n")
+        await writer.drain()
+        line = await reader.readline()
+    finally:
+        writer.close()
+    if not line:
+        raise ServiceError("The solver service closed the connection")
+    return json.loads(line)
+
+
+async def follow(path, on_event, replay=None):
+    """Subscribe and pass every event to on_event until the service goes away"""
+    reader, writer = await asyncio.open_unix_connection(path)
+    try:
+        writer.write(json.dumps({"command": "subscribe", "replay": replay}).encode() + b"\n")
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            on_event(json.loads(line))
+    finally:
+        writer.close()
+
+
+def call(path, command, **fields):
+    """Blocking request(), raising ServiceError when no service is listening"""
+    try:
+        return asyncio.run(request(path, command, **fields))
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        raise ServiceError(f"No solver service on {path}") from e
+
+
+def is_running(path=DEFAULT_SOCKET_PATH):
+    """True if a service accepts connections on path"""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        client.close()
+
+
+def spawn(path=DEFAULT_SOCKET_PATH, timeout=SPAWN_TIMEOUT):
+    """Start a detached service process and wait until it listens
+
+    Frozen app builds have no cli.py next to them and start the service
+    through their own binary (see gui.main).
+    """
+    if getattr(sys, "frozen", False):
+        command = [sys.executable, "--service", path]
+    else:
+        cli = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py")
+        command = [sys.executable, cli, "serve", "--socket", path]
+    subprocess.Popen(
+        command,
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if is_running(path):
+            return
+        time.sleep(0.1)
+    raise ServiceError(f"The solver service did not start listening on {path}")
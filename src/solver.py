@@ -0,0 +1,1057 @@
+"""
+Solver core without a GUI
+Runs one puzzle with the selected algorithm and reports through plain
+callbacks, so the same code drives the Qt window, the command line tool
+and headless workers.
+"""
+
+import dataclasses
+import os
+import time
+
+import bitcrack
+import bsgs
+import catalog
+import dpstore
+import hybrid
+import permutation
+import profiling
+import secp256k1_numpy
+import supervisor
+import tables
+import topology
+from concurrency import AdaptiveScanner
+from coordinator import HEARTBEAT_INTERVAL, CoordinatorClient, CoordinatorError
+from engine import DEFAULT_BACKEND, DEFAULT_BATCH_SIZE
+from hashing import DEFAULT_HASHER
+from kangaroo import KangarooSolver, MultiKangarooSolver
+from journal import DEFAULT_CHECKPOINT_DIR, CoverageJournal, journal_path
+from parallel import ParallelScanner, WorkerPool, default_workers, partition_intervals
+from metrics import Metrics, MetricsServer
+from telemetry import DEFAULT_SAMPLE_INTERVAL, CounterBlock, Sampler
+
+# Coordinated runs: attempts per coordinator request before giving up
+COORDINATOR_RETRIES = 10
+COORDINATOR_RETRY_SECONDS = 5.0
+# Coordinated runs stop after this many units in a row could not be finished
+COORDINATOR_FAILED_UNITS = 3
+
+# Solving algorithms, kept in the catalog so the GUI lists them without loading the engines
+ALGORITHMS = catalog.ALGORITHMS
+
+
+def _ignore(*args):
+    pass
+
+
+@dataclasses.dataclass
+class SearchOptions:
+    """How the key is searched for
+
+    scan_order "random" makes the CPU scanner visit the range in chunks of
+    2^chunk_bits keys in an order keyed by seed (this installation's own
+    seed if None; see permutation.py). targets, more puzzle numbers, are
+    solved in the same kangaroo run with one shared tame herd (see
+    kangaroo.MultiKangarooSolver).
+    """
+    algorithm: str = "scan"
+    dp_bits: int = None
+    bsgs_memory_mb: int = bsgs.DEFAULT_MEMORY_MB
+    targets: list = dataclasses.field(default_factory=list)
+    scan_order: str = "sequential"
+    seed: int = None
+    chunk_bits: int = permutation.DEFAULT_CHUNK_BITS
+
+
+@dataclasses.dataclass
+class EngineOptions:
+    """What runs the search: CPU worker processes and external engines
+
+    placement and smt decide how workers are pinned to CPUs and NUMA nodes
+    (see topology.py); without smt, workers default to one per physical
+    core. adaptive lets a CPU scan change its number of active workers, up
+    to workers, with the host's CPU quota, load and keys/sec (see
+    concurrency.py). engine_config, a JSON file, runs scans on several
+    supervised external engine processes instead (see supervisor.py).
+    hybrid runs those engines, or BitCrack with use_gpu, together with CPU
+    workers on the same range (see hybrid.py).
+    """
+    workers: int = None
+    batch_size: int = DEFAULT_BATCH_SIZE
+    backend: str = DEFAULT_BACKEND
+    hasher: str = DEFAULT_HASHER
+    placement: str = topology.DEFAULT_PLACEMENT
+    smt: bool = True
+    adaptive: bool = False
+    use_gpu: bool = False
+    bitcrack_path: str = None
+    gpu_chunk_bits: int = bitcrack.DEFAULT_CHUNK_BITS
+    engine_config: str = None
+    hybrid: bool = False
+
+
+@dataclasses.dataclass
+class CheckpointOptions:
+    """Where state kept across runs lives
+
+    With a dp_dir, kangaroo runs use the puzzle's shared jump table and
+    append their distinguished points to a file there for dpstore merges
+    across runs and machines.
+    """
+    checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR
+    table_dir: str = tables.DEFAULT_TABLE_DIR
+    dp_dir: str = None
+
+
+@dataclasses.dataclass
+class CoordinatorOptions:
+    """How this machine shares a puzzle with others
+
+    url is a coordinator to lease work units from (see coordinator.py).
+    node and nodes split one seed's random chunk order disjointly across
+    machines without a coordinator.
+    """
+    url: str = None
+    node: int = 0
+    nodes: int = 1
+
+
+@dataclasses.dataclass
+class TelemetryOptions:
+    """Progress sampling, Prometheus metrics and profiling
+
+    With a profile_dir, every engine process is profiled and a report is
+    written to a new subdirectory of it when the run ends (see
+    profiling.py).
+    """
+    sample_interval: float = DEFAULT_SAMPLE_INTERVAL
+    metrics_port: int = None
+    profile_dir: str = None
+
+
+OPTION_GROUPS = {
+    "search": SearchOptions,
+    "engine": EngineOptions,
+    "checkpoint": CheckpointOptions,
+    "coordinator": CoordinatorOptions,
+    "telemetry": TelemetryOptions,
+}
+# Flat option names that differ from their field
+_RENAMED_OPTIONS = {"coordinator": ("coordinator", "url")}
+
+
+def split_options(options):
+    """Solver keyword arguments for a flat dict of option names
+
+    The GUI and the service protocol pass options as one flat dict, e.g.
+    {"workers": 4, "algorithm": "kangaroo", "coordinator": url}. Raises
+    TypeError for an unknown name.
+    """
+    fields = {}
+    for group, cls in OPTION_GROUPS.items():
+        for field in dataclasses.fields(cls):
+            fields[field.name] = (group, field.name)
+    fields.update(_RENAMED_OPTIONS)
+
+    values = {group: {} for group in OPTION_GROUPS}
+    for name, value in options.items():
+        if name not in fields:
+            raise TypeError(f"unknown solver option {name!r}")
+        group, field = fields[name]
+        values[group][field] = value
+    return {group: OPTION_GROUPS[group](**values[group]) for group in OPTION_GROUPS}
+
+
+class Solver:
+    """Run one puzzle and report through callbacks
+
+    on_progress(message) and on_status(status) get log lines and state
+    changes, on_keys(total) the keys checked so far, on_rate(rate) the
+    keys/sec over the last minute and on_solution(key) the private key as
+    64 hex digits. Callbacks run on the solver's own threads. run() blocks
+    until the search ends; stop() may be called from any thread. puzzle, a
+    catalog.Puzzle, replaces the catalog entry for puzzle_num (benchmarks
+    use it for ranges with planted keys). The other settings come in
+    option groups, each defaulting to its dataclass's defaults.
+    """
+
+    def __init__(self, puzzle_num, wallet_address=None, puzzle=None, search=None, engine=None,
+                 checkpoint=None, coordinator=None, telemetry=None,
+                 on_progress=_ignore, on_status=_ignore, on_keys=_ignore, on_rate=_ignore,
+                 on_solution=_ignore):
+        self.on_progress = on_progress
+        self.on_status = on_status
+        self.on_keys = on_keys
+        self.on_rate = on_rate
+        self.on_solution = on_solution
+        self.puzzle_num = puzzle_num
+        self.puzzle = puzzle
+        self.wallet_address = wallet_address
+        self.search = search or SearchOptions()
+        self.engine = engine or EngineOptions()
+        self.checkpoint = checkpoint or CheckpointOptions()
+        self.coordinator = coordinator or CoordinatorOptions()
+        self.telemetry = telemetry or TelemetryOptions()
+        # Worker processes for this run; place_workers() may change it
+        self.workers = self.engine.workers or default_workers()
+        # CPU set per worker, set by place_workers()
+        self.placement_plan = None
+        # This run's directory under profile_dir, set by start_profile()
+        self.profile_run_dir = None
+        self.coordinated_keys = 0
+        self.metrics_server = None
+        self.metrics = None
+        self.io_seconds = 0.0
+        self.running = True
+        self.total_keys = 0
+
+    def start_sampler(self, label, worker_progress, stage_seconds, describe):
+        """Report progress from engine counters at a fixed rate
+
+        Engines only add to counters; the callbacks run once per sample
+        interval however fast the keys go by. worker_progress() returns
+        (keys checked, keys assigned or None) per worker and stage_seconds()
+        the engine stage times. Workers that fall well behind the others
+        are reported.
+        """
+        metrics = Metrics(self.puzzle_num, label)
+        metrics.update(worker_progress(), stage_seconds())
+        self.metrics = metrics
+        if self.metrics_server:
+            self.metrics_server.set_metrics(metrics)
+
+        def sink(workers, elapsed):
+            stages = stage_seconds()
+            stages["io"] = stages.get("io", 0.0) + self.io_seconds
+            became, recovered = metrics.update(workers, stages)
+            for index in became:
+                self.on_progress(
+                    f"WARNING: {label} worker {index} is slow: "
+                    f"{metrics.workers[index].window_rate:,.0f} keys/sec"
+                )
+            for index in recovered:
+                self.on_progress(f"{label} worker {index} recovered")
+
+            # Coordinated runs count every unit, not just the current one
+            self.total_keys = self.coordinated_keys + metrics.keys
+            self.on_rate(metrics.rate)
+            self.on_keys(self.total_keys)
+            self.on_progress(describe(metrics.keys, metrics.rate, elapsed))
+
+        sampler = Sampler(worker_progress, sink, self.telemetry.sample_interval)
+        sampler.start()
+        return sampler
+
+    def start_metrics_server(self):
+        """Serve Prometheus metrics on localhost if a port is configured"""
+        if not self.telemetry.metrics_port:
+            return
+        try:
+            self.metrics_server = MetricsServer(Metrics(self.puzzle_num, "idle"), self.telemetry.metrics_port)
+        except OSError as e:
+            self.on_progress(f"ERROR: Cannot serve metrics on port {self.telemetry.metrics_port}: {e}")
+            return
+        self.metrics_server.start()
+        self.on_progress(f"Metrics at http://127.0.0.1:{self.metrics_server.port}/metrics")
+
+    def start_profile(self):
+        """Create this run's profile directory if profiling is on"""
+        if not self.telemetry.profile_dir:
+            return
+        path = os.path.join(
+            self.telemetry.profile_dir, f"puzzle{self.puzzle_num}_{time.strftime('%Y%m%d_%H%M%S')}"
+        )
+        try:
+            os.makedirs(path, exist_ok=True)
+        except OSError as e:
+            self.on_progress(f"ERROR: Cannot create profile directory {path}: {e}")
+            return
+        self.profile_run_dir = path
+        self.on_progress(f"Profiling enabled, writing to {path}")
+
+    def finish_profile(self):
+        """Merge the engine processes' profiles into one report"""
+        if not self.profile_run_dir:
+            return
+        stages = dict(self.metrics.stages) if self.metrics else {}
+        try:
+            report = profiling.write_report(self.profile_run_dir, stages, self.total_keys)
+        except OSError as e:
+            self.on_progress(f"ERROR: Cannot write profile report: {e}")
+            return
+        if report:
+            self.on_progress(f"Profile report: {report}")
+        else:
+            self.on_progress("No profile data (the search did not run in Python)")
+
+    def run(self):
+        """Main solver loop"""
+        self.start_metrics_server()
+        self.start_profile()
+        try:
+            self.run_puzzle()
+        finally:
+            if self.metrics_server:
+                self.metrics_server.close()
+            self.finish_profile()
+
+    def run_puzzle(self):
+        """Pick the engine for the puzzle and run it"""
+        self.on_progress(f"Starting solver for Puzzle #{self.puzzle_num}")
+        self.on_status("Running")
+
+        try:
+            puzzle = self.puzzle or catalog.get_puzzle(self.puzzle_num)
+        except catalog.CatalogError as e:
+            self.on_progress(f"ERROR: {e}")
+            self.on_status("Error")
+            return
+        if not puzzle:
+            self.on_progress(f"ERROR: Puzzle #{self.puzzle_num} not found")
+            self.on_status("Error")
+            return
+        if puzzle.hash160 is None:
+            self.on_progress(f"ERROR: Puzzle #{self.puzzle_num} has no target address in the catalog")
+            self.on_status("Error")
+            return
+        if puzzle.solved:
+            self.on_progress(f"Note: Puzzle #{self.puzzle_num} is already solved")
+
+        if not self.load_tables():
+            return
+
+        if self.search.algorithm == "kangaroo":
+            self.run_kangaroo_solver(puzzle)
+            return
+        if self.search.algorithm == "bsgs":
+            self.run_bsgs_solver(puzzle)
+            return
+
+        if self.engine.engine_config:
+            config = self.load_engine_config()
+            if config is None:
+                return
+            if self.engine.hybrid:
+                self.run_hybrid_solver(puzzle, *config)
+            else:
+                self.run_supervised_solver(puzzle, *config)
+            return
+
+        # Check for BitCrack
+        bitcrack_path = self.find_bitcrack()
+
+        if self.engine.use_gpu and bitcrack_path and self.engine.hybrid:
+            spec = supervisor.EngineSpec(os.path.basename(bitcrack_path), bitcrack_path)
+            self.run_hybrid_solver(puzzle, [spec], supervisor.DEFAULT_HEARTBEAT_SECONDS)
+        elif self.engine.use_gpu and bitcrack_path:
+            self.run_gpu_solver(bitcrack_path, puzzle)
+        else:
+            self.run_cpu_solver(puzzle)
+
+    def load_tables(self):
+        """Map the shared generator table, building it on first use"""
+        path = tables.generator_table_path(self.checkpoint.table_dir)
+        if not os.path.exists(path):
+            self.on_progress("Building generator table (first run only)...")
+        try:
+            tables.install_generator_table(self.checkpoint.table_dir, verify=True)
+        except OSError as e:
+            self.on_progress(f"ERROR: Cannot use table directory {self.checkpoint.table_dir}: {e}")
+            self.on_status("Error")
+            return False
+        return True
+
+    def place_workers(self):
+        """Plan the CPU of every worker, log it and copy the tables to each node used"""
+        if not topology.supported():
+            if self.engine.placement != topology.DEFAULT_PLACEMENT or not self.engine.smt:
+                self.on_progress("Note: this platform cannot pin workers to CPUs")
+            return True
+        try:
+            if not self.engine.smt and self.engine.workers is None:
+                self.workers = topology.usable_cpus(smt=False)
+            self.placement_plan = topology.plan(self.workers, self.engine.placement, self.engine.smt)
+        except (OSError, topology.PlacementError) as e:
+            self.on_progress(f"ERROR: Cannot place workers: {e}")
+            self.on_status("Error")
+            return False
+        if self.placement_plan is None:
+            return True
+        for line in self.placement_plan.describe():
+            self.on_progress(line)
+        self.replicate_table(tables.generator_table_path(self.checkpoint.table_dir))
+        return True
+
+    def replicate_table(self, path):
+        """Give every NUMA node with workers its own copy of a table
+
+        Each copy is written from this thread pinned to the node, so its
+        page cache is local there. Workers fall back to the shared file if
+        a copy cannot be made.
+        """
+        plan = self.placement_plan
+        nodes = sorted({node for node in plan.nodes if node is not None}) if plan else []
+        if len(nodes) < 2:
+            return
+        for node in nodes:
+            try:
+                with topology.pinned(plan.topology.nodes[node]):
+                    tables.replicate(path, node)
+            except OSError as e:
+                self.on_progress(f"WARNING: Cannot copy {path} for node {node}: {e}")
+                return
+        self.on_progress(
+            f"Tables: one copy of {os.path.basename(path)} per node "
+            f"({', '.join(str(node) for node in nodes)})"
+        )
+
+    def worker_cpus(self):
+        """CPU set per worker for the pools, or None when workers are not pinned"""
+        return self.placement_plan.cpusets if self.placement_plan else None
+
+    def worker_setup(self):
+        """Per-process setup that maps the same tables in every worker"""
+        return (tables.install_generator_table, (self.checkpoint.table_dir,))
+
+    def find_bitcrack(self):
+        """Find BitCrack executable"""
+        path = bitcrack.find_bitcrack(self.engine.bitcrack_path)
+        if path:
+            self.on_progress(f"Found BitCrack at: {path}")
+            return path
+
+        self.on_progress("BitCrack not found - using CPU mode")
+        return None
+
+    def run_gpu_solver(self, bitcrack_path, puzzle):
+        """Run GPU-accelerated solver using BitCrack"""
+        def make_pool(intervals):
+            return bitcrack.BitCrackDriver(
+                bitcrack_path,
+                puzzle.address,
+                intervals,
+                chunk_size=1 << self.engine.gpu_chunk_bits
+            )
+
+        self.on_progress(
+            f"Starting GPU solver (keyspace chunks of 2^{self.engine.gpu_chunk_bits} keys)..."
+        )
+        if self.coordinator.url:
+            self.run_coordinated(make_pool, "GPU")
+            return
+
+        journal, remaining = self.open_journal(puzzle)
+        if journal is None:
+            return
+        self.run_worker_pool(make_pool(remaining), "GPU", journal)
+
+    def load_engine_config(self):
+        """(engine specs, heartbeat seconds) of the engine config, or None after an error"""
+        try:
+            return supervisor.load_config(
+                self.engine.engine_config, bitcrack.find_bitcrack(self.engine.bitcrack_path)
+            )
+        except supervisor.ConfigError as e:
+            self.on_progress(f"ERROR: {e}")
+            self.on_status("Error")
+            return None
+
+    def run_supervised_solver(self, puzzle, specs, heartbeat):
+        """Scan with the external engine processes of the engine config"""
+        def make_pool(intervals):
+            return supervisor.EngineSupervisor(
+                specs,
+                puzzle.address,
+                intervals,
+                chunk_size=1 << self.engine.gpu_chunk_bits,
+                heartbeat_seconds=heartbeat
+            )
+
+        self.on_progress(
+            f"Starting {len(specs)} supervised engines ({', '.join(spec.name for spec in specs)}, "
+            f"keyspace chunks of 2^{self.engine.gpu_chunk_bits} keys)..."
+        )
+        if self.coordinator.url:
+            self.run_coordinated(make_pool, "Engines")
+            return
+
+        journal, remaining = self.open_journal(puzzle)
+        if journal is None:
+            return
+        self.run_worker_pool(make_pool(remaining), "Engines", journal)
+
+    def run_hybrid_solver(self, puzzle, specs, heartbeat):
+        """Scan with engine processes and CPU workers pulling chunks from one queue"""
+        if not self.place_workers():
+            return
+        backend = self.check_backend()
+        # Every engine process keeps a core busy feeding its device
+        workers = max(1, self.workers - len(specs))
+
+        def make_pool(intervals):
+            return hybrid.HybridScheduler(
+                intervals,
+                puzzle.hash160,
+                puzzle.address,
+                specs,
+                workers,
+                batch_size=self.engine.batch_size,
+                backend=backend,
+                hasher=self.engine.hasher,
+                setup=self.worker_setup(),
+                profile_dir=self.profile_run_dir,
+                max_engine_chunk=1 << self.engine.gpu_chunk_bits,
+                heartbeat_seconds=heartbeat,
+                placement=self.worker_cpus()
+            )
+
+        self.on_progress(
+            f"Starting hybrid solver ({', '.join(spec.name for spec in specs)} and {workers} CPU "
+            f"workers, {backend} arithmetic, engine chunks of up to 2^{self.engine.gpu_chunk_bits} keys)..."
+        )
+        if self.search.scan_order == "random":
+            self.on_progress("Note: hybrid runs hand out chunks by rate, random order is not used")
+        if self.coordinator.url:
+            self.run_coordinated(make_pool, "Hybrid")
+            return
+
+        journal, remaining = self.open_journal(puzzle)
+        if journal is None:
+            return
+        self.run_worker_pool(make_pool(remaining), "Hybrid", journal)
+
+    def run_cpu_solver(self, puzzle):
+        """Run CPU-based solver (slower)"""
+        if not self.place_workers():
+            return
+        backend = self.check_backend()
+        self.on_progress(
+            f"Starting CPU solver ({self.workers} workers, batch size {self.engine.batch_size:,}, "
+            f"{backend} arithmetic)..."
+        )
+        self.on_progress("Tip: Install BitCrack for GPU acceleration!")
+
+        scanner = AdaptiveScanner if self.engine.adaptive else ParallelScanner
+
+        def make_pool(intervals):
+            return scanner(
+                intervals,
+                puzzle.hash160,
+                workers=self.workers,
+                batch_size=self.engine.batch_size,
+                backend=backend,
+                hasher=self.engine.hasher,
+                setup=self.worker_setup(),
+                profile_dir=self.profile_run_dir,
+                placement=self.worker_cpus()
+            )
+
+        if self.coordinator.url:
+            if self.search.scan_order == "random":
+                self.on_progress("Note: the coordinator assigns the units, random order is not used")
+            self.run_coordinated(make_pool, "CPU")
+            return
+        if self.search.scan_order == "random":
+            if self.engine.adaptive:
+                self.on_progress("Note: the worker count adapts in sequential scans only")
+            self.run_random_cpu_solver(puzzle, backend)
+            return
+
+        journal, remaining = self.open_journal(puzzle)
+        if journal is None:
+            return
+        self.run_worker_pool(make_pool(remaining), "CPU", journal)
+
+    def run_random_cpu_solver(self, puzzle, backend):
+        """Scan the puzzle's chunks in a seeded pseudo-random order
+
+        Coverage is journaled in the order's virtual key space, so a restart
+        with the same seed and node resumes where it stopped.
+        """
+        try:
+            seed = self.search.seed
+            if seed is None:
+                seed = permutation.load_seed(self.checkpoint.checkpoint_dir)
+            order = permutation.ChunkOrder(
+                puzzle.range_start, puzzle.range_end, seed, self.search.chunk_bits,
+                self.coordinator.node, self.coordinator.nodes
+            )
+        except (OSError, ValueError) as e:
+            self.on_progress(f"ERROR: Cannot set up random order: {e}")
+            self.on_status("Error")
+            return
+        self.on_progress(
+            f"Random chunk order: seed {seed}, node {self.coordinator.node} of {self.coordinator.nodes}, "
+            f"{order.positions:,} chunks of 2^{self.search.chunk_bits} keys"
+        )
+
+        journal, remaining = self.open_journal(puzzle, order)
+        if journal is None:
+            return
+        pool = WorkerPool(
+            permutation.scan_chunks,
+            partition_intervals(remaining, self.workers),
+            (order, puzzle.hash160, self.engine.batch_size, backend, self.engine.hasher),
+            setup=self.worker_setup(),
+            profile_dir=self.profile_run_dir,
+            placement=self.worker_cpus()
+        )
+        self.run_worker_pool(pool, "CPU", journal)
+
+    def check_backend(self):
+        """The scanner's arithmetic backend, falling back to plain Python"""
+        if self.engine.backend != "numpy":
+            return self.engine.backend
+        if not secp256k1_numpy.AVAILABLE:
+            self.on_progress("NumPy is not installed, using Python arithmetic")
+            return "python"
+        if not secp256k1_numpy.cross_check():
+            self.on_progress("WARNING: NumPy arithmetic failed its self-check, using Python arithmetic")
+            return "python"
+        return self.engine.backend
+
+    def open_journal(self, puzzle, order=None):
+        """Open the puzzle's coverage journal and find what is left to scan
+
+        With a permutation.ChunkOrder, the journal is the order's own and
+        covers its virtual keys. Returns (journal, remaining intervals), or
+        (None, []) if there is nothing to do.
+        """
+        range_start, range_end = puzzle.range_start, puzzle.range_end
+        variant = None
+        if order is not None:
+            range_start, range_end, variant = 0, order.length - 1, order.name
+
+        path = journal_path(self.checkpoint.checkpoint_dir, self.puzzle_num, variant)
+        try:
+            journal = CoverageJournal(path)
+        except OSError as e:
+            self.on_progress(f"ERROR: Cannot open checkpoint {path}: {e}")
+            self.on_status("Error")
+            return None, []
+
+        done = journal.covered.covered(range_start, range_end)
+        if done:
+            total = range_end - range_start + 1
+            self.on_progress(
+                f"Resuming from checkpoint: {done:,} keys already scanned ({100 * done / total:.6f}%)"
+            )
+
+        remaining = journal.covered.gaps(range_start, range_end)
+        if not remaining:
+            journal.close()
+            self.on_progress("Range already fully scanned")
+            self.on_status("Finished")
+            return None, []
+        return journal, remaining
+
+    def run_worker_pool(self, pool, label, journal):
+        """Run a worker pool over the rest of the puzzle and report the outcome"""
+        key = self.drive_pool(pool, label, journal)
+        if key is not None:
+            self.on_solution(f"{key:064x}")
+        elif self.running and getattr(pool, "unfinished", 0):
+            self.on_progress(
+                f"ERROR: {pool.unfinished:,} keys were not scanned after {label} failures; "
+                "run again to cover them"
+            )
+            self.on_status("Error")
+        elif self.running:
+            self.on_progress("Range exhausted without a match")
+            self.on_status("Finished")
+
+    def drive_pool(self, pool, label, journal=None, heartbeat=None):
+        """Drive a worker pool and fold its progress into the solver callbacks
+
+        Finished intervals are appended to the coverage journal as workers
+        report them, so a restart skips them. heartbeat(), if given, is
+        called every HEARTBEAT_INTERVAL seconds and stops the pool when it
+        returns False. Returns the key found, or None.
+        """
+        total = pool.total
+        errors_shown = 0
+        notes_shown = 0
+
+        def describe(checked, rate, elapsed):
+            message = (
+                f"{label}: {checked:,} keys checked | "
+                f"{rate:,.0f} keys/sec | "
+                f"Time: {int(elapsed)}s"
+            )
+            engine_rate = getattr(pool, "engine_rate", 0)
+            if engine_rate:
+                message += f" | Engine: {engine_rate:,.0f} keys/sec"
+            if rate > 0:
+                remaining = (total - checked) / rate
+                message += f" | {100 * checked / total:.2f}% | ETA: {int(remaining)}s"
+            return message
+
+        def record_coverage():
+            if journal is None:
+                return
+            started = time.perf_counter()
+            for start, end in pool.new_coverage():
+                journal.add(start, end)
+            self.io_seconds += time.perf_counter() - started
+
+        pool.start()
+        sampler = self.start_sampler(label, pool.worker_progress, pool.stage_seconds, describe)
+        last_journal = last_heartbeat = time.time()
+        try:
+            while self.running and not pool.poll(timeout=0.25):
+                now = time.time()
+                if heartbeat and now - last_heartbeat >= HEARTBEAT_INTERVAL:
+                    last_heartbeat = now
+                    if not heartbeat():
+                        break
+                if now - last_journal < 1:
+                    continue
+                last_journal = now
+
+                record_coverage()
+
+                # Adaptive pools explain each change of their worker count
+                notes = getattr(pool, "notes", ())
+                for note in notes[notes_shown:]:
+                    self.on_progress(f"{label}: {note}")
+                notes_shown = len(notes)
+                for index, error in pool.errors[errors_shown:]:
+                    self.on_progress(f"ERROR: {label} worker {index}: {error}")
+                errors_shown = len(pool.errors)
+        finally:
+            pool.stop()
+            record_coverage()
+            sampler.stop()
+            if journal is not None:
+                journal.close()
+
+        for index, error in pool.errors[errors_shown:]:
+            self.on_progress(f"ERROR: {label} worker {index}: {error}")
+        return pool.found_key
+
+    def run_coordinated(self, make_pool, label):
+        """Scan units leased from a coordinator until the puzzle is done
+
+        make_pool(intervals) builds the worker pool for one unit. Each unit
+        is reported as done when its pool finishes without errors; a unit
+        whose workers or engines failed is released back to the coordinator,
+        and one whose lease was lost or that was cut short by stop() is left
+        for it to hand out again.
+        """
+        client = CoordinatorClient(self.coordinator.url)
+        self.on_progress(f"Working for coordinator {self.coordinator.url} as {client.worker}")
+        rate = None
+        failures = 0
+        failed_units = 0
+        while self.running:
+            try:
+                reply = client.lease(self.puzzle_num, rate)
+            except CoordinatorError as e:
+                failures += 1
+                if failures >= COORDINATOR_RETRIES:
+                    self.on_progress(f"ERROR: {e}")
+                    self.on_status("Error")
+                    return
+                self.on_progress(f"WARNING: {e} - retrying")
+                self.pause(COORDINATOR_RETRY_SECONDS)
+                continue
+            failures = 0
+
+            status = reply["status"]
+            if status == "wait":
+                self.pause(reply["retry"])
+                continue
+            if status == "found":
+                self.on_progress("Coordinator reports the key was found")
+                self.on_status("Finished")
+                return
+            if status == "exhausted":
+                self.on_progress("Range exhausted without a match")
+                self.on_status("Finished")
+                return
+            if status != "leased":
+                self.on_progress(f"ERROR: Coordinator does not know Puzzle #{self.puzzle_num}")
+                self.on_status("Error")
+                return
+
+            lease = reply["lease"]
+            start, end = int(reply["start"], 16), int(reply["end"], 16)
+            self.on_progress(f"Leased unit {lease}: {start:x}-{end:x} ({end - start + 1:,} keys)")
+            active = [True]
+
+            def heartbeat():
+                try:
+                    active[0] = client.heartbeat(lease)
+                except CoordinatorError as e:
+                    # Keep working; the lease is renewed once the coordinator is back
+                    self.on_progress(f"WARNING: {e}")
+                if not active[0]:
+                    self.on_progress(f"Lease {lease} was cancelled or expired")
+                return active[0]
+
+            pool = make_pool([(start, end)])
+            started = time.monotonic()
+            key = self.drive_pool(pool, label, heartbeat=heartbeat)
+            self.coordinated_keys += pool.total_keys()
+            if key is None and (not self.running or not active[0]):
+                continue
+
+            rate = pool.total_keys() / max(time.monotonic() - started, 1e-3)
+            # pool.errors also holds notes about chunks that were restarted and
+            # then finished; only keys left unscanned make the unit a failure
+            if key is None and getattr(pool, "unfinished", 0):
+                self.release_unit(client, lease)
+                failed_units += 1
+                if failed_units >= COORDINATOR_FAILED_UNITS:
+                    self.on_progress(
+                        f"ERROR: {failed_units} units in a row could not be finished; "
+                        "check the workers and engines, then run again"
+                    )
+                    self.on_status("Error")
+                    return
+                continue
+            failed_units = 0
+            reply = self.report_unit(client, lease, key)
+            if key is not None:
+                self.on_solution(f"{key:064x}")
+                return
+            if reply and reply["status"] == "found":
+                self.on_progress("Coordinator reports the key was found")
+                self.on_status("Finished")
+                return
+
+    def report_unit(self, client, lease, key):
+        """Tell the coordinator a unit is finished, retrying while it is unreachable"""
+        for attempt in range(COORDINATOR_RETRIES):
+            try:
+                return client.complete(lease, key)
+            except CoordinatorError as e:
+                self.on_progress(f"WARNING: {e} - retrying")
+                self.pause(COORDINATOR_RETRY_SECONDS)
+        self.on_progress(f"ERROR: Could not report unit {lease} to the coordinator")
+        return None
+
+    def release_unit(self, client, lease):
+        """Hand a unit that failed back to the coordinator for another worker"""
+        try:
+            client.release(lease)
+        except CoordinatorError as e:
+            # The lease expires on its own and the unit is handed out again
+            self.on_progress(f"WARNING: {e}")
+        self.on_progress(f"ERROR: Unit {lease} was not finished; released it to the coordinator")
+
+    def pause(self, seconds):
+        """Sleep unless the solver is stopped meanwhile"""
+        deadline = time.monotonic() + seconds
+        while self.running and time.monotonic() < deadline:
+            time.sleep(min(0.25, deadline - time.monotonic()))
+
+    def run_kangaroo_solver(self, puzzle):
+        """Run Pollard's kangaroo against the puzzle's public key"""
+        if self.coordinator.url:
+            self.on_progress("ERROR: Kangaroo walks the whole range and cannot take leased units")
+            self.on_status("Error")
+            return
+        if puzzle.point is None:
+            self.on_progress(
+                f"ERROR: Puzzle #{self.puzzle_num} has no known public key - use brute-force scan"
+            )
+            self.on_status("Error")
+            return
+        if self.search.targets:
+            self.run_multi_kangaroo_solver(puzzle)
+            return
+
+        solver = KangarooSolver(
+            puzzle.range_start,
+            puzzle.range_end,
+            puzzle.point,
+            dp_bits=self.search.dp_bits,
+            jump_seed=f"dp-store:{self.puzzle_num}" if self.checkpoint.dp_dir else None
+        )
+        if self.checkpoint.dp_dir:
+            path = dpstore.worker_file_path(self.checkpoint.dp_dir, self.puzzle_num)
+            try:
+                solver.dp_writer = dpstore.DPWriter(path, self.puzzle_num, solver.context())
+            except (OSError, dpstore.DPStoreError) as e:
+                self.on_progress(f"ERROR: Cannot write distinguished points to {path}: {e}")
+                self.on_status("Error")
+                return
+            self.on_progress(f"Appending distinguished points to {path}")
+        expected = int(1.5 * solver.width ** 0.5)
+        self.on_progress(
+            f"Starting kangaroo solver ({2 * solver.herd_size} kangaroos, "
+            f"{solver.dp_bits} DP bits, ~{expected:,} expected operations)..."
+        )
+
+        def describe(jumps, rate, elapsed):
+            return (
+                f"Kangaroo: {jumps:,} jumps | "
+                f"{rate:,.0f} jumps/sec | "
+                f"{len(solver.dp_table):,} DPs ({solver.dp_bits} bits) | "
+                f"Time: {int(elapsed)}s"
+            )
+
+        counters = CounterBlock(1, shared=False)
+        sampler = self.start_sampler(
+            "Kangaroo", lambda: [(counters.total(), None)], dict, describe
+        )
+        try:
+            private_key = profiling.profiled(
+                self.profile_run_dir, "kangaroo", solver.solve,
+                should_stop=lambda: not self.running,
+                on_progress=lambda count: counters.add(0, count)
+            )
+        finally:
+            sampler.stop()
+            if solver.dp_writer:
+                solver.dp_writer.close()
+
+        if private_key is not None:
+            self.on_solution(f"{private_key:064x}")
+
+    def run_multi_kangaroo_solver(self, puzzle):
+        """Run one kangaroo over the puzzle and the extra targets, sharing the tame herd"""
+        puzzles = [puzzle]
+        for number in dict.fromkeys(self.search.targets):
+            if number == self.puzzle_num:
+                continue
+            try:
+                target = catalog.get_puzzle(number)
+            except catalog.CatalogError as e:
+                self.on_progress(f"ERROR: {e}")
+                self.on_status("Error")
+                return
+            if target is None or target.point is None:
+                self.on_progress(f"ERROR: Puzzle #{number} not found or has no known public key")
+                self.on_status("Error")
+                return
+            puzzles.append(target)
+        if self.checkpoint.dp_dir:
+            self.on_progress("Note: multi-target runs keep their DPs in memory, --dp-dir is not used")
+
+        def on_key(index, key):
+            self.on_progress(f"Found the key of Puzzle #{puzzles[index].number}: {key:064x}")
+            if index == 0:
+                self.on_solution(f"{key:064x}")
+
+        solver = MultiKangarooSolver(
+            [(target.range_start, target.range_end, target.point) for target in puzzles],
+            dp_bits=self.search.dp_bits,
+            on_key=on_key
+        )
+        names = ", ".join(f"#{target.number}" for target in puzzles)
+        self.on_progress(
+            f"Starting multi-target kangaroo for {names} ({solver.herd_size} tame and "
+            f"{len(puzzles)}x{solver.wild_herd_size} wild kangaroos, {solver.dp_bits} DP bits)..."
+        )
+        if len({target.bits for target in puzzles}) > 1:
+            self.on_progress(
+                f"Note: the targets differ in size; the tame herd walks the widest range "
+                f"({solver.width:,} keys)"
+            )
+
+        def describe(jumps, rate, elapsed):
+            solved = sum(1 for target in solver.targets if target.key is not None)
+            return (
+                f"Kangaroo: {jumps:,} jumps | "
+                f"{rate:,.0f} jumps/sec | "
+                f"{solved}/{len(puzzles)} solved | "
+                f"{len(solver.dp_table):,} DPs ({solver.dp_bits} bits) | "
+                f"Time: {int(elapsed)}s"
+            )
+
+        counters = CounterBlock(1, shared=False)
+        sampler = self.start_sampler(
+            "Kangaroo", lambda: [(counters.total(), None)], dict, describe
+        )
+        try:
+            found = profiling.profiled(
+                self.profile_run_dir, "kangaroo", solver.solve,
+                should_stop=lambda: not self.running,
+                on_progress=lambda count: counters.add(0, count)
+            )
+        finally:
+            sampler.stop()
+
+        if self.running and len(found) == len(puzzles):
+            self.on_progress(f"All {len(puzzles)} targets solved")
+
+    def run_bsgs_solver(self, puzzle):
+        """Run baby-step giant-step against the puzzle's public key"""
+        if puzzle.point is None:
+            self.on_progress(
+                f"ERROR: Puzzle #{self.puzzle_num} has no known public key - use brute-force scan"
+            )
+            self.on_status("Error")
+            return
+        if not self.place_workers():
+            return
+
+        journal = None
+        if not self.coordinator.url:
+            journal, remaining = self.open_journal(puzzle)
+            if journal is None:
+                return
+
+        range_start, range_end = puzzle.range_start, puzzle.range_end
+        pubkey = puzzle.point
+        entries = bsgs.entries_for_budget(self.search.bsgs_memory_mb << 20, range_end - range_start + 1)
+
+        path = bsgs.table_path(self.checkpoint.table_dir, entries)
+        if not os.path.exists(path):
+            self.on_progress(
+                f"Building baby-step table ({entries:,} entries, "
+                f"{self.search.bsgs_memory_mb} MB bloom filter)..."
+            )
+        # (entries built, time of the last report); the search's own clock
+        # starts with the pool, so the build time is reported here
+        built = [0, time.monotonic()]
+        started = built[1]
+
+        def on_table_progress(count):
+            built[0] += count
+            now = time.monotonic()
+            if now - built[1] >= self.telemetry.sample_interval:
+                built[1] = now
+                self.on_progress(
+                    f"Baby-step table: {built[0]:,} of {entries:,} entries "
+                    f"({100 * built[0] / entries:.0f}%) | Time: {int(now - started)}s"
+                )
+
+        path = bsgs.ensure_table(
+            self.checkpoint.table_dir, entries,
+            should_stop=lambda: not self.running, on_progress=on_table_progress
+        )
+        if path is not None and built[0]:
+            self.on_progress(f"Baby-step table built in {time.monotonic() - started:.1f}s")
+        if path is None:
+            if journal is not None:
+                journal.close()
+            return
+        self.replicate_table(path)
+
+        def make_pool(intervals):
+            return WorkerPool(
+                bsgs.search_range,
+                partition_intervals(intervals, self.workers),
+                (pubkey, path),
+                setup=self.worker_setup(),
+                profile_dir=self.profile_run_dir,
+                placement=self.worker_cpus()
+            )
+
+        self.on_progress(
+            f"Starting BSGS solver ({self.workers} workers, "
+            f"{2 * entries + 1:,} keys per giant step)..."
+        )
+        if self.coordinator.url:
+            self.run_coordinated(make_pool, "BSGS")
+            return
+        self.run_worker_pool(make_pool(remaining), "BSGS", journal)
+
+    def stop(self):
+        """Stop the solver"""
+        self.running = False
+        self.on_progress("Stopping solver...")
+        self.on_status("Stopped")
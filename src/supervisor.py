@@ -0,0 +1,304 @@
+"""
+Supervisor for several external engine processes
+Runs a set of BitCrack-compatible engines described by a JSON config, for
+example one per GPU or per group of cores. Each engine gets its own slice
+of the keyspace, in proportion to its share, and scans it in --keyspace
+chunks with one process at a time.
+
+All engine outputs are read by one asyncio event loop, which poll() runs
+on the caller's thread, so there is no thread per pipe. A child that
+exits with an error or prints nothing for heartbeat_seconds is killed and
+its chunk is run again. Rates, key counts and verified hits of all
+engines add up into one pool, driven like WorkerPool.
+
+Config:
+
+    {
+      "heartbeat_seconds": 60,
+      "engines": [
+        {"name": "gpu", "binary": "/usr/local/bin/clBitCrack",
+         "args": ["-d", "{index}"], "count": 2, "share": 1}
+      ]
+    }
+
+count starts that many copies of an entry, with {index} in its args
+replaced by 0..count-1; share (default 1) weighs its slice; binary
+defaults to the BitCrack path of the run.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from bitcrack import DEFAULT_CHUNK_BITS, MAX_CHUNK_FAILURES, EngineProcess, iter_chunks, keyspace
+from keys import private_key_to_address
+from parallel import slice_intervals
+
+DEFAULT_HEARTBEAT_SECONDS = 60.0
+EXIT_POLL_SECONDS = 0.05
+
+
+class ConfigError(ValueError):
+    """The engine config is missing, malformed or names no engine"""
+
+
+class EngineSpec:
+    """One engine process slot of a config"""
+
+    def __init__(self, name, binary, args=(), share=1.0):
+        self.name = name
+        self.binary = binary
+        self.args = list(args)
+        self.share = share
+
+
+def load_config(path, default_binary=None):
+    """(engine specs, heartbeat seconds) from a JSON config file"""
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except OSError as e:
+        raise ConfigError(f"Cannot read engine config {path}: {e}") from e
+    except ValueError as e:
+        raise ConfigError(f"Engine config {path} is not valid JSON: {e}") from e
+    if not isinstance(config, dict) or not isinstance(config.get("engines"), list):
+        raise ConfigError(f"Engine config {path} has no engines list")
+
+    specs = []
+    for number, entry in enumerate(config["engines"]):
+        if not isinstance(entry, dict):
+            raise ConfigError(f"Engine {number} of {path} is not an object")
+        binary = entry.get("binary", default_binary)
+        if not binary:
+            raise ConfigError(f"Engine {number} of {path} has no binary and BitCrack was not found")
+        count = entry.get("count", 1)
+        share = entry.get("share", 1)
+        args = entry.get("args", [])
+        if not isinstance(count, int) or count < 1:
+            raise ConfigError(f"Engine {number} of {path}: count must be a positive integer")
+        if not isinstance(share, (int, float)) or share <= 0:
+            raise ConfigError(f"Engine {number} of {path}: share must be positive")
+        if not isinstance(args, list):
+            raise ConfigError(f"Engine {number} of {path}: args must be a list")
+        name = entry.get("name", os.path.basename(binary))
+        for index in range(count):
+            specs.append(EngineSpec(
+                f"{name}{index}" if count > 1 else name,
+                os.path.expanduser(binary),
+                [str(arg).replace("{index}", str(index)) for arg in args],
+                share
+            ))
+    if not specs:
+        raise ConfigError(f"Engine config {path} names no engine")
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise ConfigError(f"Engine names in {path} are not unique")
+
+    heartbeat = config.get("heartbeat_seconds", DEFAULT_HEARTBEAT_SECONDS)
+    if not isinstance(heartbeat, (int, float)) or heartbeat <= 0:
+        raise ConfigError(f"Engine config {path}: heartbeat_seconds must be positive")
+    return specs, float(heartbeat)
+
+
+def split_by_share(intervals, shares):
+    """Split ordered intervals into consecutive slices weighted by shares"""
+    total = sum(end - start + 1 for start, end in intervals)
+    weight = sum(shares)
+    slices = []
+    begin = 0
+    cumulative = 0
+    for share in shares:
+        cumulative += share
+        end = total * cumulative // weight if cumulative < weight else total
+        slices.append(slice_intervals(intervals, begin, end))
+        begin = end
+    return slices
+
+
+class SupervisedEngine:
+    """An engine slot: its chunks, its running child and its counters"""
+
+    def __init__(self, spec, intervals, chunk_size):
+        self.spec = spec
+        self.chunks = list(iter_chunks(intervals, chunk_size))
+        self.total = sum(end - start + 1 for start, end in intervals)
+        self.keys = 0
+        self.restarts = 0
+        self.child = None
+        self.last_output = 0.0
+
+
+class EngineSupervisor:
+    """Run engine processes from specs over intervals and merge their output
+
+    Used like WorkerPool: start(), poll(), stop(). Worker progress and
+    errors are per engine, under its name.
+    """
+
+    def __init__(self, specs, address, intervals, chunk_size=1 << DEFAULT_CHUNK_BITS,
+                 heartbeat_seconds=DEFAULT_HEARTBEAT_SECONDS):
+        self.address = address
+        self.heartbeat_seconds = heartbeat_seconds
+        slices = split_by_share(intervals, [spec.share for spec in specs])
+        self.engines = [SupervisedEngine(spec, part, chunk_size) for spec, part in zip(specs, slices)]
+        self.total = sum(end - start + 1 for start, end in intervals)
+        self.loop = asyncio.new_event_loop()
+        self.tasks = []
+        self.hit = None
+        self.completed = []
+        self.failures = {}
+        self.io_seconds = 0.0
+        self.found_key = None
+        self.errors = []
+        self.stopped = False
+
+    @property
+    def engine_rate(self):
+        """Keys/sec currently reported by all engine processes"""
+        return sum(engine.child.rate for engine in self.engines if engine.child)
+
+    def total_keys(self):
+        return sum(engine.keys for engine in self.engines)
+
+    @property
+    def unfinished(self):
+        """Keys left in the chunks of engines that gave up or were stopped"""
+        return sum(end - start + 1 for engine in self.engines for start, end in engine.chunks)
+
+    def worker_progress(self):
+        """(keys checked, keys assigned) per engine"""
+        return [(engine.keys, engine.total) for engine in self.engines]
+
+    def stage_seconds(self):
+        """Time spent reading and parsing engine output"""
+        return {"io": self.io_seconds}
+
+    def start(self):
+        self.hit = self.loop.create_future()
+        self.tasks = [
+            self.loop.create_task(self._run_engine(engine)) for engine in self.engines if engine.chunks
+        ]
+
+    def _read(self, engine, eof):
+        # Reader callback: parse whatever the child printed
+        child = engine.child
+        started = time.perf_counter()
+        try:
+            data = os.read(child.fd, 65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            # A pty reports EIO once the child has exited
+            data = b""
+        if not data:
+            self.loop.remove_reader(child.fd)
+            if not eof.done():
+                eof.set_result(None)
+            return
+
+        engine.last_output = self.loop.time()
+        engine.keys += child.feed(data)
+        self.io_seconds += time.perf_counter() - started
+        if child.found_key is not None:
+            self._check_key(engine, child)
+
+    def _check_key(self, engine, child):
+        """Accept a reported key only if it really opens the target address"""
+        key, child.found_key = child.found_key, None
+        if private_key_to_address(key) == self.address:
+            self.found_key = key
+            if not self.hit.done():
+                self.hit.set_result(key)
+        else:
+            self.errors.append((engine.spec.name, f"Engine reported a key that does not match: {key:x}"))
+
+    async def _run_chunk(self, engine, chunk):
+        """Run one chunk until it exits or hangs; returns (exit code, hung, keys reported)"""
+        child = EngineProcess(engine.spec.binary, self.address, chunk, engine.spec.args)
+        engine.child = child
+        engine.last_output = self.loop.time()
+        eof = self.loop.create_future()
+        self.loop.add_reader(child.fd, self._read, engine, eof)
+        hung = False
+        try:
+            while not eof.done() and not self.stopped:
+                silent = self.loop.time() - engine.last_output
+                if silent >= self.heartbeat_seconds:
+                    hung = True
+                    break
+                await asyncio.wait([eof], timeout=self.heartbeat_seconds - silent)
+        finally:
+            self.loop.remove_reader(child.fd)
+            child.close()
+            if hung or self.stopped:
+                child.kill()
+            while child.process.poll() is None:
+                await asyncio.sleep(EXIT_POLL_SECONDS)
+            engine.child = None
+        return child.process.returncode, hung, child.keys
+
+    async def _run_engine(self, engine):
+        name = engine.spec.name
+        while engine.chunks and not self.stopped:
+            chunk = engine.chunks[0]
+            try:
+                code, hung, reported = await self._run_chunk(engine, chunk)
+            except OSError as e:
+                self.errors.append((name, f"Cannot start {engine.spec.binary}: {e}"))
+                return
+            if self.stopped:
+                return
+
+            if code == 0 and not hung:
+                engine.keys += chunk[1] - chunk[0] + 1 - reported
+                engine.chunks.pop(0)
+                self.completed.append(chunk)
+                self.failures.pop(chunk, None)
+                continue
+
+            # Crashed or hung: give back the keys it reported and run the chunk again
+            engine.keys -= reported
+            failures = self.failures.get(chunk, 0) + 1
+            self.failures[chunk] = failures
+            reason = (
+                f"no output for {self.heartbeat_seconds:g}s" if hung else f"exited with code {code}"
+            )
+            if failures >= MAX_CHUNK_FAILURES:
+                self.errors.append(
+                    (name, f"Engine failed {failures} times on {keyspace(chunk)} ({reason}), giving up")
+                )
+                return
+            engine.restarts += 1
+            self.errors.append((name, f"Engine {reason}, restarting {keyspace(chunk)}"))
+
+    def poll(self, timeout=0.0):
+        """Run the engines' event loop for up to timeout seconds; True once the run is over"""
+        if self.loop.is_closed():
+            return True
+        pending = [task for task in self.tasks if not task.done()]
+        if pending:
+            self.loop.run_until_complete(
+                asyncio.wait(pending + [self.hit], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            )
+        if self.found_key is not None:
+            self.stop()
+            return True
+        return all(task.done() for task in self.tasks)
+
+    def new_coverage(self):
+        """Chunks finished since the last call, for the coverage journal"""
+        completed, self.completed = self.completed, []
+        return completed
+
+    def stop(self):
+        """Kill all engine processes and close the event loop"""
+        if self.loop.is_closed():
+            return
+        self.stopped = True
+        for engine in self.engines:
+            if engine.child:
+                engine.child.kill()
+        if self.tasks:
+            self.loop.run_until_complete(asyncio.gather(*self.tasks, return_exceptions=True))
+        self.loop.close()
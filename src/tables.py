@@ -0,0 +1,244 @@
+"""
+Persistent precomputed tables
+Puzzle-independent tables (BSGS baby steps, windowed multiples of G) are
+built once into versioned binary files with a SHA-256 checksum and then
+memory-mapped read-only, so every worker process shares one copy in the
+page cache. On NUMA machines each node can have its own copy in a node{N}
+subdirectory, which workers pinned to that node map instead (see
+topology.py).
+
+File layout: an 80-byte header followed by up to two payload sections.
+"""
+
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+
+import secp256k1
+import topology
+from engine import advance_lanes
+
+DEFAULT_TABLE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "bitcoin-puzzle-solver")
+
+MAGIC = b"BPSTABLE"
+FORMAT_VERSION = 1
+KIND_BABY_STEPS = 1
+KIND_GENERATOR = 2
+
+# magic, version, kind, reserved, param0, param1, section0, section1, sha256
+HEADER = struct.Struct(">8sHHI4Q32s")
+
+GENERATOR_WINDOW_BITS = 16
+POINT_SIZE = 64
+BUILD_LANES = 1024
+
+
+class TableError(Exception):
+    """Raised when a table file is missing, stale or corrupt"""
+
+
+class TableWriter:
+    """Stream the sections of a table file while hashing them
+
+    The file is written under a temporary name and renamed into place on
+    close(), so readers never see a partial table.
+    """
+
+    def __init__(self, path, kind, params):
+        self.path = path
+        self.kind = kind
+        self.params = params
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.sections = []
+        self.digest = hashlib.sha256()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(self.tmp_path, "wb")
+        self.file.write(b"\0" * HEADER.size)
+
+    def begin_section(self):
+        self.sections.append(0)
+
+    def write(self, data):
+        self.file.write(data)
+        self.digest.update(data)
+        self.sections[-1] += len(data)
+
+    def close(self):
+        sections = self.sections + [0] * (2 - len(self.sections))
+        self.file.seek(0)
+        self.file.write(HEADER.pack(
+            MAGIC, FORMAT_VERSION, self.kind, 0,
+            self.params[0], self.params[1], sections[0], sections[1],
+            self.digest.digest()
+        ))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.tmp_path)
+
+
+class TableFile:
+    """Read-only memory-mapped view of a table file"""
+
+    def __init__(self, path, kind, verify=False):
+        try:
+            with open(path, "rb") as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise TableError(f"Cannot open table {path}: {e}")
+
+        if len(self.data) < HEADER.size:
+            self.data.close()
+            raise TableError(f"Truncated table: {path}")
+
+        magic, version, file_kind, _, p0, p1, s0, s1, checksum = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != FORMAT_VERSION or file_kind != kind:
+            self.data.close()
+            raise TableError(f"Incompatible table format: {path}")
+        if len(self.data) != HEADER.size + s0 + s1:
+            self.data.close()
+            raise TableError(f"Table size mismatch: {path}")
+
+        self.path = path
+        self.params = (p0, p1)
+        self.offsets = (HEADER.size, HEADER.size + s0)
+        self.sizes = (s0, s1)
+        self.checksum = checksum
+        if verify and not self.verify():
+            self.data.close()
+            raise TableError(f"Table checksum mismatch: {path}")
+
+    def verify(self):
+        """Check the payload against the stored SHA-256"""
+        digest = hashlib.sha256()
+        view = memoryview(self.data)
+        for offset in range(HEADER.size, len(self.data), 1 << 24):
+            digest.update(view[offset:offset + (1 << 24)])
+        view.release()
+        return digest.digest() == self.checksum
+
+    def section(self, index):
+        """Offset and size of a payload section"""
+        return self.offsets[index], self.sizes[index]
+
+    def close(self):
+        self.data.close()
+
+
+def _header(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(HEADER.size), os.fstat(f.fileno()).st_size
+    except OSError:
+        return None
+
+
+def node_copy_path(path, node):
+    """Path of a table's copy for one NUMA node"""
+    return os.path.join(os.path.dirname(path), f"node{node}", os.path.basename(path))
+
+
+def replicate(path, node):
+    """Copy a table for a NUMA node unless an identical copy is there; returns its path
+
+    Call it from a thread pinned to the node (topology.pinned), so the page
+    cache of the copy is allocated on that node.
+    """
+    copy = node_copy_path(path, node)
+    if _header(copy) == _header(path):
+        return copy
+    os.makedirs(os.path.dirname(copy), exist_ok=True)
+    tmp_path = f"{copy}.{os.getpid()}.tmp"
+    try:
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, copy)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return copy
+
+
+def local_path(path):
+    """The copy of a table for this thread's NUMA node if it is current, else path"""
+    node = topology.current_node()
+    if node is None:
+        return path
+    copy = node_copy_path(path, node)
+    header = _header(copy)
+    return copy if header is not None and header == _header(path) else path
+
+
+def generator_table_path(directory, window_bits=GENERATOR_WINDOW_BITS):
+    return os.path.join(directory, f"generator-w{window_bits}.tbl")
+
+
+def build_generator_table(path, window_bits=GENERATOR_WINDOW_BITS):
+    """Write d * 2^(w*i) * G for every window i and digit 1 <= d < 2^w"""
+    windows = (256 + window_bits - 1) // window_bits
+    writer = TableWriter(path, KIND_GENERATOR, (window_bits, windows))
+    writer.begin_section()
+    digits = (1 << window_bits) - 1
+    try:
+        base = secp256k1.G
+        for _ in range(windows):
+            # Lanes at d*base for consecutive d, advanced together by lanes*base
+            lanes = [base]
+            while len(lanes) < min(BUILD_LANES, digits):
+                lanes.append(secp256k1.point_add(lanes[-1], base))
+            step = lanes[-1]
+
+            done = 0
+            while done < digits:
+                count = min(len(lanes), digits - done)
+                writer.write(b"".join(
+                    x.to_bytes(32, "big") + y.to_bytes(32, "big") for x, y in lanes[:count]
+                ))
+                done += count
+                if done < digits:
+                    lanes = advance_lanes(lanes, step)
+            base = secp256k1.point_mul(1 << window_bits, base)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+
+class GeneratorTable:
+    """Memory-mapped window table used by point_mul for k*G"""
+
+    def __init__(self, path, verify=False):
+        self.file = TableFile(path, KIND_GENERATOR, verify)
+        self.window_bits, self.windows = self.file.params
+        self.mask = (1 << self.window_bits) - 1
+        self.offset = self.file.section(0)[0]
+        self.data = self.file.data
+
+    def point(self, window, digit):
+        """The affine point digit * 2^(w*window) * G"""
+        start = self.offset + ((window << self.window_bits) - window + digit - 1) * POINT_SIZE
+        return (
+            int.from_bytes(self.data[start:start + 32], "big"),
+            int.from_bytes(self.data[start + 32:start + 64], "big")
+        )
+
+
+def install_generator_table(directory=DEFAULT_TABLE_DIR, verify=False):
+    """Map the generator table (building it on first use) for point_mul
+
+    A worker pinned to a NUMA node maps that node's copy if there is one.
+    """
+    path = generator_table_path(directory)
+    try:
+        table = GeneratorTable(local_path(path), verify)
+    except TableError:
+        build_generator_table(path)
+        table = GeneratorTable(path)
+    secp256k1.set_generator_table(table)
+    return table
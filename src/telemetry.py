@@ -0,0 +1,154 @@
+"""
+Coalesced solver telemetry
+Engines only add to cheap counters (shared memory across processes); one
+sampler reads them at a fixed rate and hands a snapshot to the UI, so the
+UI cost does not depend on how fast the engines run. Log lines go to a
+bounded ring that spills evicted lines to a file.
+"""
+
+import collections
+import ctypes
+import multiprocessing
+import os
+import threading
+import time
+
+DEFAULT_SAMPLE_INTERVAL = 1.0
+# Engine stages timed per batch: EC arithmetic, hashing, target compare, I/O
+STAGES = ("ec", "hash", "compare", "io")
+DEFAULT_LOG_LINES = 5000
+DEFAULT_LOG_DIR = os.path.join(
+    os.path.expanduser("~"), ".local", "share", "bitcoin-puzzle-solver", "logs"
+)
+
+
+class CounterBlock:
+    """One counter slot per worker, in shared memory when shared=True
+
+    Each slot has a single writer, so no lock is needed; readers may see a
+    slightly stale total, which is fine for progress reporting.
+    """
+
+    def __init__(self, slots, shared=True, ctx=None):
+        if shared:
+            ctx = ctx or multiprocessing.get_context()
+            self.values = ctx.Array(ctypes.c_uint64, slots, lock=False)
+        else:
+            self.values = [0] * slots
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, slot):
+        return self.values[slot]
+
+    def add(self, slot, count):
+        self.values[slot] += count
+
+    def total(self):
+        return sum(self.values)
+
+
+class StageTimes:
+    """Seconds spent per engine stage and worker, in shared memory
+
+    Engines add the time of a whole batch per stage, so timing costs a few
+    clock reads per batch rather than per key.
+    """
+
+    def __init__(self, slots, shared=True, ctx=None):
+        self.counters = CounterBlock(slots * len(STAGES), shared, ctx)
+
+    def add(self, slot, stage, seconds):
+        self.counters.add(slot * len(STAGES) + STAGES.index(stage), int(seconds * 1e9))
+
+    def totals(self):
+        """Seconds per stage summed over all workers"""
+        result = dict.fromkeys(STAGES, 0.0)
+        for i in range(len(self.counters)):
+            result[STAGES[i % len(STAGES)]] += self.counters[i] / 1e9
+        return result
+
+
+class Sampler:
+    """Read a counter source at a fixed rate from a background thread
+
+    source() returns a snapshot of the counters; sink(snapshot, elapsed)
+    gets one per interval, plus a final one from stop().
+    """
+
+    def __init__(self, source, sink, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.source = source
+        self.sink = sink
+        self.interval = interval
+        self.start_time = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.start_time = time.monotonic()
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        self.sink(self.source(), time.monotonic() - self.start_time)
+
+    def stop(self):
+        """Stop sampling and deliver a final snapshot"""
+        if self.start_time is None:
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.sample()
+
+
+class LogRing:
+    """Bounded in-memory log that appends evicted lines to a spill file"""
+
+    def __init__(self, capacity=DEFAULT_LOG_LINES, spill_path=None):
+        self.lines = collections.deque()
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.spill = None
+        self.lock = threading.Lock()
+
+    def append(self, line):
+        with self.lock:
+            self.lines.append(line)
+            if len(self.lines) > self.capacity:
+                self._spill(self.lines.popleft())
+
+    def _spill(self, line):
+        if not self.spill_path:
+            return
+        if self.spill is None:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            self.spill = open(self.spill_path, "a", buffering=1)
+        self.spill.write(line + "\n")
+
+    def text(self):
+        """The full log: spilled lines followed by the ring"""
+        with self.lock:
+            spilled = ""
+            if self.spill is not None:
+                self.spill.flush()
+                with open(self.spill_path) as f:
+                    spilled = f.read()
+            return spilled + "".join(line + "\n" for line in self.lines)
+
+    def clear(self):
+        with self.lock:
+            self.lines.clear()
+            if self.spill is not None:
+                self.spill.close()
+                self.spill = None
+                os.remove(self.spill_path)
+
+    def close(self):
+        with self.lock:
+            if self.spill is not None:
+                self.spill.close()
+                self.spill = None
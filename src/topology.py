@@ -0,0 +1,255 @@
+"""
+CPU topology and worker placement
+Reads the Linux CPU topology from sysfs (cores, SMT siblings, NUMA nodes)
+and pins each worker process to a CPU with os.sched_setaffinity. Workers
+are grouped per NUMA node in proportion to the node's CPUs, first one per
+physical core, then on SMT siblings unless those are left out.
+
+Pinned workers open tables through tables.local_path(), which prefers a
+copy of the table in the node{N} subdirectory of their node; the solver
+writes those copies from a thread pinned to the node, so their page cache
+is local to it.
+
+Placement modes: "auto" pins on machines with more than one NUMA node
+and whenever SMT siblings are left out, "on" always pins, "off" never
+does, and a CPU list such as "0-7,16-23" pins worker i to the i-th listed
+CPU.
+"""
+
+import contextlib
+import os
+
+SYSFS_ROOT = "/sys/devices/system"
+PLACEMENT_MODES = ("auto", "on", "off")
+DEFAULT_PLACEMENT = "auto"
+
+
+class PlacementError(ValueError):
+    """A placement setting is malformed or names CPUs this process cannot use"""
+
+
+def parse_cpulist(text):
+    """CPU numbers of a sysfs list such as "0-3,8,10-11", in order"""
+    cpus = []
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        try:
+            first = int(first)
+            last = int(last) if last else first
+        except ValueError:
+            raise PlacementError(f"Bad CPU list {text!r}") from None
+        if last < first:
+            raise PlacementError(f"Bad CPU range {part!r}")
+        cpus.extend(range(first, last + 1))
+    return cpus
+
+
+def format_cpulist(cpus):
+    """Compact sysfs-style list of CPU numbers"""
+    ranges = []
+    for cpu in sorted(set(cpus)):
+        if ranges and ranges[-1][1] == cpu - 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(f"{a}-{b}" if a != b else str(a) for a, b in ranges)
+
+
+def supported():
+    """True if this platform can pin processes to CPUs"""
+    return hasattr(os, "sched_setaffinity")
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read().strip()
+
+
+class Cpu:
+    """One logical CPU: its NUMA node, package, core and SMT siblings"""
+
+    def __init__(self, number, node, package, core, siblings):
+        self.number = number
+        self.node = node
+        self.package = package
+        self.core = core
+        self.siblings = siblings
+
+    @property
+    def primary(self):
+        """True for the first thread of its physical core"""
+        return self.number == min(self.siblings)
+
+
+class Topology:
+    """The CPUs this process may run on, by NUMA node"""
+
+    def __init__(self, cpus):
+        self.cpus = {cpu.number: cpu for cpu in cpus}
+        self.nodes = {}
+        for cpu in sorted(cpus, key=lambda cpu: cpu.number):
+            self.nodes.setdefault(cpu.node, []).append(cpu.number)
+
+    def node_of(self, cpus):
+        """The node that holds all of cpus, or None if they span several"""
+        nodes = {self.cpus[cpu].node for cpu in cpus if cpu in self.cpus}
+        return nodes.pop() if len(nodes) == 1 else None
+
+    def ordered(self, node, smt=True):
+        """CPUs of a node, one per physical core first, then SMT siblings"""
+        cpus = [self.cpus[number] for number in self.nodes[node]]
+        cpus.sort(key=lambda cpu: (not cpu.primary, cpu.package, cpu.core, cpu.number))
+        return [cpu.number for cpu in cpus if smt or cpu.primary]
+
+
+def read_topology(root=SYSFS_ROOT, allowed=None):
+    """Topology of the allowed CPUs (default: this process's affinity) from sysfs
+
+    Machines without node directories count as one node 0; missing core
+    files make every CPU its own core.
+    """
+    if allowed is None:
+        allowed = os.sched_getaffinity(0) if supported() else range(os.cpu_count() or 1)
+    allowed = set(allowed)
+    try:
+        online = set(parse_cpulist(_read(os.path.join(root, "cpu", "online"))))
+    except OSError:
+        online = allowed
+    node_of = {}
+    try:
+        names = os.listdir(os.path.join(root, "node"))
+    except OSError:
+        names = []
+    for name in names:
+        if name.startswith("node") and name[4:].isdigit():
+            try:
+                for cpu in parse_cpulist(_read(os.path.join(root, "node", name, "cpulist"))):
+                    node_of[cpu] = int(name[4:])
+            except OSError:
+                continue
+
+    cpus = []
+    for number in sorted(allowed & online):
+        base = os.path.join(root, "cpu", f"cpu{number}", "topology")
+        try:
+            package = int(_read(os.path.join(base, "physical_package_id")))
+            core = int(_read(os.path.join(base, "core_id")))
+            siblings = set(parse_cpulist(_read(os.path.join(base, "thread_siblings_list"))))
+        except (OSError, ValueError):
+            package, core, siblings = 0, number, {number}
+        cpus.append(Cpu(number, node_of.get(number, 0), package, core, siblings & allowed or {number}))
+    return Topology(cpus)
+
+
+class Placement:
+    """CPU set per worker, with the node each worker runs on"""
+
+    def __init__(self, cpusets, topology, smt=True):
+        self.cpusets = cpusets
+        self.topology = topology
+        self.smt = smt
+        self.nodes = [topology.node_of(cpus) for cpus in cpusets]
+
+    def __len__(self):
+        return len(self.cpusets)
+
+    def describe(self):
+        """Log lines: workers and CPUs per node"""
+        lines = []
+        by_node = {}
+        for worker, (cpus, node) in enumerate(zip(self.cpusets, self.nodes)):
+            by_node.setdefault(node, ([], set()))
+            by_node[node][0].append(worker)
+            by_node[node][1].update(cpus)
+        for node in sorted(by_node, key=lambda node: -1 if node is None else node):
+            workers, cpus = by_node[node]
+            where = f"node {node}" if node is not None else "several nodes"
+            lines.append(
+                f"Placement: {where}: workers {format_cpulist(workers)} on CPUs {format_cpulist(cpus)}"
+            )
+        if not self.smt:
+            lines.append("Placement: SMT siblings left unused")
+        return lines
+
+
+def plan(workers, mode=DEFAULT_PLACEMENT, smt=True, topology=None):
+    """Placement for workers under mode, or None to leave them unpinned
+
+    Workers go to nodes in proportion to each node's usable CPUs and take
+    that node's CPUs in order, wrapping around when there are more workers
+    than CPUs.
+    """
+    if mode == "off" or not supported():
+        return None
+    topology = topology or read_topology()
+    if mode not in PLACEMENT_MODES:
+        cpus = parse_cpulist(mode)
+        unknown = [cpu for cpu in cpus if cpu not in topology.cpus]
+        if not cpus or unknown:
+            missing = format_cpulist(unknown) or mode
+            raise PlacementError(f"CPUs {missing} are not available to this process")
+        return Placement([{cpus[i % len(cpus)]} for i in range(workers)], topology, smt)
+    if mode == "auto" and len(topology.nodes) < 2 and smt:
+        return None
+
+    usable = {node: topology.ordered(node, smt) for node in topology.nodes}
+    usable = {node: cpus for node, cpus in usable.items() if cpus}
+    total = sum(len(cpus) for cpus in usable.values())
+    # Largest remainder split of the workers over the nodes
+    shares = {node: workers * len(cpus) // total for node, cpus in usable.items()}
+    left = workers - sum(shares.values())
+    for node in sorted(usable, key=lambda node: -(workers * len(usable[node]) % total))[:left]:
+        shares[node] += 1
+
+    cpusets = []
+    for node in sorted(usable):
+        cpus = usable[node]
+        cpusets += [{cpus[i % len(cpus)]} for i in range(shares[node])]
+    return Placement(cpusets, topology, smt)
+
+
+def usable_cpus(smt=True, topology=None):
+    """Number of CPUs a pinned run would use"""
+    topology = topology or read_topology()
+    return sum(len(topology.ordered(node, smt)) for node in topology.nodes)
+
+
+def pin(cpus):
+    """Run the calling thread (a whole worker process) on cpus only"""
+    os.sched_setaffinity(0, cpus)
+
+
+@contextlib.contextmanager
+def pinned(cpus):
+    """Move the calling thread onto cpus for the block, e.g. to touch memory on a node"""
+    if not supported():
+        yield
+        return
+    previous = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, cpus)
+    try:
+        yield
+    finally:
+        os.sched_setaffinity(0, previous)
+
+
+def current_node(root=SYSFS_ROOT):
+    """NUMA node this thread is confined to, or None if it may run on several"""
+    if not supported():
+        return None
+    allowed = os.sched_getaffinity(0)
+    nodes = set()
+    try:
+        names = os.listdir(os.path.join(root, "node"))
+    except OSError:
+        return None
+    for name in names:
+        if name.startswith("node") and name[4:].isdigit():
+            try:
+                if allowed & set(parse_cpulist(_read(os.path.join(root, "node", name, "cpulist")))):
+                    nodes.add(int(name[4:]))
+            except OSError:
+                continue
+    return nodes.pop() if len(nodes) == 1 else None
@@ -0,0 +1,100 @@
+"""
+Coordinated runs against a local coordinator, with BitCrack engines that fail
+The engines are shell wrappers around scripts/clBitCrack-standin.py, so
+no GPU is needed. Run with python -m unittest discover tests.
+"""
+
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import benchmark  # noqa: E402
+import catalog  # noqa: E402
+import coordinator  # noqa: E402
+from solver import (  # noqa: E402
+    COORDINATOR_FAILED_UNITS, CheckpointOptions, CoordinatorOptions, EngineOptions, Solver
+)
+
+STANDIN = os.path.join(ROOT, "scripts", "clBitCrack-standin.py")
+BITS = 16
+
+
+class CoordinatedEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        # The planted key lies above the range, so every unit has to be scanned
+        # to the end and reported as done
+        planted = benchmark.planted_puzzle(BITS + 1)
+        self.puzzle = catalog.Puzzle(0, BITS, 1 << (BITS - 1), (1 << BITS) - 1, address=planted.address)
+        self.store = coordinator.WorkStore(os.path.join(self.dir, "coordinator.db"))
+        self.store.add_puzzle(0, self.puzzle.address, self.puzzle.range_start, self.puzzle.range_end)
+        self.server = coordinator.CoordinatorServer(self.store, port=0)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.close()
+        self.store.close()
+        shutil.rmtree(self.dir)
+
+    def engine(self, body):
+        """Executable shell script with body, standing in for BitCrack"""
+        path = os.path.join(self.dir, "engine.sh")
+        with open(path, "w") as f:
+            f.write(f"#!/bin/sh\n{body}\n")
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+        return path
+
+    def run_solver(self, bitcrack_path):
+        """(log lines, statuses, solutions) of a coordinated GPU run"""
+        log, statuses, solutions = [], [], []
+        solver = Solver(
+            0,
+            puzzle=self.puzzle,
+            engine=EngineOptions(use_gpu=True, bitcrack_path=bitcrack_path, gpu_chunk_bits=BITS - 3),
+            checkpoint=CheckpointOptions(
+                checkpoint_dir=os.path.join(self.dir, "checkpoints"),
+                table_dir=os.path.join(self.dir, "tables")
+            ),
+            coordinator=CoordinatorOptions(url=f"http://127.0.0.1:{self.server.port}"),
+            on_progress=log.append,
+            on_status=statuses.append,
+            on_solution=solutions.append
+        )
+        solver.run()
+        return log, statuses, solutions
+
+    def test_restarted_chunk_completes_unit(self):
+        marker = os.path.join(self.dir, "crashed")
+        flaky = self.engine(
+            f'if [ ! -e "{marker}" ]; then touch "{marker}"; echo "[Error] flaky"; exit 1; fi\n'
+            f'exec "{sys.executable}" "{STANDIN}" "$@"'
+        )
+        log, statuses, solutions = self.run_solver(flaky)
+
+        self.assertTrue(os.path.exists(marker))
+        self.assertIn("Range exhausted without a match", log)
+        self.assertEqual(statuses[-1], "Finished")
+        self.assertFalse([line for line in log if "was not finished" in line], log)
+        units = self.store.status()["0"]["units"]
+        self.assertEqual((units["done"], units["pending"], units["leased"]), (1, 0, 0))
+
+    def test_failing_engine_releases_units(self):
+        log, statuses, solutions = self.run_solver(self.engine('echo "[Error] broken"; exit 1'))
+
+        self.assertEqual(solutions, [])
+        self.assertEqual(statuses[-1], "Error")
+        released = [line for line in log if "was not finished" in line]
+        self.assertEqual(len(released), COORDINATOR_FAILED_UNITS)
+        units = self.store.status()["0"]["units"]
+        self.assertEqual((units["done"], units["leased"]), (0, 0))
+        self.assertGreater(units["pending"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()